@@ -0,0 +1,13 @@
+"""Initialise NoneBot so plugin modules can be imported outside a running bot."""
+
+from typing import Any, Optional
+
+import nonebot
+
+
+def init(global_config: Optional[dict[str, Any]] = None, **kwargs) -> None:
+    """`kwargs` go to the plugin's `deepseek` config, `global_config` to NoneBot itself"""
+    nonebot.init(
+        driver="~none", log_level="WARNING", **(global_config or {}), deepseek={"api_key": "sk-bench", **kwargs}
+    )
+    nonebot.load_plugin("nonebot_plugin_deepseek")
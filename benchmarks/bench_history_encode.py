@@ -0,0 +1,70 @@
+"""Request-body encoding cost per turn as a `--with-context` conversation grows.
+
+Usage: python -m benchmarks.bench_history_encode [turns] [tool_output_chars]
+
+Each turn appends a user message, an assistant tool call, a long tool output and an assistant
+reply. The legacy path re-encodes the whole message list on every call; `MessageHistory`
+encodes each message once and joins the cached fragments. The join is a plain memory copy of
+the body, which the request has to make anyway.
+"""
+
+import sys
+import time
+
+from ._bootstrap import init
+
+
+def main(turns: int, tool_output_chars: int) -> None:
+    init()
+    from nonebot_plugin_deepseek.history import MessageHistory
+    from nonebot_plugin_deepseek.apis.template import encode_json
+
+    def turn_messages(index: int) -> list[dict]:
+        return [
+            {"role": "user", "content": f"第 {index} 轮：请帮我总结这个网页"},
+            {
+                "role": "assistant",
+                "content": "",
+                "tool_calls": [
+                    {
+                        "id": f"call_{index}",
+                        "type": "function",
+                        "function": {"name": "get_web_content", "arguments": '{"url": "https://example.com"}'},
+                    }
+                ],
+            },
+            {"role": "tool", "tool_call_id": f"call_{index}", "content": "网页正文内容。" * (tool_output_chars // 7)},
+            {"role": "assistant", "content": "这是网页的总结。" * 40},
+        ]
+
+    legacy: list[dict] = []
+    history = MessageHistory()
+    checkpoints = {1, turns // 4, turns // 2, turns * 3 // 4, turns}
+    print(f"{turns} turns, {tool_output_chars} chars of tool output per turn")
+    print(f"{'turn':>6}{'legacy µs':>12}{'encode µs':>12}{'join µs':>12}{'body KiB':>12}")
+    for index in range(1, turns + 1):
+        messages = turn_messages(index)
+
+        start = time.perf_counter()
+        legacy.extend(messages)
+        legacy_body = encode_json(legacy)[1:-1]
+        legacy_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for message in messages:
+            history.append(message)
+        encode_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        body = history.encoded()
+        join_elapsed = time.perf_counter() - start
+
+        assert body == legacy_body
+        if index in checkpoints:
+            print(
+                f"{index:>6}{legacy_elapsed * 1e6:>12.0f}{encode_elapsed * 1e6:>12.0f}"
+                f"{join_elapsed * 1e6:>12.0f}{len(body) / 1024:>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200, int(sys.argv[2]) if len(sys.argv) > 2 else 4000)
@@ -0,0 +1,101 @@
+"""Import time of the plugin, measured with `python -X importtime` in a fresh interpreter.
+
+Usage: python -m benchmarks.bench_import_time [runs] [top]
+
+Loads the plugin `runs` times in subprocesses and reports the best self time of each plugin module
+(the `top` slowest are listed), the total against `IMPORT_BUDGET_MS`, and whether any heavy optional
+dependency or the config file was touched during import. `tests/test_import_time.py` enforces the
+same budget.
+"""
+
+import os
+import sys
+import json
+import tempfile
+import subprocess
+from pathlib import Path
+from dataclasses import field, dataclass
+
+PACKAGE = "nonebot_plugin_deepseek"
+IMPORT_BUDGET_MS = 150
+"""插件自身模块的导入耗时预算（各模块 self 时间之和，不含 nonebot、httpx 等依赖），约为实测值的两倍"""
+HEAVY_MODULES = ("bs4", "markdown", "nonebot_plugin_htmlrender", "playwright")
+"""仅在首次使用时才允许导入的可选依赖"""
+
+_SCRIPT = """
+import sys, json, nonebot
+from pathlib import Path
+
+nonebot.init(
+    driver="~none",
+    log_level="WARNING",
+    localstore_cache_dir=sys.argv[1] + "/cache",
+    localstore_config_dir=sys.argv[1] + "/config",
+    localstore_data_dir=sys.argv[1] + "/data",
+    deepseek={"api_key": "sk-bench"},
+)
+nonebot.load_plugin("nonebot_plugin_deepseek")
+heavy = [name for name in json.loads(sys.argv[2]) if name in sys.modules]
+touched = [path.relative_to(sys.argv[1]).as_posix() for path in Path(sys.argv[1]).rglob("*")]
+print(json.dumps({"heavy": heavy, "touched": touched}))
+"""
+
+
+@dataclass
+class ImportReport:
+    modules: dict[str, float] = field(default_factory=dict)
+    """插件各模块的导入耗时（毫秒，self 时间，取多次运行中的最小值）"""
+    heavy: list[str] = field(default_factory=list)
+    touched: list[str] = field(default_factory=list)
+    """导入期间在插件数据目录中创建的文件"""
+
+    @property
+    def total(self) -> float:
+        return sum(self.modules.values())
+
+
+def parse_importtime(stderr: str) -> dict[str, float]:
+    """解析 `-X importtime` 的输出，返回插件模块的 self 时间（毫秒）"""
+    modules: dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, name = line[len("import time:") :].split("|", 2)
+        name = name.strip()
+        if (name == PACKAGE or name.startswith(PACKAGE + ".")) and self_us.strip().isdigit():
+            modules[name] = int(self_us) / 1000
+    return modules
+
+
+def measure(runs: int = 3) -> ImportReport:
+    report = ImportReport()
+    root = Path(__file__).resolve().parent.parent
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(root), os.environ.get("PYTHONPATH")]))}
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            result = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", _SCRIPT, tmp, json.dumps(HEAVY_MODULES)],
+                capture_output=True,
+                text=True,
+                cwd=tmp,
+                env=env,
+                check=True,
+            )
+        for name, elapsed in parse_importtime(result.stderr).items():
+            report.modules[name] = min(elapsed, report.modules.get(name, elapsed))
+        outcome = json.loads(result.stdout.strip().splitlines()[-1])
+        report.heavy = sorted({*report.heavy, *outcome["heavy"]})
+        report.touched = sorted({*report.touched, *outcome["touched"]})
+    return report
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    report = measure(runs)
+
+    for name, elapsed in sorted(report.modules.items(), key=lambda item: -item[1])[:top]:
+        print(f"{elapsed:8.2f} ms  {name}")
+    print(f"total {report.total:.1f} ms / budget {IMPORT_BUDGET_MS} ms ({len(report.modules)} modules, best of {runs})")
+    print(f"heavy optional modules imported: {', '.join(report.heavy) or 'none'}")
+    print(f"files created during import: {', '.join(report.touched) or 'none'}")
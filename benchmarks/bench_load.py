@@ -0,0 +1,371 @@
+"""End-to-end load test of the chat path against a local mock DeepSeek server.
+
+Usage: python -m benchmarks.bench_load [--users 20] [--groups 4] [--turns 5] [--transport asgi|tcp] ...
+
+Simulated users talk to the plugin through a fake OneBot V11 bot: events are dispatched with
+`nonebot.message.handle_event`, so `/todeepseek`, `at_me_matcher` and `private_matcher` run
+unchanged, and replies are captured where the bot would call `send_msg`. Each user is a closed
+loop — send, wait for the reply, think, send the follow-up — and ends its session with "结束".
+
+The mock (`benchmarks.mock_deepseek`) is mounted in-process through `httpx.ASGITransport` by
+default; `--transport tcp` serves it with uvicorn on a local port so connection setup and
+streaming are real. All mock options (`--latency`, `--error-rate`, `--rate-limit-rate`, ...)
+are accepted. Reports requests per second, p50/p95/p99 reply latency, outcomes, memory growth,
+open sockets and the plugin's own metrics summary.
+"""
+
+import os
+import sys
+import time
+import random
+import socket
+import asyncio
+import argparse
+import resource
+import tempfile
+import functools
+import statistics
+import tracemalloc
+from typing import Any, Optional
+from dataclasses import field, dataclass
+
+from .mock_deepseek import MockDeepSeek, options_from, add_arguments
+
+SELF_ID = "10000"
+FIRST_USER_ID = 20000
+FIRST_GROUP_ID = 30000
+REPLY_TIMEOUT = 120
+
+
+def open_sockets() -> int:
+    """当前进程持有的套接字数，仅 Linux 可用（其余平台为 -1）"""
+    try:
+        fds = os.listdir("/proc/self/fd")
+    except OSError:
+        return -1
+    count = 0
+    for fd in fds:
+        try:
+            count += os.readlink(f"/proc/self/fd/{fd}").startswith("socket:")
+        except OSError:
+            continue
+    return count
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+@dataclass
+class LoadReport:
+    elapsed: float = 0
+    latencies: list[float] = field(default_factory=list)
+    """成功回复的耗时（秒）：事件分发至机器人调用 `send_msg`"""
+    outcomes: dict[str, int] = field(default_factory=dict)
+    sockets: list[int] = field(default_factory=list)
+    """进程持有的套接字数的采样"""
+    memory_start: int = 0
+    memory_end: int = 0
+    memory_peak: int = 0
+    maxrss_start: int = 0
+    maxrss_end: int = 0
+
+    def count(self, outcome: str) -> None:
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+
+class Replies:
+    """按用户分发机器人发出的消息"""
+
+    def __init__(self) -> None:
+        self.queues: dict[str, asyncio.Queue] = {}
+
+    def queue(self, user_id: str) -> asyncio.Queue:
+        if (queue := self.queues.get(user_id)) is None:
+            queue = self.queues[user_id] = asyncio.Queue()
+        return queue
+
+    def put(self, user_id: str, text: str) -> None:
+        self.queue(user_id).put_nowait((time.perf_counter(), text))
+
+
+def classify(text: str) -> Optional[str]:
+    """将一条回复归类，中间提示（如 OCR 结果）返回 `None`"""
+    if "词0" in text:
+        return "ok"
+    if "再见" in text:
+        return "farewell"
+    if "识别" in text:
+        return None
+    return "error"
+
+
+def make_bot(replies: Replies, ocr_delay: float):
+    import nonebot
+    from nonebot.adapters.onebot.v11 import Bot, Adapter
+
+    class FakeBot(Bot):
+        """不连接协议端的 OneBot V11 机器人，API 调用在本地应答"""
+
+        message_id = 0
+
+        async def call_api(self, api: str, **data: Any) -> Any:
+            if api == "ocr_image":
+                await asyncio.sleep(ocr_delay)
+                return {"texts": [{"text": "图片中的文字"}], "language": "zh"}
+            FakeBot.message_id += 1
+            if api == "send_msg":
+                replies.put(str(data["user_id"]), str(data["message"]))
+            return {"message_id": FakeBot.message_id}
+
+    driver = nonebot.get_driver()
+    bot = FakeBot(Adapter(driver), SELF_ID)
+    driver._bot_connect(bot)
+    return bot
+
+
+@dataclass
+class SimUser:
+    user_id: int
+    group_id: Optional[int]
+    """所在的群，为 `None` 时通过私聊对话"""
+    use_command: bool
+    """群聊中以 `/todeepseek` 开启会话，否则 @ 机器人"""
+    tasks: list[asyncio.Task] = field(default_factory=list)
+    message_id: int = 0
+
+    def event(self, text: str, *, opening: bool, image: bool = False):
+        from nonebot.adapters.onebot.v11.event import Sender
+        from nonebot.adapters.onebot.v11 import Message, MessageSegment, GroupMessageEvent, PrivateMessageEvent
+
+        command = opening and self.group_id is not None and self.use_command
+        message = Message(f"/todeepseek {text}" if command else text)
+        if image and not command:
+            # `/todeepseek` 的参数只接受文本，图片随 @ 或私聊消息发送
+            message += MessageSegment("image", {"file": "image.png", "url": "https://example.com/image.png"})
+        self.message_id += 1
+        fields = {
+            "time": int(time.time()),
+            "self_id": int(SELF_ID),
+            "post_type": "message",
+            "user_id": self.user_id,
+            "message_id": self.user_id * 1000 + self.message_id,
+            "message": message,
+            "original_message": message,
+            "raw_message": str(message),
+            "font": 0,
+            "sender": Sender(user_id=self.user_id, nickname=f"user{self.user_id}"),
+            "to_me": not command,
+        }
+        if self.group_id is None:
+            return PrivateMessageEvent(**fields, sub_type="friend", message_type="private")
+        return GroupMessageEvent(
+            **fields, sub_type="normal", message_type="group", group_id=self.group_id, anonymous=None
+        )
+
+    def dispatch(self, bot, event) -> None:
+        from nonebot.message import handle_event
+
+        self.tasks.append(asyncio.create_task(handle_event(bot, event)))
+
+
+async def run_user(
+    user: SimUser, bot, replies: Replies, report: LoadReport, args: argparse.Namespace, rng: random.Random
+) -> None:
+    queue = replies.queue(str(user.user_id))
+    in_session = False
+    for turn in range(args.turns):
+        text = f"第 {turn} 个问题：今天天气怎么样？" + "很长的补充说明。" * rng.randint(0, args.prompt_chars // 8)
+        image = rng.random() < args.image_ratio
+        start = time.perf_counter()
+        user.dispatch(bot, user.event(text, opening=not in_session, image=image))
+        while True:
+            try:
+                sent_at, reply = await asyncio.wait_for(queue.get(), REPLY_TIMEOUT)
+            except asyncio.TimeoutError:
+                report.count("timeout")
+                return
+            if (outcome := classify(reply)) is not None:
+                break
+        report.count(outcome)
+        if outcome == "ok":
+            report.latencies.append(sent_at - start)
+            in_session = True
+        else:
+            # 出错后会话结束，下一条消息重新开启会话
+            in_session = False
+        await asyncio.sleep(rng.uniform(0, args.think_time))
+
+    if in_session:
+        user.dispatch(bot, user.event("结束", opening=False))
+        try:
+            await asyncio.wait_for(queue.get(), REPLY_TIMEOUT)
+        except asyncio.TimeoutError:
+            report.count("timeout")
+
+
+async def sample_sockets(report: LoadReport, interval: float = 0.05) -> None:
+    while True:
+        report.sockets.append(open_sockets())
+        await asyncio.sleep(interval)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def serve_tcp(app: MockDeepSeek, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+async def run(args: argparse.Namespace, mock: MockDeepSeek) -> LoadReport:
+    import httpx
+    import nonebot
+
+    from nonebot_plugin_deepseek.metrics import metrics
+    from nonebot_plugin_deepseek.outbound import outbound
+
+    report = LoadReport()
+    server = None
+    if args.transport == "asgi":
+        httpx.AsyncClient = functools.partial(httpx.AsyncClient, transport=httpx.ASGITransport(mock))  # type: ignore
+    else:
+        server, server_task = await serve_tcp(mock, args.port)
+
+    driver = nonebot.get_driver()
+    async with driver._lifespan:
+        replies = Replies()
+        bot = make_bot(replies, args.ocr_delay)
+        rng = random.Random(args.seed)
+        users = []
+        for index in range(args.users):
+            private = rng.random() < args.private_ratio
+            group_id = None if private else FIRST_GROUP_ID + index % max(args.groups, 1)
+            users.append(SimUser(FIRST_USER_ID + index, group_id, rng.random() < args.command_ratio))
+
+        # 预热一轮，避免首次导入与模板构建计入结果
+        await run_user(SimUser(FIRST_USER_ID - 1, None, False), bot, replies, LoadReport(), _warmup(args), rng)
+        metrics.reset()
+
+        tracemalloc.start()
+        report.memory_start = tracemalloc.get_traced_memory()[0]
+        report.maxrss_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        sampler = asyncio.create_task(sample_sockets(report))
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(run_user(user, bot, replies, report, args, random.Random(args.seed + user.user_id)) for user in users)
+        )
+        report.elapsed = time.perf_counter() - start
+        for user in users:
+            await asyncio.gather(*user.tasks, return_exceptions=True)
+        sampler.cancel()
+        report.sockets.append(open_sockets())
+        report.memory_end, report.memory_peak = tracemalloc.get_traced_memory()
+        report.maxrss_end = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        tracemalloc.stop()
+        await outbound.close()
+
+    if server is not None:
+        server.should_exit = True
+        await server_task
+    return report
+
+
+def _warmup(args: argparse.Namespace) -> argparse.Namespace:
+    return argparse.Namespace(**{**vars(args), "turns": 1, "image_ratio": 0, "think_time": 0})
+
+
+def print_report(report: LoadReport, mock: MockDeepSeek) -> None:
+    from nonebot_plugin_deepseek.metrics import render_stats
+
+    ok = report.outcomes.get("ok", 0)
+    latencies = report.latencies
+    print(f"elapsed        {report.elapsed:.2f}s")
+    print(f"replies/s      {ok / report.elapsed if report.elapsed else 0:.1f}")
+    if latencies:
+        print(
+            "latency        "
+            + "  ".join(f"p{q * 100:.0f} {percentile(latencies, q) * 1e3:.0f}ms" for q in (0.5, 0.95, 0.99))
+            + f"  mean {statistics.mean(latencies) * 1e3:.0f}ms"
+        )
+    print("outcomes       " + "  ".join(f"{key} {value}" for key, value in sorted(report.outcomes.items())))
+    stats = mock.stats
+    print(
+        f"mock           {stats.completions} completions ({stats.streamed} streamed), {stats.errors} errors, "
+        f"{stats.rate_limited} rate limited, {stats.balance_queries} balance queries"
+    )
+    print(
+        f"memory         traced +{(report.memory_end - report.memory_start) / 1024:.0f} KiB "
+        f"(peak {report.memory_peak / 1024:.0f} KiB), "
+        f"maxrss +{(report.maxrss_end - report.maxrss_start) / 1024:.1f} MiB"
+    )
+    if report.sockets and report.sockets[0] >= 0:
+        print(f"open sockets   start {report.sockets[0]}  peak {max(report.sockets)}  end {report.sockets[-1]}")
+    print("plugin metrics")
+    for line in render_stats().splitlines():
+        print(f"  {line}")
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="concurrent simulated users")
+    parser.add_argument("--groups", type=int, default=4, help="groups the group users are spread over")
+    parser.add_argument("--turns", type=int, default=5, help="messages per user")
+    parser.add_argument("--private-ratio", type=float, default=0.25, help="share of users chatting in private")
+    parser.add_argument(
+        "--command-ratio", type=float, default=0.5, help="share of group users opening with /todeepseek"
+    )
+    parser.add_argument("--image-ratio", type=float, default=0, help="share of messages carrying an image (OCR)")
+    parser.add_argument("--ocr-delay", type=float, default=0.05)
+    parser.add_argument("--prompt-chars", type=int, default=200, help="upper bound of padding added to each message")
+    parser.add_argument("--think-time", type=float, default=0.2, help="upper bound of the pause between turns")
+    parser.add_argument("--stream", action="store_true", help="stream completions (sends reasoning as it arrives)")
+    parser.add_argument("--transport", choices=("asgi", "tcp"), default="asgi")
+    parser.add_argument("--port", type=int, default=0, help="port for --transport tcp, random when 0")
+    parser.add_argument("--record", default="", help="record model and tool calls to this archive (needs tcp)")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.record and args.transport != "tcp":
+        parser.error("--record needs --transport tcp (recording wraps the real HTTP transport)")
+    if args.stream and not args.reasoning_tokens:
+        args.reasoning_tokens = 20
+    args.port = args.port or free_port()
+
+    mock = MockDeepSeek(options_from(args))
+    base_url = "http://mock" if args.transport == "asgi" else f"http://127.0.0.1:{args.port}"
+    superusers = {str(FIRST_USER_ID + index) for index in range(-1, args.users)}
+    data_dir = tempfile.mkdtemp(prefix="deepseek-bench-")
+
+    from ._bootstrap import init
+
+    init(
+        {
+            "superusers": superusers,
+            "command_start": {"/"},
+            "localstore_cache_dir": f"{data_dir}/cache",
+            "localstore_config_dir": f"{data_dir}/config",
+            "localstore_data_dir": f"{data_dir}/data",
+        },
+        enable_models=[{"name": "deepseek-chat", "base_url": base_url}],
+        enable_send_thinking=args.stream,
+        send_rate=1000,
+        send_burst=1000,
+        record_path=os.path.abspath(args.record) if args.record else "",
+    )
+    report = asyncio.run(run(args, mock))
+    print_report(report, mock)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
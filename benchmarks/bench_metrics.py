@@ -0,0 +1,42 @@
+"""Cost of recording one metric sample on the hot path.
+
+Usage: python -m benchmarks.bench_metrics [iterations]
+
+Compares a histogram observation (with and without a label), a counter increment and the
+`time.perf_counter()` calls that surround every timed section.
+"""
+
+import sys
+import time
+
+from ._bootstrap import init
+
+
+def main(iterations: int) -> None:
+    init()
+    from nonebot_plugin_deepseek.metrics import Counter, Histogram
+
+    histogram = Histogram("bench_seconds", "bench")
+    labelled = Histogram("bench_labelled_seconds", "bench", label="model")
+    counter = Counter("bench_total", "bench", label="type")
+    cases = {
+        "perf_counter()": lambda: time.perf_counter(),
+        "histogram.observe": lambda: histogram.observe(0.3),
+        "histogram.observe(label)": lambda: labelled.observe(0.3, "deepseek-chat"),
+        "counter.inc(label)": lambda: counter.inc(10, "prompt"),
+    }
+    baseline = None
+    for name, case in {"empty call": lambda: None, **cases}.items():
+        start = time.perf_counter()
+        for _ in range(iterations):
+            case()
+        elapsed = (time.perf_counter() - start) / iterations * 1e9
+        if baseline is None:
+            baseline = elapsed
+            print(f"{name:>26}{elapsed:>10.0f} ns")
+        else:
+            print(f"{name:>26}{elapsed - baseline:>10.0f} ns (net)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,126 @@
+"""Micro-benchmark of FunctionRegistry per-call overhead.
+
+Usage: python -m benchmarks.bench_registry [tools]
+
+Compares the compiled schema/argument path against the previous behaviour, which rebuilt the
+tool schema list on every `to_json()` and re-walked the parameter spec on every call. The legacy
+converter has no equivalent for generic parameters, so only the compiled path is timed for them.
+"""
+
+import sys
+import json
+import timeit
+from typing import Any, Literal, Optional
+
+from ._bootstrap import init
+
+LEGACY_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", list: "array", dict: "object"}
+
+
+def legacy_to_json(registry) -> list:
+    result = []
+    for func_name, info in registry._registry.items():
+        properties = {}
+        required = []
+        for name, param in info["raw_parameters"].items():
+            properties[name] = {"type": LEGACY_TYPES.get(param["type"], "any"), "description": param["description"]}
+            if param["required"]:
+                required.append(name)
+        result.append(
+            {
+                "type": "function",
+                "function": {
+                    "name": func_name,
+                    "description": info["description"],
+                    "parameters": {"type": "object", "properties": properties, "required": required},
+                },
+            }
+        )
+    return result
+
+
+def legacy_convert_value(value: Any, param_type: type) -> Any:
+    if param_type is Any:
+        return value
+
+    if param_type is bool:
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str):
+            lower_val = value.lower()
+            if lower_val == "true":
+                return True
+            elif lower_val == "false":
+                return False
+            else:
+                raise ValueError(f"Invalid boolean string: {value}")
+        return bool(value)
+
+    try:
+        return param_type(value)
+    except (TypeError, ValueError):
+        if param_type in (int, float):
+            return param_type(str(value))
+        raise
+
+
+def legacy_convert(info: dict, args: dict[str, Any]) -> dict[str, Any]:
+    converted_args = {}
+    for param_name, param_spec in info["raw_parameters"].items():
+        if param_name not in args:
+            if param_spec["required"]:
+                raise ValueError(f"Missing required parameter: {param_name}")
+            continue
+        value = args[param_name]
+        param_type = param_spec["type"]
+        try:
+            converted_value = legacy_convert_value(value, param_type)
+        except Exception as e:
+            raise ValueError(f"Parameter '{param_name}' value {value} cannot be converted to {param_type}: {e}") from e
+        converted_args[param_name] = converted_value
+    return converted_args
+
+
+def main(tools: int) -> None:
+    init()
+    from nonebot_plugin_deepseek.function_call.registry import FunctionRegistry
+
+    registry = FunctionRegistry()
+    for i in range(tools):
+
+        def tool(query: str, limit: int = 10, ratio: float = 0.5, verbose: bool = False):
+            """示例工具
+
+            参数:
+                query: 查询内容
+                limit: 数量
+            """
+
+        registry.register(name=f"tool_{i}")(tool)
+
+    @registry.register(name="generic_tool")
+    def generic_tool(ids: list[int], mode: Literal["fast", "slow"], tags: Optional[dict[str, str]] = None): ...
+
+    info = registry._registry["tool_0"]
+    generic_info = registry._registry["generic_tool"]
+    generic_args = {"ids": ["1", 2, 3], "mode": "fast", "tags": {"a": "b"}}
+    args = json.loads('{"query": "deepseek", "limit": "5", "ratio": 0.25, "verbose": "true"}')
+    number = 20000
+
+    cases = {
+        "to_json (legacy rebuild)": lambda: legacy_to_json(registry),
+        "to_json (compiled)": registry.to_json,
+        "json.dumps(to_json) (legacy)": lambda: json.dumps(legacy_to_json(registry)),
+        "to_json_bytes (compiled)": registry.to_json_bytes,
+        "convert args (legacy)": lambda: legacy_convert(info, args),
+        "convert args (compiled)": lambda: info["convert"](args),
+        "convert generic args (compiled)": lambda: generic_info["convert"](generic_args),
+    }
+    print(f"{tools} registered tools, {number} iterations")
+    for name, func in cases.items():
+        elapsed = min(timeit.repeat(func, number=number, repeat=3))
+        print(f"{name:<32}{elapsed / number * 1e9:>10.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
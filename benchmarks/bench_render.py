@@ -0,0 +1,100 @@
+"""Markdown-to-image latency with a fresh page per reply, a warm page pool and a cache hit.
+
+Usage: python -m benchmarks.bench_render [replies] [concurrency]
+
+Uses a local stand-in for the headless browser whose costs approximate chromium: opening a page
+(~120 ms), loading the template and fonts (~80 ms) and a full-page screenshot (~30 ms per chunk).
+"""
+
+import sys
+import time
+import asyncio
+import tempfile
+from pathlib import Path
+
+PAGE_OPEN = 0.12
+TEMPLATE_LOAD = 0.08
+SCREENSHOT = 0.03
+
+REPLY = "\n\n".join(f"## 第 {index} 节\n\n" + "这是一段用于渲染的回复内容。" * 30 for index in range(8))
+
+
+class StandInPage:
+    async def set_content(self, html: str) -> None:
+        await asyncio.sleep(TEMPLATE_LOAD)
+
+    async def evaluate(self, expression: str, arg=None) -> None:
+        self.body = arg
+
+    async def screenshot(self, *, full_page: bool, type: str) -> bytes:
+        await asyncio.sleep(SCREENSHOT)
+        return self.body.encode()
+
+    async def close(self) -> None:
+        pass
+
+
+async def open_page(width: int) -> StandInPage:
+    await asyncio.sleep(PAGE_OPEN)
+    return StandInPage()
+
+
+async def fresh_page(text: str, index: int) -> None:
+    """每次回复新开页面并加载模板（`md_to_pic` 的原有做法）"""
+    from nonebot_plugin_deepseek.render import MarkdownRenderer
+
+    renderer = MarkdownRenderer(open_page, None, pool_size=1, chunk_chars=len(text) + 1)
+    async for _ in renderer.render(f"{text}\n\n{index}"):
+        pass
+    await renderer.close()
+
+
+async def measure(label: str, replies: int, concurrency: int, render) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await render(index)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(replies)))
+    total = time.perf_counter() - start
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{label:<24}{p50:>10.1f}{p95:>10.1f}{replies / total:>10.1f}")
+
+
+async def main(replies: int, concurrency: int) -> None:
+    from nonebot_plugin_deepseek.render import MarkdownRenderer
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pooled = MarkdownRenderer(open_page, Path(tmp), pool_size=concurrency)
+        await pooled.warm_up()
+
+        async def warm(index: int) -> None:
+            async for _ in pooled.render(f"{REPLY}\n\n{index}"):
+                pass
+
+        async def cached(index: int) -> None:
+            async for _ in pooled.render(f"{REPLY}\n\n{index}"):
+                pass
+
+        print(f"{replies} replies of {len(REPLY)} chars, concurrency {concurrency}")
+        print(f"{'':<24}{'p50 ms':>10}{'p95 ms':>10}{'reply/s':>10}")
+        await measure("fresh page per reply", replies, concurrency, lambda index: fresh_page(REPLY, index))
+        await measure("warm pool (chunked)", replies, concurrency, warm)
+        await measure("cache hit", replies, concurrency, cached)
+        await pooled.close()
+
+
+if __name__ == "__main__":
+    replies = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    from ._bootstrap import init
+
+    init()
+    asyncio.run(main(replies, concurrency))
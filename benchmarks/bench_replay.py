@@ -0,0 +1,161 @@
+"""Replay a recorded archive of model calls through `API.chat` with no network.
+
+Usage: python -m benchmarks.bench_replay ARCHIVE [--speed 1] [--concurrency 0]
+
+Record an archive by setting `deepseek__record_path` on a running bot (or on `bench_load --transport tcp`);
+each model call is stored with its request, time to first byte and the offsets of its response chunks,
+and each tool call with its arguments, result and duration. Replay re-issues every recorded request at its
+original relative time (divided by `--speed`) through `nonebot_plugin_deepseek.recorder.ReplayTransport`,
+which answers with the recorded response at the recorded pace. Tool calls are not executed again; their
+recorded time is reported alongside.
+
+Reports replay latency against the recorded latency (scaled by `--speed`), the client-side overhead
+between the two, unmatched requests, and the CPU time the process spent — so changes to request
+building, streaming and parsing can be compared end to end on the same traffic.
+"""
+
+import sys
+import gzip
+import json
+import time
+import asyncio
+import argparse
+import resource
+import functools
+import statistics
+from typing import Any
+from pathlib import Path
+from dataclasses import field, dataclass
+
+from .bench_load import percentile
+
+
+@dataclass
+class ReplayReport:
+    elapsed: float = 0
+    cpu: float = 0
+    recorded_span: float = 0
+    requests: int = 0
+    errors: int = 0
+    misses: int = 0
+    tool_calls: int = 0
+    tool_time: float = 0
+    latencies: list[float] = field(default_factory=list)
+    recorded: list[float] = field(default_factory=list)
+
+
+def read_archive(path: Path) -> list[dict[str, Any]]:
+    """与 `recorder.load_archive` 相同，但无需先初始化插件（启用的模型取决于录制内容）"""
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def cpu_time() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def replay_one(entry: dict[str, Any], delay: float, report: ReplayReport, speed: float) -> None:
+    from nonebot_plugin_deepseek.apis import API
+    from nonebot_plugin_deepseek.exception import RequestException
+
+    await asyncio.sleep(delay)
+    request = entry["request"]
+    start = time.perf_counter()
+    try:
+        await API.chat(
+            request["messages"],
+            model=request["model"],
+            tools=request.get("tools"),
+            tool_choice=request.get("tool_choice"),
+            on_reasoning=(lambda _: None) if request.get("stream") else None,
+        )
+    except RequestException:
+        report.errors += 1
+    report.latencies.append(time.perf_counter() - start)
+    report.recorded.append(entry["duration"] / speed)
+
+
+async def run(entries: list[dict[str, Any]], speed: float, concurrency: int) -> ReplayReport:
+    import httpx
+
+    from nonebot_plugin_deepseek.recorder import ReplayTransport
+
+    report = ReplayReport()
+    transport = ReplayTransport(entries, speed)
+    httpx.AsyncClient = functools.partial(httpx.AsyncClient, transport=transport)  # type: ignore
+
+    chats = [entry for entry in entries if entry.get("kind") == "chat"]
+    tools = [entry for entry in entries if entry.get("kind") == "tool"]
+    report.requests = len(chats)
+    report.tool_calls = len(tools)
+    report.tool_time = sum(entry["duration"] for entry in tools)
+    if entries:
+        first = min(entry["ts"] for entry in entries)
+        report.recorded_span = max(entry["ts"] + entry["duration"] for entry in entries) - first
+    else:
+        first = 0
+
+    if concurrency > 0:
+        # 不按原始时间，固定并发尽快回放
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(entry: dict[str, Any]) -> None:
+            async with semaphore:
+                await replay_one(entry, 0, report, speed)
+
+        jobs = [bounded(entry) for entry in chats]
+    else:
+        jobs = [replay_one(entry, (entry["ts"] - first) / speed, report, speed) for entry in chats]
+
+    cpu_start = cpu_time()
+    start = time.perf_counter()
+    await asyncio.gather(*jobs)
+    report.elapsed = time.perf_counter() - start
+    report.cpu = cpu_time() - cpu_start
+    report.misses = transport.misses
+    return report
+
+
+def print_report(report: ReplayReport, speed: float) -> None:
+    print(f"requests       {report.requests} ({report.errors} errors, {report.misses} unmatched)")
+    print(f"elapsed        {report.elapsed:.2f}s (recorded {report.recorded_span:.2f}s at speed {speed:g})")
+    cpu_per_request = report.cpu / report.requests * 1e3 if report.requests else 0
+    print(f"cpu            {report.cpu:.3f}s ({cpu_per_request:.2f}ms per request)")
+    for name, values in (("replay", report.latencies), ("recorded", report.recorded)):
+        if values:
+            print(
+                f"{name:<15}"
+                + "  ".join(f"p{q * 100:.0f} {percentile(values, q) * 1e3:.0f}ms" for q in (0.5, 0.95, 0.99))
+                + f"  mean {statistics.mean(values) * 1e3:.0f}ms"
+            )
+    overhead = [replayed - recorded for replayed, recorded in zip(report.latencies, report.recorded)]
+    if overhead:
+        print(
+            f"overhead       p50 {percentile(overhead, 0.5) * 1e3:.1f}ms  p95 {percentile(overhead, 0.95) * 1e3:.1f}ms"
+        )
+    print(f"tool calls     {report.tool_calls} (recorded {report.tool_time:.2f}s, not re-executed)")
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archive", type=Path, help="recorded JSONL archive (.gz for gzip)")
+    parser.add_argument("--speed", type=float, default=1, help="replay this many times faster than recorded")
+    parser.add_argument(
+        "--concurrency", type=int, default=0, help="ignore recorded times and replay with this many in flight"
+    )
+    args = parser.parse_args(argv)
+
+    entries = read_archive(args.archive)
+    models = sorted({entry["request"]["model"] for entry in entries if entry.get("kind") == "chat"})
+
+    from ._bootstrap import init
+
+    init(enable_models=[{"name": model, "base_url": "http://replay"} for model in models or ["deepseek-chat"]])
+    report = asyncio.run(run(entries, args.speed, args.concurrency))
+    print_report(report, args.speed)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
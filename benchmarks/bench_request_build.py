@@ -0,0 +1,83 @@
+"""Per-call overhead of building a chat completion request.
+
+Usage: python -m benchmarks.bench_request_build [models] [messages]
+
+Compares the previous `API.chat` preparation against the precompiled request templates. The
+legacy path looked the model up with a linear scan, ran `model_dump()`, merged the header dicts,
+rebuilt the message list and let httpx encode the whole body. Both variants end with an
+`httpx.Request`, so the difference is purely the per-call overhead.
+"""
+
+import sys
+import timeit
+
+import httpx
+
+from ._bootstrap import init
+
+
+def main(models: int, messages: int) -> None:
+    enable_models = [{"name": f"model-{index}", "temperature": 0.7} for index in range(models - 1)]
+    init(prompt="你是一个乐于助人的助手", enable_models=[*enable_models, {"name": "deepseek-chat", "temperature": 0.7}])
+    from nonebot_plugin_deepseek.config import config
+    from nonebot_plugin_deepseek.apis.template import templates, encode_json
+
+    templates.build()
+    model = "deepseek-chat"
+    legacy_headers = {"Accept": "application/json", "Authorization": f"Bearer {config.api_key}"}
+    history = [
+        {"role": "user" if index % 2 == 0 else "assistant", "content": f"第 {index} 条消息"}
+        for index in range(messages)
+    ]
+
+    def legacy_prepare() -> tuple[str, dict, bytes]:
+        model_config = config.get_model_config(model)
+        body = {
+            "messages": [{"content": config.prompt, "role": "system"}] + history
+            if config.prompt and model == "deepseek-chat"
+            else history,
+            "model": model,
+            **model_config.to_dict(),
+        }
+        headers = {**legacy_headers, "Content-Type": "application/json"}
+        return f"{model_config.base_url}/chat/completions", headers, encode_json(body)
+
+    def template_prepare() -> tuple[str, dict, bytes]:
+        template = templates.get(model)
+        return template.url, template.headers, template.body(encode_json(history)[1:-1])
+
+    def legacy() -> httpx.Request:
+        model_config = config.get_model_config(model)
+        body = {
+            "messages": [{"content": config.prompt, "role": "system"}] + history
+            if config.prompt and model == "deepseek-chat"
+            else history,
+            "model": model,
+            **model_config.to_dict(),
+        }
+        return httpx.Request(
+            "POST",
+            f"{model_config.base_url}/chat/completions",
+            headers={**legacy_headers, "Content-Type": "application/json"},
+            json=body,
+        )
+
+    def template() -> httpx.Request:
+        url, headers, body = template_prepare()
+        return httpx.Request("POST", url, headers=headers, content=body)
+
+    number = 20000
+    print(f"{models} enabled models, {messages} messages, {number} iterations")
+    cases = {
+        "prepare body (legacy)": legacy_prepare,
+        "prepare body (template)": template_prepare,
+        "httpx.Request (legacy)": legacy,
+        "httpx.Request (template)": template,
+    }
+    for name, func in cases.items():
+        elapsed = min(timeit.repeat(func, number=number, repeat=3))
+        print(f"{name:<28}{elapsed / number * 1e6:>10.2f} µs/call")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8, int(sys.argv[2]) if len(sys.argv) > 2 else 4)
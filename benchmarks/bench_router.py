@@ -0,0 +1,53 @@
+"""Cost of one `auto` routing decision (feature extraction plus endpoint selection).
+
+Usage: python -m benchmarks.bench_router [iterations]
+
+Routes a greeting, a code question, a maths question and a long pasted document across four
+enabled endpoints with live statistics, and reports the mean time per decision.
+"""
+
+import sys
+import time
+
+from ._bootstrap import init
+
+PROMPTS = {
+    "greeting": "你好呀",
+    "code": "这段代码为什么报错？\n```python\ndef f(x):\n    return x[0]\n```",
+    "math": "求解方程 x^2 + 3x - 4 = 0，并给出步骤",
+    "document": "这是一段很长的聊天记录，请帮我总结要点。\n" * 2000,
+}
+
+
+def main(iterations: int) -> None:
+    init(
+        enable_models=[
+            {"name": "deepseek-chat"},
+            {"name": "deepseek-reasoner"},
+            {"name": "mirror-chat", "base_url": "http://localhost:8000"},
+            {"name": "mirror-reasoner", "base_url": "http://localhost:8000"},
+        ],
+        router_reasoning_models=["deepseek-reasoner", "mirror-reasoner"],
+    )
+    from nonebot_plugin_deepseek.router import router, extract_features
+
+    for index, model in enumerate(("deepseek-chat", "deepseek-reasoner", "mirror-chat", "mirror-reasoner")):
+        router.observe(model, 1 + index, ok=index != 2)
+
+    print(f"{'prompt':>10}{'chars':>10}{'features µs':>14}{'route µs':>12}  model")
+    for name, text in PROMPTS.items():
+        start = time.perf_counter()
+        for _ in range(iterations):
+            features = extract_features(text, depth=3)
+        features_elapsed = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            decision = router.route(features)
+        route_elapsed = (time.perf_counter() - start) / iterations
+
+        print(f"{name:>10}{len(text):>10}{features_elapsed * 1e6:>14.1f}{route_elapsed * 1e6:>12.1f}  {decision.model}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
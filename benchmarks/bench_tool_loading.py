@@ -0,0 +1,71 @@
+"""Startup time of FunctionRegistry.load with and without the tool manifest.
+
+Usage: python -m benchmarks.bench_tool_loading [modules] [import_ms]
+
+Generates `modules` tool modules whose import costs about `import_ms` milliseconds (standing in
+for scrapers/parsers pulling in heavy dependencies) and reports the time `load()` takes eagerly,
+with a cold manifest (static inspection) and with a warm manifest (index hit).
+"""
+
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+from ._bootstrap import init
+
+TOOL_TEMPLATE = """
+import time
+from typing import Literal, Optional
+
+from nonebot_plugin_deepseek.function_call import registry
+
+time.sleep({import_seconds})  # simulated heavy import
+
+
+@registry.register()
+def tool_{index}(query: str, mode: Literal["fast", "full"] = "fast", limit: Optional[int] = None):
+    \"\"\"示例工具 {index}
+
+    参数:
+        query: 查询内容
+        mode: 模式
+    \"\"\"
+    return query
+"""
+
+
+def run(base_dir: Path, manifest, expected: int) -> float:
+    import nonebot_plugin_deepseek.function_call as function_call
+    from nonebot_plugin_deepseek.function_call.registry import FunctionRegistry
+
+    for name in [name for name in sys.modules if name.startswith("bench_tools.")]:
+        del sys.modules[name]
+    function_call.registry = FunctionRegistry()
+    start = time.perf_counter()
+    function_call.registry.load("bench_tools", base_dir=base_dir, manifest=manifest)
+    elapsed = time.perf_counter() - start
+    assert len(function_call.registry.to_json()) == expected
+    return elapsed * 1000
+
+
+if __name__ == "__main__":
+    modules = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    import_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    init()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_dir = Path(tmp)
+        package = base_dir / "bench_tools"
+        package.mkdir()
+        (package / "__init__.py").write_text("")
+        for index in range(modules):
+            (package / f"tool_{index}.py").write_text(
+                TOOL_TEMPLATE.format(index=index, import_seconds=import_ms / 1000)
+            )
+        manifest = base_dir / "manifest.json"
+
+        print(f"{modules} tool modules, ~{import_ms:.0f} ms import cost each")
+        print(f"{'eager import':<28}{run(base_dir, None, modules):>10.1f} ms")
+        print(f"{'manifest (cold, inspect)':<28}{run(base_dir, manifest, modules):>10.1f} ms")
+        print(f"{'manifest (warm, index hit)':<28}{run(base_dir, manifest, modules):>10.1f} ms")
@@ -0,0 +1,116 @@
+"""Benchmark web page extraction on large HTML documents.
+
+Usage: python -m benchmarks.bench_web_extract [page.html ...]
+
+Without arguments, synthetic pages shaped like real-world news/forum pages (deep nav trees,
+inline scripts, comment threads, ad slots) are generated. Pass saved HTML files to benchmark
+real pages instead.
+"""
+
+import sys
+import time
+import random
+import asyncio
+from pathlib import Path
+
+from ._bootstrap import init
+
+
+def synthetic_page(paragraphs: int, comments: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = "深度 求索 模型 推理 上下文 缓存 the quick brown fox jumps over lazy dog latency".split()
+
+    def sentence(n: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(n))
+
+    nav = "".join(f'<li class="menu-item"><a href="/c/{i}">{sentence(2)}</a></li>' for i in range(300))
+    scripts = "".join(f"<script>window.__d{i}={{{'x' * 2000!r}: {i}}};</script>" for i in range(40))
+    body = "".join(f"<p>{sentence(rng.randint(30, 120))}</p>" for _ in range(paragraphs))
+    ads = "".join(f'<div class="ad-slot">{sentence(10)}</div>' for _ in range(50))
+    thread = "".join(
+        f'<div class="comment"><span class="author">u{i}</span><p>{sentence(25)}</p></div>' for i in range(comments)
+    )
+    return (
+        f"<html><head><title>{sentence(6)}</title>{scripts}<style>{'.a{color:red}' * 5000}</style></head>"
+        f'<body><header><nav class="navbar"><ul>{nav}</ul></nav></header>'
+        f'<main><article><h1>{sentence(8)}</h1>{body}</article><aside class="sidebar">{ads}</aside></main>'
+        f'<section class="comments">{thread}</section><footer>{sentence(40)}</footer></body></html>'
+    )
+
+
+def legacy(html: str) -> str:
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html, "html.parser").get_text()
+
+
+def best_of(func, rounds: int = 3):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return result, min(timings) * 1000
+
+
+async def max_loop_stall(work) -> float:
+    """Run `work` while a ticker measures the longest event loop stall."""
+    stall = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal stall
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            stall = max(stall, now - last - 0.005)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    await work()
+    done = True
+    await task
+    return stall
+
+
+async def main(paths: list[str]) -> None:
+    init()
+    from nonebot_plugin_deepseek.web import extract_main_content
+    from nonebot_plugin_deepseek.utils import estimate_tokens, truncate_to_tokens
+
+    if paths:
+        pages = {Path(p).name: Path(p).read_text(errors="replace") for p in paths}
+    else:
+        pages = {
+            "article-200KB": synthetic_page(200, 100),
+            "article-1MB": synthetic_page(1500, 800),
+            "forum-4MB": synthetic_page(3000, 8000),
+        }
+
+    extract_main_content(synthetic_page(1, 1))  # warm up regex and selector caches
+    print(
+        f"{'page':<16}{'size':>10}{'legacy ms':>12}{'legacy tok':>12}{'new ms':>10}{'new tok':>10}"
+        f"{'inline stall':>14}{'thread stall':>14}"
+    )
+    for name, html in pages.items():
+        old, legacy_ms = best_of(lambda: legacy(html))
+        new, new_ms = best_of(lambda: truncate_to_tokens(extract_main_content(html), 3000))
+
+        async def inline():
+            extract_main_content(html)
+
+        async def threaded():
+            await asyncio.to_thread(extract_main_content, html)
+
+        inline_stall = await max_loop_stall(inline) * 1000
+        thread_stall = await max_loop_stall(threaded) * 1000
+        print(
+            f"{name:<16}{len(html) // 1024:>8}KB{legacy_ms:>12.1f}{estimate_tokens(old):>12}{new_ms:>10.1f}"
+            f"{estimate_tokens(new):>10}{inline_stall:>12.1f}ms{thread_stall:>12.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,201 @@
+"""A local ASGI stand-in for the DeepSeek API, used by the load and endpoint benchmarks.
+
+Usage: python -m benchmarks.mock_deepseek [--port 8000] [--latency 0.5] [--stream-delay 0.02] ...
+
+Serves `POST /chat/completions` (plain JSON or SSE when the request sets `"stream": true`) and
+`GET /user/balance`. Latency, per-token streaming delay, error and 429 rates are configurable
+and seeded, so runs are repeatable. Any ASGI server can host it; the benchmarks either mount it
+in-process through `httpx.ASGITransport` or serve it with uvicorn on a local port.
+"""
+
+import json
+import random
+import asyncio
+import argparse
+from typing import Any, Optional
+from collections.abc import Callable, Awaitable
+from dataclasses import field, asdict, dataclass
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class MockOptions:
+    latency: float = 0.2
+    """Seconds before the first byte of a completion"""
+    jitter: float = 0.1
+    """Uniform random spread added to `latency` (0 to `jitter` seconds)"""
+    completion_tokens: int = 40
+    """Tokens in each reply; streamed as one SSE event per token"""
+    reasoning_tokens: int = 0
+    """Reasoning tokens streamed before the reply, as `deepseek-reasoner` does"""
+    stream_delay: float = 0.005
+    """Seconds between two streamed tokens"""
+    error_rate: float = 0.0
+    """Share of completions answered with HTTP 500"""
+    rate_limit_rate: float = 0.0
+    """Share of completions answered with HTTP 429"""
+    balance: float = 100.0
+    seed: int = 0
+
+
+@dataclass
+class MockStats:
+    requests: int = 0
+    completions: int = 0
+    streamed: int = 0
+    errors: int = 0
+    rate_limited: int = 0
+    balance_queries: int = 0
+    models: dict[str, int] = field(default_factory=dict)
+
+
+class MockDeepSeek:
+    def __init__(self, options: Optional[MockOptions] = None) -> None:
+        self.options = options or MockOptions()
+        self.stats = MockStats()
+        self.random = random.Random(self.options.seed)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            while (await receive())["type"] != "lifespan.shutdown":
+                await send({"type": "lifespan.startup.complete"})
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+        self.stats.requests += 1
+        path = scope["path"].rstrip("/")
+        if scope["method"] == "GET" and path.endswith("/user/balance"):
+            self.stats.balance_queries += 1
+            await self._json(send, 200, self._balance())
+        elif scope["method"] == "POST" and path.endswith("/chat/completions"):
+            await self._completion(receive, send)
+        else:
+            await self._json(send, 404, {"error": {"message": "Not Found", "type": "invalid_request_error"}})
+
+    async def _read_body(self, receive: Receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def _json(self, send: Send, status: int, payload: dict, headers: Optional[list] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", b"application/json"), *(headers or [])],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    def _balance(self) -> dict:
+        total = f"{self.options.balance:.2f}"
+        return {
+            "is_available": self.options.balance > 0,
+            "balance_infos": [
+                {"currency": "CNY", "total_balance": total, "granted_balance": "0.00", "topped_up_balance": total}
+            ],
+        }
+
+    def _usage(self, prompt_tokens: int) -> dict:
+        completion_tokens = self.options.completion_tokens + self.options.reasoning_tokens
+        hit = prompt_tokens // 2
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_cache_hit_tokens": hit,
+            "prompt_cache_miss_tokens": prompt_tokens - hit,
+            "completion_tokens_details": {"reasoning_tokens": self.options.reasoning_tokens},
+        }
+
+    async def _completion(self, receive: Receive, send: Send) -> None:
+        request = json.loads(await self._read_body(receive))
+        model = request.get("model", "deepseek-chat")
+        self.stats.models[model] = self.stats.models.get(model, 0) + 1
+        options = self.options
+        await asyncio.sleep(options.latency + self.random.random() * options.jitter)
+
+        roll = self.random.random()
+        if roll < options.rate_limit_rate:
+            self.stats.rate_limited += 1
+            await self._json(
+                send,
+                429,
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                [(b"retry-after", b"1")],
+            )
+            return
+        if roll < options.rate_limit_rate + options.error_rate:
+            self.stats.errors += 1
+            await self._json(send, 500, {"error": {"message": "Internal server error", "type": "server_error"}})
+            return
+
+        self.stats.completions += 1
+        prompt_tokens = sum(len(str(message.get("content") or "")) for message in request.get("messages", []))
+        content = "".join(f"词{index}" for index in range(options.completion_tokens))
+        base = {"id": f"mock-{self.stats.requests}", "created": 0, "model": model}
+        if not request.get("stream"):
+            message: dict[str, Any] = {"role": "assistant", "content": content}
+            if options.reasoning_tokens:
+                message["reasoning_content"] = "想" * options.reasoning_tokens
+            await self._json(
+                send,
+                200,
+                {
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [{"index": 0, "finish_reason": "stop", "message": message}],
+                    "usage": self._usage(prompt_tokens),
+                },
+            )
+            return
+
+        self.stats.streamed += 1
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]})
+        deltas = [{"reasoning_content": "想"}] * options.reasoning_tokens + [
+            {"content": f"词{index}"} for index in range(options.completion_tokens)
+        ]
+        for index, delta in enumerate(deltas):
+            if index:
+                await asyncio.sleep(options.stream_delay)
+            chunk = {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": delta}]}
+            await send({"type": "http.response.body", "body": _sse(chunk), "more_body": True})
+        final = {
+            **base,
+            "object": "chat.completion.chunk",
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": self._usage(prompt_tokens),
+        }
+        await send({"type": "http.response.body", "body": _sse(final) + b"data: [DONE]\n\n"})
+
+
+def _sse(chunk: dict) -> bytes:
+    return b"data: " + json.dumps(chunk, ensure_ascii=False).encode() + b"\n\n"
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Expose every `MockOptions` field as a `--flag`, shared by the benchmarks that embed the mock"""
+    for name, default in asdict(MockOptions()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+
+
+def options_from(args: argparse.Namespace) -> MockOptions:
+    return MockOptions(**{name: getattr(args, name) for name in asdict(MockOptions())})
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(MockDeepSeek(options_from(args)), host=args.host, port=args.port, log_level="warning")
@@ -1,6 +1,7 @@
 from dataclasses import asdict
 from importlib.util import find_spec
 import asyncio
+import time
 from typing import Optional, Dict, Set
 import uuid
 
@@ -37,11 +38,23 @@ from nonebot_plugin_alconna import (
 
 from .apis import API
 from . import hook as hook
-from .function_call import registry
-from .exception import RequestException
+from .function_call import ToolBudget, registry
+from .exception import QuotaExceeded, RequestException
 from .extension import CleanDocExtension
 from .utils import extract_content_and_think
-from .config import Config, config, model_config
+from .render import get_renderer
+from .tts import synthesizer
+from .semantic_cache import semantic_cache
+from .outbound import outbound
+from .history import MessageHistory
+from .compaction import compactor
+from .thinking import ReasoningStreamer
+from .router import router, extract_features
+from .ledger import ledger, today, render_quota, render_rollup
+from .tracing import span, tracer, render_list, export_trace, render_timeline
+from .metrics import errors, ocr_latency, render_stats, cancellations
+from .dashboard import balance_monitor, render_dashboard
+from .config import AUTO_MODEL, Config, config, tts_config, model_config, config_snapshot
 
 # 重构：使用对话会话管理替代单用户锁
 active_sessions: Dict[str, Dict] = {}  # session_id -> session_data
@@ -62,8 +75,18 @@ __plugin_meta__ = PluginMetadata(
     },
 )
 
-if not config.md_to_pic:
-    is_to_pic = False
+if config.md_to_pic and find_spec("nonebot_plugin_htmlrender"):
+    require("nonebot_plugin_htmlrender")
+
+
+def selectable_models() -> list[str]:
+    """可选的模型，启用的模型可能随配置热重载变化，因此在处理指令时读取，而不是固定在指令参数中"""
+    return [*config.get_enable_models(), AUTO_MODEL]
+
+
+def model_completion() -> str:
+    return f"请输入模型名，预期为：{selectable_models()} 其中之一"
+
 
 ns = Namespace("deepseek", disable_builtin_options=set())
 alc_config.namespaces["deepseek"] = ns
@@ -74,31 +97,38 @@ deepseek = on_alconna(
         Args["content?#内容", MultiVar("str")],
         Option(
             "--use-model",
-            Args[
-                "model#模型名称",
-                config.get_enable_models(),
-                Field(completion=lambda: f"请输入模型名，预期为：{config.get_enable_models()} 其中之一"),
-            ],
+            Args["model#模型名称", str, Field(completion=model_completion)],
             help_text="指定模型",
         ),
         Option("--with-context", help_text="启用多轮对话"),
+        Option("--use-tts", help_text="以语音回复"),
         Option("--force-stop", help_text="强制中断当前对话"),
         Subcommand("--balance", help_text="查看余额"),
+        Subcommand("stats", help_text="查看运行指标"),
+        Subcommand("usage", Args["day?#日期（YYYY-MM-DD）", str], help_text="查看当日用量与配额"),
+        Subcommand(
+            "trace",
+            Args["key?#序号或会话 ID", str],
+            Option("--json", help_text="导出为 Chrome Trace 格式的文件"),
+            help_text="查看耗时最长的对话及其各阶段耗时",
+        ),
         Subcommand(
             "model",
             Option("-l|--list", help_text="支持的模型列表"),
             Option(
                 "--set-default",
-                Args[
-                    "model#模型名称",
-                    config.get_enable_models(),
-                    Field(completion=lambda: f"请输入模型名，预期为：{config.get_enable_models()} 其中之一"),
-                ],
+                Args["model#模型名称", str, Field(completion=model_completion)],
                 dest="set",
                 help_text="设置默认模型",
             ),
             help_text="模型相关设置",
         ),
+        Subcommand(
+            "tts",
+            Option("-l|--list", help_text="可用的语音列表"),
+            Option("--set-default", Args["voice#语音（模型-说话人）", str], dest="set", help_text="设置默认语音"),
+            help_text="语音相关设置",
+        ),
         namespace=alc_config.namespaces["deepseek"],
         meta=CommandMeta(
             description=__plugin_meta__.description,
@@ -128,7 +158,10 @@ async def process_images(bot: Bot, event: Event) -> list[str]:
     for img in images:
         try:
             image_url = img.data["url"]
-            result = await bot.call_api("ocr_image", image=image_url)
+            start = time.perf_counter()
+            with span("ocr"):
+                result = await bot.call_api("ocr_image", image=image_url)
+            ocr_latency.observe(time.perf_counter() - start)
             
             # 处理不同的API返回格式
             if isinstance(result, list):
@@ -138,7 +171,7 @@ async def process_images(bot: Bot, event: Event) -> list[str]:
                     ocr_texts.extend(texts)
                     logger.success(f"成功识别图片内容：{texts}")
                 else:
-                    await bot.send(event, "未识别到图片中的文字", at_sender=True)
+                    await outbound.send(bot, event, "未识别到图片中的文字", at_sender=True, wait=False)
             elif isinstance(result, dict) and "texts" in result:
                 # 处理返回的是字典且包含texts键的情况
                 texts = [t.get("text", "") for t in result["texts"] if t.get("text")]
@@ -146,20 +179,46 @@ async def process_images(bot: Bot, event: Event) -> list[str]:
                     ocr_texts.extend(texts)
                     logger.success(f"成功识别图片内容：{texts}")
                 else:
-                    await bot.send(event, "未识别到图片中的文字", at_sender=True)
+                    await outbound.send(bot, event, "未识别到图片中的文字", at_sender=True, wait=False)
             else:
                 # 处理其他未知格式
                 logger.error(f"OCR API返回未知格式: {type(result)} - {result}")
-                await bot.send(event, "图片识别服务返回未知格式", at_sender=True)
+                await outbound.send(bot, event, "图片识别服务返回未知格式", at_sender=True, wait=False)
                 
         except httpx.ReadTimeout:
-            await bot.send(event, "图片识别超时，请重试", at_sender=True)
+            await outbound.send(bot, event, "图片识别超时，请重试", at_sender=True, wait=False)
         except Exception as e:
             logger.error(f"OCR识别失败: {e}")
-            await bot.send(event, f"图片识别失败：{str(e)}", at_sender=True)
+            await outbound.send(bot, event, f"图片识别失败：{str(e)}", at_sender=True, wait=False)
     
     return ocr_texts
 
+async def send_reply(bot: Bot, event: Event, output: str, voice: Optional[str] = None) -> None:
+    """发送回复，指定 `voice` 时逐段合成语音发送；启用 `md_to_pic` 时渲染为图片；失败则回退为文本"""
+    if voice:
+        sent = False
+        try:
+            async for audio in synthesizer.stream(output, voice):
+                await outbound.send(bot, event, UniMessage.voice(raw=audio))
+                sent = True
+            return
+        except Exception as e:
+            if sent:
+                raise
+            logger.warning(f"语音合成失败，回退为文本：{e}")
+    if renderer := get_renderer():
+        sent = False
+        try:
+            async for image in renderer.render(output):
+                await outbound.send(bot, event, UniMessage.image(raw=image), at_sender=not sent)
+                sent = True
+            return
+        except Exception as e:
+            if sent:
+                raise
+            logger.warning(f"Markdown 渲染失败，回退为文本：{e}")
+    await outbound.send(bot, event, output, at_sender=True)
+
 def create_session_id(user_id: str) -> str:
     """创建唯一的会话ID"""
     return f"{user_id}_{uuid.uuid4().hex[:8]}"
@@ -256,9 +315,9 @@ async def force_stop(
                 pass
     
     if cancelled_count > 0:
-        await bot.send(event, f"已强制中断 {cancelled_count} 个进行中的对话")
+        await outbound.send(bot, event, f"已强制中断 {cancelled_count} 个进行中的对话")
     else:
-        await bot.send(event, "当前没有进行中的对话")
+        await outbound.send(bot, event, "当前没有进行中的对话")
     
     await deepseek.finish()
 
@@ -268,13 +327,16 @@ async def handle_chat_core(
     matcher: Matcher,
     content: Match[tuple[str, ...]],
     model_name: Query[str],
-    is_superuser: bool
+    is_superuser: bool,
+    use_tts: bool = False,
 ):
     user_id = event.get_user_id()
     session_id = create_session_id(user_id)
     
     # 创建会话任务
     async def chat_task():
+        # 每轮对话（收到消息至发出回复）记录为一个 trace
+        trace = tracer.begin(session_id, user_id)
         try:
             # 处理图片内容
             text_input = []
@@ -286,10 +348,11 @@ async def handle_chat_core(
                     
                 # 使用简单的prompt，但添加取消检查
                 try:
-                    resp = await asyncio.wait_for(
-                        prompt("你想对 DeepSeek 说什么呢？（可以发送图片或文字）"), 
-                        timeout=600
-                    )
+                    with tracer.activate(trace), span("prompt"):
+                        resp = await asyncio.wait_for(
+                            prompt("你想对 DeepSeek 说什么呢？（可以发送图片或文字）"), 
+                            timeout=600
+                        )
                 except asyncio.TimeoutError:
                     if is_session_active(session_id):
                         await matcher.finish("等待超时")
@@ -315,35 +378,168 @@ async def handle_chat_core(
             if not is_session_active(session_id):
                 return
                 
-            ocr_texts = await process_images(bot, event)
+            with tracer.activate(trace):
+                ocr_texts = await process_images(bot, event)
             # 合并文本和图片内容
             combined_content = "\n".join(text_input + ocr_texts)
+            ocr_chars = sum(len(text) for text in ocr_texts)
             if not combined_content.strip():
                 await matcher.finish("请输入有效内容或发送包含文字的图片")
 
             if not model_name.available:
                 model_name.result = model_config.default_model
+            voice = model_config.default_tts() if use_tts and tts_config.enabled else None
+            if use_tts and not voice:
+                await outbound.send(bot, event, "未配置可用的语音，将以文字回复", at_sender=True, wait=False)
 
-            message = []
+            message = MessageHistory()
             if system_prompt := (config.prompt + (config.sub_prompt if is_superuser and config.sub_prompt else "")):
                 message.append({"role": "system", "content": system_prompt})
             message.append({"role": "user", "content": combined_content})
             logger.info(f"完整输入内容：{message}")
 
+            async def complete_turn() -> Optional[str]:
+                """完成一轮回复，期间按预算执行工具调用；会话被中止时返回 None"""
+                # 一轮回复内使用同一份配置，不受期间热重载的影响
+                turn_config = config_snapshot()
+                model = model_name.result
+                decision = None
+                if model == AUTO_MODEL:
+                    depth = sum(1 for item in message if item["role"] == "user")
+                    features = extract_features(message[-1]["content"], depth=depth, ocr_chars=ocr_chars)
+                    decision = router.route(features)
+                    model = decision.model
+                group_id = getattr(event, "group_id", None)
+                group_id = None if group_id is None else str(group_id)
+                # 只缓存不依赖上下文与图片的首轮提问，按群（私聊按用户）、模型与人设隔离
+                cache_scope = signature = None
+                question = message[-1]["content"]
+                first_question = all(item["role"] == "system" for item in message[:-1])
+                if turn_config.semantic_cache and first_question and not ocr_chars:
+                    # 过长的问题不参与缓存，签名只计算一次，未命中时原样用于写入
+                    signature = semantic_cache.signature(question)
+                if signature is not None:
+                    system_prompt = message[0]["content"] if message[0]["role"] == "system" else ""
+                    cache_scope = semantic_cache.scope(group_id or f"user:{user_id}", system_prompt, model)
+                    if (entry := semantic_cache.lookup(cache_scope, question, signature)) is not None:
+                        logger.info(f"会话 {session_id} 命中语义缓存：{entry.question!r}")
+                        semantic_cache.sample(entry, list(message), model, user_id, group_id)
+                        message.append({"role": "assistant", "content": entry.answer})
+                        return entry.answer
+                budget = (
+                    ToolBudget(turn_config.tool_max_rounds, turn_config.tool_turn_timeout, turn_config.tool_max_tokens)
+                    if turn_config.enable_function_call
+                    else None
+                )
+                while True:
+                    tool_choice = None
+                    if budget and (reason := budget.exhausted()):
+                        # 预算耗尽，强制模型不再调用工具，直接给出回复
+                        logger.warning(f"会话 {session_id} 工具调用预算耗尽：{reason}")
+                        tool_choice = "none"
+
+                    # 每次请求前检查配额，工具调用的后续请求同样计入
+                    if not is_superuser and (reason := ledger.check(user_id, group_id)):
+                        raise QuotaExceeded(reason)
+
+                    streamer = (
+                        ReasoningStreamer(bot, event, turn_config.thinking_interval, turn_config.thinking_max_chars)
+                        if turn_config.enable_send_thinking
+                        else None
+                    )
+                    start = time.perf_counter()
+                    # 工具调用后的请求不得超出本轮的剩余时长，超时则改为强制直接回复
+                    deadline = budget.remaining() if budget and budget.rounds and tool_choice is None else None
+                    try:
+                        with router.outcome(decision):
+                            completion = await API.chat(
+                                message,
+                                model=model,
+                                tools=registry.to_json_bytes() if budget else None,
+                                tool_choice=tool_choice,
+                                on_reasoning=streamer.feed if streamer else None,
+                                timeout=deadline,
+                            )
+                    except asyncio.TimeoutError:
+                        if deadline is None:
+                            raise
+                        logger.warning(f"会话 {session_id} 工具调用后的请求超过本轮剩余时长 {deadline:.1f} 秒")
+                        continue
+                    finally:
+                        if streamer:
+                            streamer.close()
+
+                    # 请求已完成即已计费，会话被中止时同样计入配额与用量
+                    ledger.record(model, completion.usage, user_id, group_id, time.perf_counter() - start)
+                    # 检查会话是否仍然活跃（API请求完成后）
+                    if not is_session_active(session_id):
+                        return None
+
+                    result = completion.choices[0].message
+                    ds_content, ds_think = extract_content_and_think(result)
+                    logger.info(ds_think)
+                    if streamer:
+                        await streamer.finish(ds_think)
+
+                    assistant_message: dict = {
+                        "role": "assistant",
+                        "content": ds_content,
+                    }
+                    if not (budget and result.tool_calls and tool_choice is None):
+                        message.append(assistant_message)
+                        # 经过工具调用的回复依赖工具结果（如时间、网页），不能复用
+                        if cache_scope and ds_content and not (budget and budget.rounds):
+                            semantic_cache.store(cache_scope, question, ds_content, signature)
+                        return ds_content if ds_content else "error:未获取到有效回复"
+
+                    budget.consume(completion.usage)
+                    budget.start_round()
+                    assistant_message["tool_calls"] = [
+                        {"id": tool_call.id, "type": tool_call.type, "function": asdict(tool_call.function)}
+                        for tool_call in result.tool_calls
+                    ]
+                    message.append(assistant_message)
+
+                    for tool_call in result.tool_calls:
+                        if (remaining := budget.remaining()) <= 0:
+                            # 已超出本轮时长，其余工具不再执行，下一次请求将强制直接回复
+                            fc_result = f"工具 {tool_call.function.name} 未执行：本轮对话已超时"
+                        elif (fc_result := budget.repeated(tool_call)) is None:
+                            fc_result = await registry.execute_tool_call(tool_call, timeout=remaining)
+                            # 检查会话是否仍然活跃（工具调用完成后）
+                            if not is_session_active(session_id):
+                                return None
+                            budget.remember(tool_call, fc_result)
+                        else:
+                            logger.warning(f"会话 {session_id} 重复调用工具 {tool_call.function.name}")
+
+                        message.append({
+                            "role": "tool",
+                            "tool_call_id": tool_call.id,
+                            "content": fc_result,
+                        })
+
             try:
                 async def handler(e: Event):
+                    nonlocal ocr_chars, trace
                     # 检查会话是否仍然活跃
                     if not is_session_active(session_id):
                         return False
                     
+                    # 用户仍在对话，推迟空闲压缩
+                    compactor.postpone(message)
+                    # 新一轮对话从收到后续消息时开始计时
+                    trace = tracer.begin(session_id, user_id)
                     # 处理多轮对话中的图片
-                    ocr_texts = await process_images(bot, e)
+                    with tracer.activate(trace):
+                        ocr_texts = await process_images(bot, e)
                     text = e.get_plaintext().strip().lower()
                     
                     if text in ["结束", "取消", "done"] and not ocr_texts:
                         return False
                     
                     combined = "\n".join([text] + ocr_texts)
+                    ocr_chars = sum(len(ocr_text) for ocr_text in ocr_texts)
                     return combined if combined else False
 
                 logger.info("已进入多轮对话")
@@ -358,7 +554,7 @@ async def handle_chat_core(
                     
                     if resp is False:
                         if is_session_active(session_id):
-                            await bot.send(event, "好的，再见！（微笑地挥手）", at_sender=True)
+                            await outbound.send(bot, event, "好的，再见！（微笑地挥手）", at_sender=True)
                         break
                     
                     if resp:
@@ -367,60 +563,37 @@ async def handle_chat_core(
                     # 检查会话是否仍然活跃
                     if not is_session_active(session_id):
                         break
-                        
-                    completion = await API.chat(message, model=model_name.result)
-                    
-                    # 检查会话是否仍然活跃（API请求完成后）
-                    if not is_session_active(session_id):
-                        break
-                        
-                    result = completion.choices[0].message
-                    ds_content, ds_think = extract_content_and_think(result)
-                    logger.info(ds_think)
 
-                    assistant_message = {
-                        "role": "assistant",
-                        "content": ds_content,
-                    }
-                    if result.tool_calls:
-                        assistant_message["tool_calls"] = result.tool_calls
-                    message.append(assistant_message)
-
-                    if result.tool_calls:
-                        # 检查会话是否仍然活跃
-                        if not is_session_active(session_id):
-                            break
-                            
-                        fc_result = await registry.execute_tool_call(result.tool_calls[0])
-                        
-                        # 检查会话是否仍然活跃（工具调用完成后）
-                        if not is_session_active(session_id):
+                    with tracer.activate(trace):
+                        output = await complete_turn()
+                        if output is None:
                             break
-                            
-                        message.append({
-                            "role": "tool",
-                            "tool_call_id": result.tool_calls[0].id,
-                            "content": fc_result,
-                        })
-                        continue
-
-                    # 检查会话是否仍然活跃
-                    if not is_session_active(session_id):
-                        break
-                        
-                    output = ds_content if ds_content else "error:未获取到有效回复"
-                    await bot.send(event, output, at_sender=True)
-
-            except httpx.ReadTimeout:
+                        await send_reply(bot, event, output, voice)
+                    tracer.finish(trace)
+                    # 回复发出后才开始计时，压缩在后台进行，不推迟回复
+                    group_id = getattr(event, "group_id", None)
+                    compactor.schedule(message, user_id, None if group_id is None else str(group_id))
+
+            except httpx.ReadTimeout as e:
+                tracer.finish(trace, error=type(e).__name__)
                 # 检查会话是否仍然活跃
                 if is_session_active(session_id):
-                    await bot.send(event, "请求超时，请重试", at_sender=True)
+                    await outbound.send(bot, event, "请求超时，请重试", at_sender=True)
+            except QuotaExceeded as e:
+                tracer.finish(trace, error=type(e).__name__)
+                if is_session_active(session_id):
+                    await matcher.finish(e.args[0])
             except RequestException as e:
+                tracer.finish(trace, error=type(e).__name__)
                 # 检查会话是否仍然活跃
                 if is_session_active(session_id):
                     await matcher.finish(str(e))
+            finally:
+                compactor.cancel(message)
                 
         except asyncio.CancelledError:
+            cancellations.inc()
+            tracer.finish(trace, error="cancelled")
             logger.info(f"会话 {session_id} 被取消")
             # 不重新抛出，让任务正常结束
         except Exception as e:
@@ -428,8 +601,10 @@ async def handle_chat_core(
             if is_session_active(session_id):
                 # 过滤 FinishedException
                 if "FinishedException" not in str(e):
+                    errors.inc(key=type(e).__name__)
+                    tracer.finish(trace, error=type(e).__name__)
                     logger.error(f"处理出错：{str(e)}")
-                    await bot.send(event, f"处理出错：{str(e)}", at_sender=True)
+                    await outbound.send(bot, event, f"处理出错：{str(e)}", at_sender=True)
         finally:
             # 清理会话
             unregister_session(session_id, user_id)
@@ -448,22 +623,53 @@ async def handle_chat_core(
 async def _(is_superuser: bool = Depends(SuperUser())):
     if not is_superuser:
         return
+    # 只读取后台刷新的缓存，缓存缺失或过期时在后台补刷，不等待上游接口
+    if balance_monitor.stale():
+        balance_monitor.refresh_soon()
+    await deepseek.finish(render_dashboard(balance_monitor, await ledger.rollup()))
+
+
+@deepseek.assign("stats")
+async def _(is_superuser: bool = Depends(SuperUser())):
+    if not is_superuser:
+        return
+    await deepseek.finish(render_stats())
+
+
+@deepseek.assign("usage")
+async def _(
+    event: Event,
+    is_superuser: bool = Depends(SuperUser()),
+    day: Query[str] = Query("usage.day"),
+):
+    group_id = getattr(event, "group_id", None)
+    quota = render_quota(ledger, event.get_user_id(), None if group_id is None else str(group_id))
+    if not is_superuser:
+        await deepseek.finish(quota)
+    # 规范化日期，同时避免以任意字符串拼接文件路径
     try:
-        balances = await API.query_balance()
-
-        await deepseek.finish(
-            "".join(
-                f"""
-                货币：{balance.currency}
-                总的可用余额: {balance.total_balance}
-                未过期的赠金余额: {balance.granted_balance}
-                充值余额: {balance.topped_up_balance}
-                """
-                for balance in balances.balance_infos
-            )
-        )
-    except ValueError as e:
-        await deepseek.finish(str(e))
+        date = time.strftime("%Y-%m-%d", time.strptime(day.result, "%Y-%m-%d")) if day.available else today()
+    except ValueError:
+        await deepseek.finish(f"日期格式应为 YYYY-MM-DD：{day.result}")
+    await deepseek.finish(f"{render_rollup(await ledger.rollup(date))}\n{quota}")
+
+
+@deepseek.assign("trace")
+async def _(
+    is_superuser: bool = Depends(SuperUser()),
+    key: Query[str] = Query("trace.key"),
+    export: Query[bool] = Query("trace.json.value", False),
+):
+    if not is_superuser:
+        return
+    if not key.available:
+        await deepseek.finish(f"耗时最长的对话：\n{render_list(tracer.ranked())}")
+    if (trace := tracer.find(key.result)) is None:
+        await deepseek.finish(f"未找到 trace：{key.result}")
+    if export.result:
+        path = await asyncio.to_thread(export_trace, trace)
+        await deepseek.finish(f"{render_timeline(trace)}\n已导出至 {path}")
+    await deepseek.finish(render_timeline(trace))
 
 
 @deepseek.assign("model.list")
@@ -472,6 +678,8 @@ async def _():
         f"- {model}（默认）" if model == model_config.default_model else f"- {model}"
         for model in config.get_enable_models()
     )
+    auto_default = "，默认" if model_config.default_model == AUTO_MODEL else ""
+    model_list += f"\n- auto（按问题复杂度与接口状态自动选择{auto_default}）"
     message = (
         f"支持的模型列表: \n{model_list}\n"
         "输入 `/deepseek [内容] --use-model [模型名]` 单次选择模型\n"
@@ -487,11 +695,42 @@ async def _(
 ):
     if not is_superuser:
         return
+    if model.result not in selectable_models():
+        await deepseek.finish(f"模型 {model.result} 未启用，预期为：{selectable_models()} 其中之一")
     model_config.default_model = model.result
     model_config.save()
     await deepseek.finish(f"已设置默认模型为：{model.result}")
 
 
+@deepseek.assign("tts.list")
+async def _():
+    if not tts_config.enabled or not model_config.available_tts_models:
+        await deepseek.finish("暂无可用的语音，请配置 TTS 服务后运行 `nb deepseek tts update`")
+    default = model_config.default_tts()
+    voices = "\n".join(
+        f"- {voice}（默认）" if voice == default else f"- {voice}" for voice in model_config.available_tts_models
+    )
+    await deepseek.finish(
+        f"可用的语音列表: \n{voices}\n"
+        "输入 `/deepseek [内容] --use-tts` 以语音回复\n"
+        "输入 `/deepseek tts --set-default [语音]` 设置默认语音"
+    )
+
+
+@deepseek.assign("tts.set")
+async def _(
+    is_superuser: bool = Depends(SuperUser()),
+    voice: Query[str] = Query("tts.set.voice"),
+):
+    if not is_superuser:
+        return
+    if voice.result not in model_config.available_tts_models:
+        await deepseek.finish(f"语音 {voice.result} 不可用，输入 `/deepseek tts --list` 查看可用的语音")
+    model_config.tts_model = voice.result
+    model_config.save()
+    await deepseek.finish(f"已设置默认语音为：{voice.result}")
+
+
 @deepseek.handle()
 async def _(
     bot:Bot,
@@ -499,10 +738,13 @@ async def _(
     matcher: Matcher,
     content: Match[tuple[str, ...]],
     model_name: Query[str] = Query("use-model.model"),
+    use_tts: Query[bool] = Query("use-tts.value", False),
     is_superuser: bool = Depends(SuperUser())
 ):
     if event.get_user_id() == "2702043878":
         return
+    if model_name.available and model_name.result not in selectable_models():
+        await deepseek.finish(f"模型 {model_name.result} 未启用，预期为：{selectable_models()} 其中之一")
     logger.info("已触发群聊对话")
     await handle_chat_core(
         bot=bot,
@@ -510,7 +752,8 @@ async def _(
         matcher=matcher,
         content=content,
         model_name=model_name,
-        is_superuser=is_superuser
+        is_superuser=is_superuser,
+        use_tts=use_tts.result,
     )
 
 # 修复：使用状态标记避免重复触发
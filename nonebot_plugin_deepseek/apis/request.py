@@ -1,51 +1,176 @@
+import json
+import time
+import asyncio
+from collections.abc import Callable
+from typing import Any, Union, Literal, Optional
+
 import httpx
 from nonebot.log import logger
 
-from ..config import config
-
-# from ..function_call import registry
-from ..exception import RequestException
+from ..tracing import span
+from ..router import router
+from .stream import ChatStream
+from ..recorder import recorder
+from ..history import MessageHistory
+from ..config import config, tts_config
 from ..schemas import Balance, ChatCompletions
+from ..exception import RateLimited, RequestException
+from .template import RequestTemplate, templates, encode_json
+from ..metrics import errors, first_token, record_usage, prompt_assembly, completion_latency
+
+
+def _error_message(response: httpx.Response) -> str:
+    try:
+        return response.json()["error"]["message"]
+    except (ValueError, KeyError, TypeError):
+        return f"HTTP {response.status_code}"
+
+
+def _raise_for_error(response: httpx.Response) -> None:
+    if response.status_code == 429:
+        try:
+            retry_after: Optional[float] = float(response.headers.get("retry-after", ""))
+        except ValueError:
+            retry_after = None
+        raise RateLimited(_error_message(response), retry_after)
+    if response.is_error:
+        raise RequestException(_error_message(response))
 
 
 class API:
-    _headers = {
-        "Accept": "application/json",
-        "Authorization": f"Bearer {config.api_key}",
-    }
-
-    @classmethod
-    async def chat(cls, message: list[dict[str, str]], model: str = "deepseek-chat") -> ChatCompletions:
-        """普通对话"""
-        model_config = config.get_model_config(model)
-        json = {
-            "messages": [{"content": config.prompt, "role": "system"}] + message
-            if config.prompt and model == "deepseek-chat"
-            else message,
-            "model": model,
-            **model_config.to_dict(),
-        }
-        logger.debug(f"使用模型 {model}，配置：{json}")
-        # if model == "deepseek-chat":
-        #     json.update({"tools": registry.to_json()})
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{model_config.base_url}/chat/completions",
-                headers={**cls._headers, "Content-Type": "application/json"},
-                json=json,
-                timeout=600,
+    @classmethod
+    async def chat(
+        cls,
+        message: Union[list[dict[str, Any]], MessageHistory],
+        model: str = "deepseek-chat",
+        tools: Optional[Union[list[dict], bytes]] = None,
+        tool_choice: Optional[Literal["none", "auto", "required"]] = None,
+        on_reasoning: Optional[Callable[[str], None]] = None,
+        timeout: Optional[float] = None,
+    ) -> ChatCompletions:
+        """普通对话
+
+        参数:
+            message: 对话消息，传入 `MessageHistory` 时直接使用其缓存的编码
+            tools: 提供给模型的工具列表，可传入预编码的 JSON
+            tool_choice: 工具选择策略，`none` 时模型不会调用工具
+            on_reasoning: 指定时以流式请求，每收到一段推理内容即以其调用，回调中不应阻塞
+            timeout: 整个请求的时长上限（秒），超出时抛出 `asyncio.TimeoutError`
+        """
+        with span("chat", model=model, stream=on_reasoning is not None) as attrs:
+            start = time.perf_counter()
+            template = templates.get(model)
+            body = template.body(
+                message.encoded() if isinstance(message, MessageHistory) else encode_json(message)[1:-1],
+                tools=encode_json(tools) if isinstance(tools, list) else tools,
+                tool_choice=tool_choice,
+                stream=on_reasoning is not None,
             )
+            prompt_assembly.observe(time.perf_counter() - start)
+            attrs["bytes"] = len(body)
+            logger.debug(f"使用模型 {model}，请求体 {len(body)} 字节")
+            try:
+                with router.track(model):
+                    request = (
+                        cls._chat_stream(template, body, on_reasoning)
+                        if on_reasoning
+                        else cls._chat_once(template, body)
+                    )
+                    completion = await asyncio.wait_for(request, timeout)
+            except Exception as e:
+                errors.inc(key=type(e).__name__)
+                raise
+            completion_latency.observe(time.perf_counter() - start, model)
+            record_usage(completion.usage)
+            if completion.usage:
+                attrs["tokens"] = completion.usage.total_tokens
+        return completion
+
+    @classmethod
+    async def _chat_once(cls, template: RequestTemplate, body: bytes) -> ChatCompletions:
+        async with recorder.client() as client:
+            response = await client.post(template.url, headers=template.headers, content=body, timeout=600)
+        _raise_for_error(response)
         if error := response.json().get("error"):
             raise RequestException(error["message"])
         return ChatCompletions(**response.json())
 
     @classmethod
-    async def query_balance(cls) -> Balance:
-        """查询账号余额"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{config.get_model_url('deepseek-chat')}/user/balance",
-                headers=cls._headers,
-            )
+    async def _chat_stream(
+        cls, template: RequestTemplate, body: bytes, on_reasoning: Callable[[str], None]
+    ) -> ChatCompletions:
+        stream = ChatStream()
+        start = time.perf_counter()
+        first = True
+        async with recorder.client() as client:
+            async with client.stream(
+                "POST", template.url, headers=template.headers, content=body, timeout=600
+            ) as response:
+                if response.is_error:
+                    await response.aread()
+                    _raise_for_error(response)
+                async for line in response.aiter_lines():
+                    # 跳过 SSE 注释（如 `: keep-alive`）与空行
+                    if not line.startswith("data:"):
+                        continue
+                    if first:
+                        first_token.observe(time.perf_counter() - start, template.model)
+                        first = False
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    if reasoning := stream.feed(json.loads(data)):
+                        on_reasoning(reasoning)
+        return stream.completion()
+
+    @classmethod
+    async def query_balance(cls, model: Optional[str] = None) -> Balance:
+        """查询账号余额
 
+        参数:
+            model: 使用该模型的接口地址查询，默认为第一个启用的模型
+        """
+        template = templates.get(model or config.get_enable_models()[0])
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{template.base_url}/user/balance", headers=template.headers, timeout=30)
+        if response.is_error:
+            raise RequestException(_error_message(response))
         return Balance(**response.json())
+
+    @classmethod
+    async def _tts_post(cls, client: httpx.AsyncClient, path: str, payload: dict[str, Any]) -> httpx.Response:
+        if not tts_config.enabled:
+            raise RequestException("未配置 TTS 服务")
+        response = await client.post(f"{tts_config.base_url}{path}", headers=tts_config.headers, json=payload)
+        if response.is_error:
+            raise RequestException(_error_message(response))
+        return response
+
+    @classmethod
+    async def get_tts_models(cls) -> list[str]:
+        """获取 TTS 服务提供的模型"""
+        async with httpx.AsyncClient(timeout=30) as client:
+            response = await cls._tts_post(client, "/models", {})
+        return response.json()["models"]
+
+    @classmethod
+    async def get_tts_speakers(cls, model: str) -> list[str]:
+        """获取 TTS 模型的说话人"""
+        async with httpx.AsyncClient(timeout=30) as client:
+            response = await cls._tts_post(client, "/spks", {"model": model})
+        return response.json()["speakers"]
+
+    @classmethod
+    async def text_to_speech(cls, text: str, model: str, speaker: str) -> bytes:
+        """合成语音，服务可直接返回音频，或返回 `audio_url` 再行下载"""
+        with span("tts", model=model, chars=len(text)):
+            async with httpx.AsyncClient(timeout=120) as client:
+                response = await cls._tts_post(
+                    client, "/infer_single", {"model_name": model, "speaker_name": speaker, "text": text}
+                )
+                if response.headers.get("content-type", "").startswith("audio/"):
+                    return response.content
+                response = await client.get(response.json()["audio_url"])
+                if response.is_error:
+                    raise RequestException(f"下载合成的语音失败：HTTP {response.status_code}")
+                return response.content
@@ -0,0 +1,69 @@
+from typing import Any, Optional
+
+from ..schemas import ChatCompletions
+from ..exception import RequestException
+
+
+class ChatStream:
+    """将流式响应的增量块合并为完整的 `ChatCompletions`"""
+
+    def __init__(self) -> None:
+        self.meta: dict[str, Any] = {}
+        self.content: list[str] = []
+        self.reasoning: list[str] = []
+        self.tool_calls: dict[int, dict[str, Any]] = {}
+        self.finish_reason: Optional[str] = None
+        self.usage: Optional[dict[str, Any]] = None
+
+    def feed(self, chunk: dict[str, Any]) -> str:
+        """合并一个增量块，返回其中新增的推理内容"""
+        if error := chunk.get("error"):
+            raise RequestException(error["message"])
+        if not self.meta:
+            self.meta = {key: chunk[key] for key in ("id", "created", "model") if key in chunk}
+        if usage := chunk.get("usage"):
+            self.usage = usage
+
+        reasoning = ""
+        for choice in chunk.get("choices") or ():
+            delta = choice.get("delta") or {}
+            if content := delta.get("content"):
+                self.content.append(content)
+            if reasoning_content := delta.get("reasoning_content"):
+                self.reasoning.append(reasoning_content)
+                reasoning += reasoning_content
+            for tool_call in delta.get("tool_calls") or ():
+                entry = self.tool_calls.setdefault(
+                    tool_call.get("index", 0),
+                    {
+                        "index": tool_call.get("index", 0),
+                        "id": "",
+                        "type": "function",
+                        "function": {"name": "", "arguments": ""},
+                    },
+                )
+                if tool_call.get("id"):
+                    entry["id"] = tool_call["id"]
+                function = tool_call.get("function") or {}
+                entry["function"]["name"] += function.get("name") or ""
+                entry["function"]["arguments"] += function.get("arguments") or ""
+            if finish_reason := choice.get("finish_reason"):
+                self.finish_reason = finish_reason
+        return reasoning
+
+    def completion(self) -> ChatCompletions:
+        message: dict[str, Any] = {
+            "role": "assistant",
+            "content": "".join(self.content),
+            "reasoning_content": "".join(self.reasoning) or None,
+        }
+        if self.tool_calls:
+            message["tool_calls"] = [self.tool_calls[index] for index in sorted(self.tool_calls)]
+        return ChatCompletions(
+            id=self.meta.get("id", ""),
+            choices=[{"index": 0, "finish_reason": self.finish_reason or "stop", "message": message}],  # type: ignore
+            created=self.meta.get("created", 0),
+            model=self.meta.get("model", ""),
+            object="chat.completion",
+            usage=self.usage or {"completion_tokens": 0, "prompt_tokens": 0, "total_tokens": 0},  # type: ignore
+        )
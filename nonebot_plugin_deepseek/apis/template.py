@@ -0,0 +1,101 @@
+import json
+from typing import Any, Optional
+from dataclasses import dataclass
+
+from nonebot.log import logger
+
+from ..config import ScopedConfig, config
+
+_STREAM_FRAGMENT = b',"stream":true,"stream_options":{"include_usage":true}'
+
+
+def encode_json(value: Any) -> bytes:
+    """与 httpx 的 `json=` 参数相同的紧凑编码"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode()
+
+
+@dataclass(frozen=True)
+class RequestTemplate:
+    """单个模型预先解析好的请求模板"""
+
+    model: str
+    base_url: str
+    url: str
+    """`/chat/completions` 端点"""
+    headers: dict[str, str]
+    prefix: bytes
+    """请求体中 `messages` 数组之前的部分，包含模型名与静态采样参数"""
+    system: bytes
+    """预编码的系统提示消息，不需要时为空"""
+
+    def body(
+        self,
+        messages: bytes,
+        *,
+        tools: Optional[bytes] = None,
+        tool_choice: Optional[str] = None,
+        stream: bool = False,
+    ) -> bytes:
+        """拼接请求体
+
+        参数:
+            messages: 已编码的消息，为 JSON 数组去掉首尾方括号后的内容
+            tools: 已编码的工具列表
+        """
+        parts = [self.prefix, self.system]
+        if self.system and messages:
+            parts.append(b",")
+        parts += [messages, b"]"]
+        if tools:
+            parts += [b',"tools":', tools]
+            if tool_choice:
+                parts += [b',"tool_choice":', encode_json(tool_choice)]
+        if stream:
+            parts.append(_STREAM_FRAGMENT)
+        parts.append(b"}")
+        return b"".join(parts)
+
+
+class RequestTemplates:
+    """模型名到请求模板的映射，在启动与配置变更时重建"""
+
+    def __init__(self) -> None:
+        self._templates: dict[str, RequestTemplate] = {}
+
+    def build(self, scoped_config: Optional[ScopedConfig] = None) -> None:
+        scoped_config = scoped_config or config
+        headers = {
+            "Accept": "application/json",
+            "Authorization": f"Bearer {scoped_config.api_key}",
+            "Content-Type": "application/json",
+        }
+        templates = {}
+        for model in scoped_config.enable_models:
+            static = encode_json({"model": model.name, **model.to_dict()})
+            system = b""
+            # 与原有行为一致，仅 deepseek-chat 附加人设
+            if scoped_config.prompt and model.name == "deepseek-chat":
+                system = encode_json({"content": scoped_config.prompt, "role": "system"})
+            templates[model.name] = RequestTemplate(
+                model=model.name,
+                base_url=model.base_url,
+                url=f"{model.base_url}/chat/completions",
+                headers=headers,
+                prefix=static[:-1] + b',"messages":[',
+                system=system,
+            )
+            logger.debug(f"模型 {model.name} 请求参数：{static.decode()}")
+        # 整体替换，构建过程中的请求仍使用旧的映射
+        self._templates = templates
+
+    def get(self, model: str) -> RequestTemplate:
+        try:
+            return self._templates[model]
+        except KeyError:
+            if not self._templates:
+                self.build()
+                return self.get(model)
+            raise ValueError(f"Model {model} not enabled") from None
+
+
+templates = RequestTemplates()
@@ -3,6 +3,8 @@ from arclet.alconna import Argv, set_default_argv_type
 
 from ..version import __version__
 from .plugins.tts import TTSUpdate
+from .plugins.bench import Bench
+from .plugins.batch import BatchRun
 
 set_default_argv_type(Argv)
 deepseek = CommandLine(
@@ -13,3 +15,5 @@ deepseek = CommandLine(
     load_preset=True,
 )
 deepseek.add(TTSUpdate)
+deepseek.add(BatchRun)
+deepseek.add(Bench)
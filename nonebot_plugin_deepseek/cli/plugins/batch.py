@@ -0,0 +1,344 @@
+import os
+import json
+import time
+import random
+import asyncio
+from pathlib import Path
+from typing import Any, Union, Optional
+from contextlib import asynccontextmanager
+from dataclasses import field, asdict, dataclass
+from collections.abc import Callable, Iterator, AsyncIterator
+
+import httpx
+from clilte import BasePlugin, PluginMetadata
+from arclet.alconna.tools import RichConsoleFormatter
+from arclet.alconna import (
+    Args,
+    Option,
+    Alconna,
+    Arparma,
+    CommandMeta,
+)
+
+from ...apis import API
+from ...log import ds_logger
+from ...router import router, extract_features
+from ...config import AUTO_MODEL, config, model_config
+from ...exception import RateLimited, RequestException
+
+
+@dataclass
+class BatchItem:
+    id: str
+    messages: list[dict[str, Any]]
+    model: Optional[str] = None
+
+
+@dataclass
+class InvalidLine:
+    """无法解析的输入行，以行号为 id 写出错误后继续处理其余行"""
+
+    id: str
+    error: str
+
+
+def parse_item(line_no: int, data: dict[str, Any]) -> BatchItem:
+    """一行输入可以是 `{"prompt": ...}` 或 `{"messages": [...]}`，可选 `id`、`system` 与 `model`"""
+    if not isinstance(data, dict):
+        raise ValueError(f"第 {line_no} 行不是 JSON 对象")
+    if "messages" in data:
+        messages = list(data["messages"])
+    elif "prompt" in data:
+        messages = [{"role": "user", "content": str(data["prompt"])}]
+    else:
+        raise ValueError(f"第 {line_no} 行缺少 prompt 或 messages")
+    if system := data.get("system"):
+        messages.insert(0, {"role": "system", "content": system})
+    return BatchItem(str(data.get("id", line_no)), messages, data.get("model"))
+
+
+def iter_items(path: Path) -> Iterator[Union[BatchItem, InvalidLine]]:
+    """逐行读取输入，不一次性载入整个文件"""
+    with path.open(encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item: Union[BatchItem, InvalidLine] = parse_item(line_no, json.loads(line))
+            except json.JSONDecodeError as e:
+                item = InvalidLine(str(line_no), f"第 {line_no} 行不是有效的 JSON：{e}")
+            except ValueError as e:
+                item = InvalidLine(str(line_no), e.args[0])
+            yield item
+
+
+def completed_ids(path: Path) -> set[str]:
+    """输出文件兼作检查点：已成功写出的条目在续跑时跳过，失败的条目重新请求"""
+    done: set[str] = set()
+    if not path.exists():
+        return done
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 中断时可能留下写了一半的末行
+                continue
+            if "error" not in record:
+                done.add(record["id"])
+    return done
+
+
+def trim_partial_line(path: Path) -> None:
+    """截去中断时写了一半的末行，续跑追加的记录才会从新的一行开始"""
+    if not path.exists():
+        return
+    with path.open("rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            if (index := f.read(end - start).rfind(b"\n")) != -1:
+                f.truncate(start + index + 1)
+                return
+            end = start
+        f.truncate(0)
+
+
+class AdaptiveLimiter:
+    """并发上限随限流调整：收到 429 时减半并暂停发起新请求，之后每连续成功 `limit` 次加一，直至初始上限"""
+
+    def __init__(self, limit: int) -> None:
+        self.max_limit = limit
+        self.limit = limit
+        self.inflight = 0
+        self.paused_until = 0.0
+        self._successes = 0
+        self._cond: Optional[asyncio.Condition] = None
+
+    @property
+    def cond(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        async with self.cond:
+            while True:
+                if (delay := self.paused_until - time.monotonic()) > 0:
+                    try:
+                        await asyncio.wait_for(self.cond.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.inflight < self.limit:
+                    break
+                await self.cond.wait()
+            self.inflight += 1
+        try:
+            yield
+        finally:
+            async with self.cond:
+                self.inflight -= 1
+                self.cond.notify_all()
+
+    def throttle(self, retry_after: Optional[float], attempt: int) -> None:
+        self.limit = max(1, self.limit // 2)
+        self._successes = 0
+        delay = retry_after if retry_after is not None else min(60, 2**attempt) * random.uniform(0.5, 1)
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+    def success(self) -> None:
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.max_limit:
+            self.limit += 1
+            self._successes = 0
+
+
+@dataclass
+class BatchReport:
+    total: int = 0
+    skipped: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    rate_limited: int = 0
+    retries: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    elapsed: float = 0
+    final_limit: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+    def render(self) -> str:
+        ordered = sorted(self.latencies)
+
+        def pct(q: float) -> float:
+            return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0
+
+        elapsed = self.elapsed or 1e-9
+        return "\n".join(
+            [
+                f"共 {self.total} 条：成功 {self.succeeded}，失败 {self.failed}，续跑跳过 {self.skipped}",
+                f"耗时 {self.elapsed:.1f}s，{self.succeeded / elapsed:.2f} 条/s，"
+                f"{(self.prompt_tokens + self.completion_tokens) / elapsed:.0f} tokens/s",
+                f"tokens：输入 {self.prompt_tokens}，输出 {self.completion_tokens}",
+                f"延迟：p50 {pct(0.5):.2f}s，p95 {pct(0.95):.2f}s",
+                f"限流 {self.rate_limited} 次，重试 {self.retries} 次，结束时并发上限 {self.final_limit}",
+            ]
+        )
+
+
+def resolve_model(item: BatchItem, model: Optional[str]) -> str:
+    name = item.model or model or model_config.default_model
+    if name == AUTO_MODEL:
+        return router.route(extract_features(str(item.messages[-1].get("content", "")))).model
+    return name
+
+
+async def run_batch(
+    input_path: Path,
+    output_path: Path,
+    *,
+    model: Optional[str] = None,
+    concurrency: int = 4,
+    retries: int = 5,
+    restart: bool = False,
+) -> BatchReport:
+    """以有限并发将输入逐条交给 `API.chat`，每完成一条即追加写入输出"""
+    if model and model != AUTO_MODEL and model not in config.get_enable_models():
+        raise ValueError(f"模型 {model} 未启用")
+    report = BatchReport()
+    if restart:
+        output_path.unlink(missing_ok=True)
+    done = completed_ids(output_path)
+    trim_partial_line(output_path)
+    limiter = AdaptiveLimiter(concurrency)
+    queue: asyncio.Queue[Optional[BatchItem]] = asyncio.Queue(maxsize=concurrency * 2)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    out = output_path.open("a", encoding="utf-8")
+
+    def write(record: dict[str, Any]) -> None:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+    async def produce() -> None:
+        for item in iter_items(input_path):
+            report.total += 1
+            if item.id in done:
+                report.skipped += 1
+                continue
+            if isinstance(item, InvalidLine):
+                report.failed += 1
+                write({"id": item.id, "error": item.error, "attempts": 0})
+                continue
+            await queue.put(item)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def process(item: BatchItem) -> None:
+        name = resolve_model(item, model)
+        error = ""
+        for attempt in range(retries + 1):
+            if attempt:
+                report.retries += 1
+            async with limiter.slot():
+                start = time.perf_counter()
+                try:
+                    completion = await API.chat(item.messages, model=name)
+                except RateLimited as e:
+                    report.rate_limited += 1
+                    limiter.throttle(e.retry_after, attempt)
+                    error = e.args[0]
+                    continue
+                except ValueError as e:
+                    # 模型未启用等参数错误，重试也不会成功
+                    error = e.args[0] if e.args else type(e).__name__
+                    break
+                except (RequestException, httpx.HTTPError) as e:
+                    error = e.args[0] if e.args else type(e).__name__
+                else:
+                    latency = time.perf_counter() - start
+                    limiter.success()
+                    message = completion.choices[0].message
+                    usage = completion.usage
+                    if usage:
+                        report.prompt_tokens += usage.prompt_tokens
+                        report.completion_tokens += usage.completion_tokens
+                    report.latencies.append(latency)
+                    report.succeeded += 1
+                    write(
+                        {
+                            "id": item.id,
+                            "model": name,
+                            "content": message.content,
+                            "reasoning_content": message.reasoning_content,
+                            "usage": asdict(usage) if usage else None,
+                            "latency": round(latency, 3),
+                            "attempts": attempt + 1,
+                        }
+                    )
+                    return
+            # 其余错误在释放并发名额后按指数退避重试
+            if attempt < retries:
+                await asyncio.sleep(min(30, 2**attempt) * random.uniform(0.5, 1))
+        report.failed += 1
+        write({"id": item.id, "model": name, "error": str(error), "attempts": attempt + 1})
+
+    async def work() -> None:
+        while (item := await queue.get()) is not None:
+            await process(item)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+    finally:
+        out.close()
+        report.elapsed = time.perf_counter() - start
+        report.final_limit = limiter.limit
+    return report
+
+
+class BatchRun(BasePlugin):
+    def init(self) -> Union[Alconna, str]:
+        return Alconna(
+            "batch",
+            Args["input#输入的 JSONL 文件", str],
+            Option("-o|--output", Args["output#输出的 JSONL 文件", str], help_text="默认为输入文件名加 .out.jsonl"),
+            Option("-m|--model", Args["model#模型名称", str], help_text="未在输入中指定时使用的模型"),
+            Option("-c|--concurrency", Args["concurrency", int], help_text="最大并发请求数，默认为 4"),
+            Option("-r|--retries", Args["retries", int], help_text="每条的最大重试次数，默认为 5"),
+            Option("--restart", help_text="忽略已有输出，从头开始"),
+            meta=CommandMeta("以配置中的模型批量处理 JSONL 中的提示词，中断后再次运行即从断点继续"),
+            formatter_type=RichConsoleFormatter,
+        )
+
+    def meta(self) -> PluginMetadata:
+        return PluginMetadata("BatchRun", "0.0.1", "批量处理提示词", ["batch"], ["FrostN0v0"])
+
+    def dispatch(self, result: Arparma, next_: Optional[Callable[[], Any]] = None) -> Union[bool, None]:
+        if not result.find("batch"):
+            return next_() if next_ else True
+        input_path = Path(result.query[str]("batch.input", ""))
+        output = result.query[str]("batch.output.output")
+        output_path = Path(output) if output else input_path.with_suffix(".out.jsonl")
+        model_config.load()
+        try:
+            report = asyncio.run(
+                run_batch(
+                    input_path,
+                    output_path,
+                    model=result.query[str]("batch.model.model"),
+                    concurrency=max(1, result.query[int]("batch.concurrency.concurrency", 4)),
+                    retries=max(0, result.query[int]("batch.retries.retries", 5)),
+                    restart=result.find("batch.restart"),
+                )
+            )
+        except (OSError, ValueError) as e:
+            ds_logger("ERROR", f"批量处理失败：{e}")
+            return
+        ds_logger("SUCCESS", f"结果已写入 {output_path}\n{report.render()}")
+
+    @classmethod
+    def supply_options(cls) -> Union[list[Option], None]:
+        return
@@ -0,0 +1,268 @@
+import json
+import time
+import asyncio
+import statistics
+from pathlib import Path
+from collections.abc import Callable
+from typing import Any, Union, Optional
+from dataclasses import field, asdict, replace, dataclass
+
+import httpx
+from clilte import BasePlugin, PluginMetadata
+from arclet.alconna.tools import RichConsoleFormatter
+from arclet.alconna import (
+    Args,
+    Option,
+    Alconna,
+    Arparma,
+    CommandMeta,
+)
+
+from ...config import config
+from ...log import ds_logger
+from ...apis.template import RequestTemplate, templates, encode_json
+
+DEFAULT_PROMPTS = [
+    "你好",
+    "用一句话解释什么是 TCP 三次握手",
+    "写一个 Python 函数，判断字符串是否为回文，并给出两个测试用例",
+    "比较 HTTP/1.1、HTTP/2 与 HTTP/3 在连接复用、队头阻塞与握手延迟上的差异，分点说明，每点不超过两句话",
+]
+"""默认的提示词组合，覆盖从极短到中等长度的输入"""
+
+
+@dataclass
+class Sample:
+    """一次流式请求的各阶段耗时（秒）"""
+
+    connect: Optional[float] = None
+    """建立 TCP（及 TLS）连接的耗时，复用连接或非网络传输时为 `None`"""
+    ttft: Optional[float] = None
+    """发出请求至收到第一个内容或思维链片段"""
+    latency: float = 0
+    completion_tokens: int = 0
+    decode_rate: Optional[float] = None
+    """首个片段之后每秒生成的 token 数"""
+    error: Optional[str] = None
+
+
+@dataclass
+class StepResult:
+    model: str
+    base_url: str
+    concurrency: int
+    requests: int = 0
+    errors: int = 0
+    wall: float = 0
+    samples: list[Sample] = field(default_factory=list, repr=False)
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0
+
+    def percentile(self, name: str, q: float) -> Optional[float]:
+        values = sorted(value for sample in self.samples if (value := getattr(sample, name)) is not None)
+        return values[min(int(q * len(values)), len(values) - 1)] if values else None
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """单个请求的平均生成速度"""
+        rates = [sample.decode_rate for sample in self.samples if sample.decode_rate]
+        return statistics.mean(rates) if rates else None
+
+    @property
+    def throughput(self) -> float:
+        """该并发下所有请求合计每秒生成的 token 数"""
+        return sum(sample.completion_tokens for sample in self.samples) / self.wall if self.wall else 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "model": self.model,
+            "base_url": self.base_url,
+            "concurrency": self.concurrency,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.error_rate,
+            "connect_p50": self.percentile("connect", 0.5),
+            "ttft_p50": self.percentile("ttft", 0.5),
+            "ttft_p95": self.percentile("ttft", 0.95),
+            "latency_p50": self.percentile("latency", 0.5),
+            "latency_p95": self.percentile("latency", 0.95),
+            "tokens_per_second": self.tokens_per_second,
+            "throughput": self.throughput,
+            "samples": [asdict(sample) for sample in self.samples],
+        }
+
+
+async def probe(template: RequestTemplate, prompt: str, timeout: float = 120) -> Sample:
+    """以流式请求发送一条提示词，借助 httpcore 的 trace 事件区分连接耗时"""
+    sample = Sample()
+    marks: dict[str, float] = {}
+
+    async def trace(event: str, info: dict[str, Any]) -> None:
+        marks[event] = time.perf_counter()
+
+    body = template.body(encode_json({"role": "user", "content": prompt}), stream=True)
+    start = time.perf_counter()
+    first: Optional[float] = None
+    try:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            # 不计入客户端创建（载入 CA 证书）的耗时
+            start = time.perf_counter()
+            async with client.stream(
+                "POST", template.url, headers=template.headers, content=body, extensions={"trace": trace}
+            ) as response:
+                if response.is_error:
+                    sample.error = f"HTTP {response.status_code}"
+                    await response.aread()
+                else:
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:") or (data := line[5:].strip()) == "[DONE]":
+                            continue
+                        chunk = json.loads(data)
+                        delta = (chunk.get("choices") or [{}])[0].get("delta") or {}
+                        if first is None and (delta.get("content") or delta.get("reasoning_content")):
+                            first = time.perf_counter()
+                        if usage := chunk.get("usage"):
+                            sample.completion_tokens = usage.get("completion_tokens", 0)
+    except (httpx.HTTPError, ValueError) as e:
+        sample.error = type(e).__name__
+    end = time.perf_counter()
+    sample.latency = end - start
+    if connected := marks.get("connection.start_tls.complete") or marks.get("connection.connect_tcp.complete"):
+        sample.connect = connected - start
+    if first is not None:
+        sample.ttft = first - start
+        if end > first and sample.completion_tokens:
+            sample.decode_rate = sample.completion_tokens / (end - first)
+    return sample
+
+
+async def run_step(template: RequestTemplate, concurrency: int, rounds: int, prompts: list[str]) -> StepResult:
+    """`concurrency` 个并发的客户端各自连续发送 `rounds` 个请求"""
+    result = StepResult(template.model, template.base_url, concurrency)
+
+    async def client(index: int) -> None:
+        for round_ in range(rounds):
+            sample = await probe(template, prompts[(index * rounds + round_) % len(prompts)])
+            result.samples.append(sample)
+            result.requests += 1
+            result.errors += sample.error is not None
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(index) for index in range(concurrency)))
+    result.wall = time.perf_counter() - start
+    return result
+
+
+async def run_bench(
+    models: list[str],
+    steps: list[int],
+    *,
+    rounds: int = 3,
+    prompts: Optional[list[str]] = None,
+    base_url: Optional[str] = None,
+    on_step: Optional[Callable[[StepResult], None]] = None,
+) -> list[StepResult]:
+    """依次对每个模型的端点在各档并发下测量；`base_url` 用于改为测量本地的模拟服务等其他地址"""
+    results = []
+    for model in models:
+        template = templates.get(model)
+        if base_url:
+            base_url = base_url.rstrip("/")
+            template = replace(template, base_url=base_url, url=f"{base_url}/chat/completions")
+        for concurrency in steps:
+            result = await run_step(template, concurrency, rounds, prompts or DEFAULT_PROMPTS)
+            results.append(result)
+            if on_step:
+                on_step(result)
+    return results
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1e3:.0f}"
+
+
+def render_table(results: list[StepResult]) -> str:
+    header = ("模型", "并发", "请求", "错误率", "连接ms", "TTFT p50", "TTFT p95", "耗时 p95", "tok/s", "总 tok/s")
+    rows = [
+        (
+            result.model,
+            str(result.concurrency),
+            str(result.requests),
+            f"{result.error_rate:.0%}",
+            _ms(result.percentile("connect", 0.5)),
+            _ms(result.percentile("ttft", 0.5)),
+            _ms(result.percentile("ttft", 0.95)),
+            _ms(result.percentile("latency", 0.95)),
+            "-" if result.tokens_per_second is None else f"{result.tokens_per_second:.1f}",
+            f"{result.throughput:.1f}",
+        )
+        for result in results
+    ]
+    widths = [max(len(row[index]) for row in (header, *rows)) for index in range(len(header))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in (header, *rows))
+
+
+def load_prompts(path: Path) -> list[str]:
+    """每行一条提示词，JSONL 时读取 `prompt` 字段"""
+    prompts = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        prompts.append(json.loads(line)["prompt"] if line.lstrip().startswith("{") else line)
+    return prompts
+
+
+class Bench(BasePlugin):
+    def init(self) -> Union[Alconna, str]:
+        return Alconna(
+            "bench",
+            Option("-m|--models", Args["models#逗号分隔的模型名", str], help_text="默认为全部启用的模型"),
+            Option("-s|--steps", Args["steps#逗号分隔的并发数", str], help_text="默认为 1,4,8"),
+            Option("-n|--rounds", Args["rounds", int], help_text="每个并发客户端连续发送的请求数，默认为 3"),
+            Option("-p|--prompts", Args["prompts#提示词文件", str], help_text="每行一条，或含 prompt 字段的 JSONL"),
+            Option("--base-url", Args["base_url", str], help_text="改为测量该地址，如本地的模拟服务"),
+            Option("-o|--output", Args["output#结果文件", str], help_text="将结果写入 JSON 文件以便比较"),
+            meta=CommandMeta("测量各模型端点的连接耗时、首 token 延迟、生成速度与错误率"),
+            formatter_type=RichConsoleFormatter,
+        )
+
+    def meta(self) -> PluginMetadata:
+        return PluginMetadata("Bench", "0.0.1", "端点延迟与吞吐测量", ["bench"], ["FrostN0v0"])
+
+    def dispatch(self, result: Arparma, next_: Optional[Callable[[], Any]] = None) -> Union[bool, None]:
+        if not result.find("bench"):
+            return next_() if next_ else True
+        models = result.query[str]("bench.models.models")
+        steps = result.query[str]("bench.steps.steps", "1,4,8")
+        prompts_file = result.query[str]("bench.prompts.prompts")
+        output = result.query[str]("bench.output.output")
+        try:
+            model_names = models.split(",") if models else config.get_enable_models()
+            concurrency = [max(1, int(step)) for step in steps.split(",")]
+            prompts = load_prompts(Path(prompts_file)) if prompts_file else None
+            results = asyncio.run(
+                run_bench(
+                    model_names,
+                    concurrency,
+                    rounds=max(1, result.query[int]("bench.rounds.rounds", 3)),
+                    prompts=prompts,
+                    base_url=result.query[str]("bench.base_url.base_url"),
+                    on_step=lambda step: ds_logger(
+                        "INFO", f"{step.model} 并发 {step.concurrency}：{step.requests} 次请求，{step.errors} 次错误"
+                    ),
+                )
+            )
+        except (OSError, ValueError, KeyError) as e:
+            ds_logger("ERROR", f"测量失败：{e}")
+            return
+        ds_logger("SUCCESS", f"\n{render_table(results)}")
+        if output:
+            data = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": [result.to_dict() for result in results]}
+            Path(output).write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+            ds_logger("SUCCESS", f"结果已写入 {output}")
+
+    @classmethod
+    def supply_options(cls) -> Union[list[Option], None]:
+        return
@@ -1,5 +1,6 @@
 import asyncio
-from typing import Union
+from collections.abc import Callable
+from typing import Any, Union, Optional
 
 from clilte import BasePlugin, PluginMetadata
 from arclet.alconna.tools import RichConsoleFormatter
@@ -27,21 +28,29 @@ class TTSUpdate(BasePlugin):
     def meta(self) -> PluginMetadata:
         return PluginMetadata("TTSUpdate", "0.0.1", "更新 TTS 模型配置缓存", ["tts"], ["FrostN0v0"])
 
-    def dispatch(self, result: Arparma) -> Union[bool, None]:
+    def dispatch(self, result: Arparma, next_: Optional[Callable[[], Any]] = None) -> Union[bool, None]:
         if result.find("tts.update"):
+            if not tts_config.enabled:
+                tts_logger("ERROR", "未配置 TTS 服务（deepseek__tts_api_url）")
+                return
             available_models = asyncio.run(tts_config.get_available_tts())
             if available_models:
+                # 先读取已保存的设置，只更新语音列表
+                model_config.load()
                 model_config.available_tts_models = [
                     f"{model}-{spk}" for model, speakers in available_models.items() for spk in speakers
                 ]
                 model_config.tts_model_dict = available_models
                 model_config.save()
                 tts_logger("SUCCESS", f"Update available TTS models: {available_models}")
+            else:
+                tts_logger("WARNING", "未获取到可用的 TTS 模型")
             return
         if result.find("tts"):
             tts_logger("INFO", f"\n{self.command.get_help()}")
             return
-        return True
+        # 新版 clilte 以 `next_` 将解析结果交给下一个插件
+        return next_() if next_ else True
 
     @classmethod
     def supply_options(cls) -> Union[list[Option], None]:
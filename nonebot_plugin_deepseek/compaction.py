@@ -0,0 +1,141 @@
+import time
+import asyncio
+from typing import Any, Optional
+from collections.abc import Iterable
+
+import httpx
+from nonebot.log import logger
+
+from .apis import API
+from .config import config
+from .ledger import ledger
+from .history import MessageHistory
+from .exception import RequestException
+from .metrics import compactions, compaction_saved_tokens
+from .utils import estimate_tokens, truncate_to_tokens, extract_content_and_think
+
+SUMMARY_PREFIX = "以下是此前对话的摘要：\n"
+SUMMARY_PROMPT = (
+    "你负责压缩对话记录。请将下面的对话整理为一份简洁的摘要，供之后继续对话时参考："
+    "保留用户提供的事实、偏好与约定、已得出的结论以及尚未完成的事项，省略寒暄与重复内容；"
+    "以第三人称陈述，不超过 400 字，只输出摘要本身"
+)
+_ROLE_NAMES = {"system": "此前摘要", "user": "用户", "assistant": "助手", "tool": "工具结果"}
+_MESSAGE_MAX_TOKENS = 1000
+"""整理对话记录时每条消息保留的 token 数"""
+
+
+def history_tokens(messages: Iterable[dict[str, Any]]) -> int:
+    return sum(estimate_tokens(str(item.get("content") or "")) for item in messages)
+
+
+def render_transcript(messages: list[dict[str, Any]]) -> str:
+    lines = []
+    for item in messages:
+        content = str(item.get("content") or "")
+        if item["role"] == "system":
+            content = content.removeprefix(SUMMARY_PREFIX)
+        for tool_call in item.get("tool_calls") or ():
+            content += f"\n调用工具 {tool_call['function']['name']}({tool_call['function']['arguments']})"
+        if content := content.strip():
+            lines.append(
+                f"{_ROLE_NAMES.get(item['role'], item['role'])}：{truncate_to_tokens(content, _MESSAGE_MAX_TOKENS)}"
+            )
+    return "\n\n".join(lines)
+
+
+def resolve_model() -> str:
+    if config.compact_model:
+        return config.compact_model
+    models = config.get_enable_models()
+    return next((model for model in models if model not in config.router_reasoning_models), models[0])
+
+
+class Compactor:
+    """在多轮对话的空闲期压缩较早的对话
+
+    每次回复发出后计时，用户 `compact_idle_seconds` 内没有新消息且对话超过 token 阈值时，
+    由模型将人设之后、最近 `compact_keep_turns` 轮之前的消息总结为一条摘要并替换。
+    压缩在后台进行，不会推迟回复；压缩期间到来的消息只会追加在被替换的范围之后，
+    替换前再确认该范围未被改动
+    """
+
+    def __init__(self) -> None:
+        self._waiting: dict[MessageHistory, asyncio.Task] = {}
+        self._running: dict[MessageHistory, asyncio.Task] = {}
+
+    def schedule(self, history: MessageHistory, user_id: str, group_id: Optional[str]) -> None:
+        """一轮回复发出后调用，重新开始空闲计时"""
+        self.postpone(history)
+        threshold = config.compact_threshold_tokens
+        if not threshold or history in self._running or history_tokens(history) < threshold:
+            return
+        self._waiting[history] = asyncio.create_task(self._idle(history, user_id, group_id))
+
+    def postpone(self, history: MessageHistory) -> None:
+        """收到新消息时调用，取消尚在计时的压缩；已开始请求的压缩照常完成"""
+        if task := self._waiting.pop(history, None):
+            task.cancel()
+
+    def cancel(self, history: MessageHistory) -> None:
+        """对话结束时调用，历史不再使用，一并取消进行中的压缩"""
+        self.postpone(history)
+        if task := self._running.pop(history, None):
+            task.cancel()
+
+    async def _idle(self, history: MessageHistory, user_id: str, group_id: Optional[str]) -> None:
+        await asyncio.sleep(config.compact_idle_seconds)
+        self._waiting.pop(history, None)
+        self._running[history] = asyncio.current_task()
+        try:
+            await self.compact(history, user_id, group_id)
+        finally:
+            self._running.pop(history, None)
+
+    async def compact(self, history: MessageHistory, user_id: str = "", group_id: Optional[str] = None) -> int:
+        """总结较早的对话并替换，返回估算节省的 token 数，未压缩时为 0"""
+        start = 1 if history and history[0]["role"] == "system" and not self._is_summary(history[0]) else 0
+        turns = [index for index in range(start, len(history)) if history[index]["role"] == "user"]
+        if len(turns) <= config.compact_keep_turns:
+            return 0
+        # 在用户发言处切分，工具调用与其结果不会被拆开
+        end = turns[-config.compact_keep_turns]
+        older = history[start:end]
+        # 较早的部分已经很短（如只剩上次的摘要）时，近期的长消息不值得反复压缩
+        older_tokens = history_tokens(older)
+        if older_tokens < config.compact_threshold_tokens // 4:
+            return 0
+
+        model = resolve_model()
+        request = time.perf_counter()
+        try:
+            completion = await API.chat(
+                [{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": render_transcript(older)}],
+                model=model,
+            )
+        except (RequestException, httpx.HTTPError, ValueError) as e:
+            compactions.inc(key="failed")
+            logger.warning(f"压缩对话失败：{e}")
+            return 0
+        if user_id:
+            ledger.record(model, completion.usage, user_id, group_id, time.perf_counter() - request)
+        summary, _ = extract_content_and_think(completion.choices[0].message)
+        replacement = {"role": "system", "content": SUMMARY_PREFIX + summary}
+        saved = older_tokens - estimate_tokens(replacement["content"])
+        current = history[start:end]
+        if not summary or saved <= 0 or len(current) != len(older) or any(a is not b for a, b in zip(current, older)):
+            compactions.inc(key="skipped")
+            return 0
+
+        history.replace(start, end, [replacement])
+        compactions.inc(key="applied")
+        compaction_saved_tokens.inc(saved)
+        logger.info(f"已将 {len(older)} 条较早的消息压缩为摘要，约节省 {saved} tokens")
+        return saved
+
+    @staticmethod
+    def _is_summary(message: dict[str, Any]) -> bool:
+        return message["role"] == "system" and str(message.get("content") or "").startswith(SUMMARY_PREFIX)
+
+
+compactor = Compactor()
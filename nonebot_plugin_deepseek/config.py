@@ -1,6 +1,10 @@
 import json
+import asyncio
 from pathlib import Path
-from typing import Any, Union, Optional
+from types import MappingProxyType
+from collections.abc import Mapping, Sequence
+from dataclasses import field, replace, dataclass
+from typing import Any, Union, Literal, Optional, cast
 
 from nonebot.compat import PYDANTIC_V2
 import nonebot_plugin_localstore as store
@@ -10,16 +14,127 @@ from pydantic import Field, BaseModel, ConfigDict
 from .compat import model_validator
 from ._types import NOT_GIVEN, NotGivenOr
 
+AUTO_MODEL = "auto"
+"""由路由器按输入与端点状态自动选择模型"""
+
+
+@dataclass(frozen=True)
+class ModelSettings:
+    """`config.json` 的不可变快照"""
+
+    default_model: str
+    default_prompt: str
+    default_sub_prompt: str
+    tts_model: str = ""
+    """默认语音，格式为 `<模型>-<说话人>`，为空时使用第一个可用语音"""
+    available_tts_models: tuple[str, ...] = ()
+    """`nb deepseek tts update` 获取的可用语音"""
+    tts_model_dict: Mapping[str, tuple[str, ...]] = field(default_factory=lambda: MappingProxyType({}))
+    """各 TTS 模型的说话人"""
+
+    def __post_init__(self) -> None:
+        # 传入的列表与字典复制为只读容器，之后修改原对象不会影响快照
+        object.__setattr__(self, "available_tts_models", tuple(self.available_tts_models))
+        object.__setattr__(
+            self,
+            "tts_model_dict",
+            MappingProxyType({model: tuple(speakers) for model, speakers in self.tts_model_dict.items()}),
+        )
+
 
 class ModelConfig:
+    """运行时可修改的模型设置，持久化于 `config.json`
+
+    设置以不可变快照的形式保存，修改与重新加载都只替换快照的引用，
+    已读取快照的请求不受影响；导入时不读写文件，由启动钩子调用 `load`
+    """
+
     def __init__(self) -> None:
-        self.file: Path = store.get_plugin_config_dir() / "config.json"
-        self.default_model: str = config.get_enable_models()[0]
-        self.default_prompt: str = config.prompt  # 暂时用不到
-        self.default_sub_prompt: str = config.sub_prompt  # 新增
-        self.load()
+        self._file: Optional[Path] = None
+        self.snapshot = ModelSettings(
+            default_model=config.get_enable_models()[0],
+            default_prompt=config.prompt,  # 暂时用不到
+            default_sub_prompt=config.sub_prompt,
+        )
+        self.fingerprint: Optional[tuple[int, int]] = None
+        """最近一次读写时文件的修改时间与大小，用于识别外部修改"""
+
+    @property
+    def file(self) -> Path:
+        if self._file is None:
+            self._file = store.get_plugin_config_dir() / "config.json"
+        return self._file
+
+    @file.setter
+    def file(self, value: Path) -> None:
+        self._file = value
+
+    @property
+    def default_model(self) -> str:
+        return self.snapshot.default_model
+
+    @default_model.setter
+    def default_model(self, value: str) -> None:
+        self.snapshot = replace(self.snapshot, default_model=value)
+
+    @property
+    def default_prompt(self) -> str:
+        return self.snapshot.default_prompt
+
+    @default_prompt.setter
+    def default_prompt(self, value: str) -> None:
+        self.snapshot = replace(self.snapshot, default_prompt=value)
 
-    def load(self):
+    @property
+    def default_sub_prompt(self) -> str:
+        return self.snapshot.default_sub_prompt
+
+    @default_sub_prompt.setter
+    def default_sub_prompt(self, value: str) -> None:
+        self.snapshot = replace(self.snapshot, default_sub_prompt=value)
+
+    @property
+    def tts_model(self) -> str:
+        return self.snapshot.tts_model
+
+    @tts_model.setter
+    def tts_model(self, value: str) -> None:
+        self.snapshot = replace(self.snapshot, tts_model=value)
+
+    @property
+    def available_tts_models(self) -> tuple[str, ...]:
+        return self.snapshot.available_tts_models
+
+    @available_tts_models.setter
+    def available_tts_models(self, value: Sequence[str]) -> None:
+        self.snapshot = replace(self.snapshot, available_tts_models=value)
+
+    @property
+    def tts_model_dict(self) -> Mapping[str, tuple[str, ...]]:
+        return self.snapshot.tts_model_dict
+
+    @tts_model_dict.setter
+    def tts_model_dict(self, value: Mapping[str, Sequence[str]]) -> None:
+        self.snapshot = replace(self.snapshot, tts_model_dict=value)
+
+    def default_tts(self) -> Optional[str]:
+        """回复使用的语音，没有可用语音时为 `None`"""
+        if self.tts_model in self.available_tts_models:
+            return self.tts_model
+        return self.available_tts_models[0] if self.available_tts_models else None
+
+    def _stat(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = self.file.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def changed(self) -> bool:
+        """文件是否在上次读写后被外部修改"""
+        return self._stat() != self.fingerprint
+
+    def load(self) -> None:
         if not self.file.exists():
             self.file.parent.mkdir(parents=True, exist_ok=True)
             self.save()
@@ -27,19 +142,41 @@ class ModelConfig:
 
         with open(self.file) as f:
             data = json.load(f)
-            self.default_model = data.get("default_model", self.default_model)
-            self.default_prompt = data.get("default_prompt", self.default_prompt)
-            self.default_sub_prompt = data.get("default_sub_prompt", self.default_sub_prompt)
+        snapshot = ModelSettings(
+            default_model=data.get("default_model", self.default_model),
+            default_prompt=data.get("default_prompt", self.default_prompt),
+            default_sub_prompt=data.get("default_sub_prompt", self.default_sub_prompt),
+            tts_model=data.get("tts_model", self.tts_model),
+            available_tts_models=data.get("available_tts_models", self.available_tts_models),
+            tts_model_dict=data.get("tts_model_dict", self.tts_model_dict),
+        )
+        self.snapshot = snapshot
+        self.ensure_enabled()
+        self.fingerprint = self._stat()
+
+    def ensure_enabled(self, scoped_config: Optional["ScopedConfig"] = None) -> None:
+        """默认模型未启用时改用第一个启用的模型，不写入文件；也作为插件配置重载的回调"""
+        models = (scoped_config or config).get_enable_models()
+        if self.default_model not in models and self.default_model != AUTO_MODEL:
+            logger.warning(f"默认模型 {self.default_model} 未启用，使用 {models[0]}")
+            self.default_model = models[0]
 
-    def save(self):
+    def save(self) -> None:
+        """写入临时文件后原子替换，读取方不会看到写了一半的文件"""
+        snapshot = self.snapshot
         config_data = {
-            "default_model": self.default_model,
-            "default_prompt": self.default_prompt,
-            "default_sub_prompt": self.default_sub_prompt,  # 新增
+            "default_model": snapshot.default_model,
+            "default_prompt": snapshot.default_prompt,
+            "default_sub_prompt": snapshot.default_sub_prompt,  # 新增
+            "tts_model": snapshot.tts_model,
+            "available_tts_models": list(snapshot.available_tts_models),
+            "tts_model_dict": {model: list(speakers) for model, speakers in snapshot.tts_model_dict.items()},
         }
-        with open(self.file, "w") as f:
+        tmp_file = self.file.with_suffix(".tmp")
+        with open(tmp_file, "w") as f:
             json.dump(config_data, f, indent=2)
-        self.load()
+        tmp_file.replace(self.file)
+        self.fingerprint = self._stat()
 
 
 class CustomModel(BaseModel):
@@ -74,12 +211,13 @@ class CustomModel(BaseModel):
     """Specifies that the most likely token be returned at each token position."""
 
     if PYDANTIC_V2:
-        model_config = ConfigDict(extra="allow", arbitrary_types_allowed=True)
+        model_config = ConfigDict(extra="allow", arbitrary_types_allowed=True, frozen=True)
     else:
 
         class Config:
             extra = "allow"
             arbitrary_types_allowed = True
+            frozen = True
 
     @model_validator(mode="before")
     @classmethod
@@ -130,20 +268,143 @@ class CustomModel(BaseModel):
 
 
 class ScopedConfig(BaseModel):
+    """插件配置，构造后不可修改，热重载时整体替换为新的实例"""
+
+    if PYDANTIC_V2:
+        model_config = ConfigDict(frozen=True)
+    else:
+
+        class Config:
+            frozen = True
+
     api_key: str = ""
     """Your API Key from deepseek"""
-    sub_prompt: str = ""  
-    enable_models: list[CustomModel] = [
+    sub_prompt: str = ""
+    enable_models: tuple[CustomModel, ...] = (
         CustomModel(name="deepseek-chat"),
         CustomModel(name="deepseek-reasoner"),
-    ]
+    )
     """List of models configurations"""
     prompt: str = ""
     """Character Preset"""
     md_to_pic: bool = False
     """Text to Image"""
+    render_theme: Literal["light", "dark"] = "light"
+    """Theme of rendered markdown images"""
+    render_pool_size: int = 2
+    """Number of pre-warmed browser pages used to render markdown"""
+    render_chunk_chars: int = 3000
+    """Long replies are rendered as several images of about this many characters"""
+    render_cache_max_bytes: int = 64 * 1024 * 1024
+    """Maximum disk usage (bytes) of the rendered image cache"""
+    send_rate: float = 1
+    """Messages per second sent to one group or user"""
+    send_burst: int = 3
+    """Messages that may be sent to one group or user in a burst"""
+    send_queue_size: int = 20
+    """Maximum queued messages per group or user before senders wait"""
+    send_congestion_threshold: float = 0.8
+    """Queue occupancy at which a group or user is reported as congested"""
+    send_coalesce_chars: int = 500
+    """Adjacent short messages to the same target are merged up to this many characters"""
+    send_max_chars: int = 2000
+    """Replies longer than this are split into several messages"""
+    send_long_as_forward: bool = True
+    """Send split replies in groups as a merged forward message (OneBot V11 only)"""
     enable_send_thinking: bool = False
     """Whether to send model thinking chain"""
+    thinking_interval: float = 3
+    """Minimum interval (seconds) between two streamed updates of the thinking chain"""
+    thinking_max_chars: int = 3000
+    """Maximum characters of the thinking chain sent to the chat"""
+    enable_function_call: bool = False
+    """Whether to offer registered tools to the models"""
+    tool_max_rounds: int = 5
+    """Maximum tool call rounds within one reply"""
+    tool_turn_timeout: float = 120
+    """Wall-clock budget (seconds) of one reply including its tool calls"""
+    tool_max_tokens: int = 32000
+    """Cumulative token budget of one reply including its tool calls"""
+    tool_dirs: tuple[str, ...] = ()
+    """Directories (relative to the bot root) of additional function call tool modules"""
+    tool_manifest: bool = True
+    """Serve tool declarations from a cached manifest and import tool modules on first use"""
+    tool_timeout: float = 60
+    """Default wall-clock timeout (seconds) of a single tool call"""
+    tool_thread_workers: Optional[int] = None
+    """Thread pool size for synchronous tools (defaults to the `ThreadPoolExecutor` default)"""
+    tool_process_workers: Optional[int] = None
+    """Process pool size for CPU-bound tools (defaults to the CPU count)"""
+    web_max_bytes: int = 2 * 1024 * 1024
+    """Maximum response size (bytes) read when fetching a web page"""
+    web_timeout: float = 15
+    """Maximum time (seconds) spent fetching a web page"""
+    web_max_tokens: int = 3000
+    """Token budget of the web page content handed to the model"""
+    web_cache: bool = True
+    """Whether to cache fetched web pages on disk following HTTP caching headers"""
+    web_cache_max_bytes: int = 64 * 1024 * 1024
+    """Maximum disk usage (bytes) of the web page cache"""
+    router_reasoning_models: tuple[str, ...] = ("deepseek-reasoner",)
+    """Models the `auto` router treats as reasoning models and sends complex prompts to"""
+    router_complexity_threshold: float = Field(default=0.4, ge=0, le=1)
+    """Prompts scoring at least this complexity (0-1) are routed to a reasoning model"""
+    router_max_error_rate: float = Field(default=0.5, ge=0, le=1)
+    """Models whose recent error rate (decaying with a 60 s half-life) exceeds this are avoided by the `auto` router"""
+    balance_refresh_interval: float = 600
+    """Interval (seconds) to refresh the cached account balance in the background, 0 to disable"""
+    metrics_path: str = "/deepseek/metrics"
+    """Path of the Prometheus metrics endpoint when an ASGI driver (e.g. FastAPI) is used, empty to disable"""
+    metrics_token: str = ""
+    """Bearer token required to read the metrics endpoint, empty to allow anonymous scrapes"""
+    trace_slowest: int = Field(default=20, ge=0)
+    """Number of slowest per-turn traces kept for `/deepseek trace`, 0 to disable"""
+    trace_recent: int = Field(default=20, ge=0)
+    """Number of most recent per-turn traces kept besides the slowest ones, 0 to disable"""
+    usage_ledger: bool = True
+    """Append every completion's usage to the local ledger (daily rollups and quotas work in memory either way)"""
+    ledger_flush_interval: float = Field(default=5, gt=0)
+    """Interval (seconds) between batched ledger writes"""
+    quota_user_daily_tokens: int = Field(default=0, ge=0)
+    """Daily token quota of each user, 0 for unlimited; superusers are exempt"""
+    quota_group_daily_tokens: int = Field(default=0, ge=0)
+    """Daily token quota of each group, 0 for unlimited"""
+    quota_overrides: dict[str, int] = {}
+    """Daily token quotas overriding the defaults, keyed `user:<id>` or `group:<id>`; 0 for unlimited"""
+    record_path: str = ""
+    """Record sanitised model and tool calls to this JSONL archive (`.gz` for gzip) for replay; empty to disable"""
+    tts_api_url: str = ""
+    """Base URL of a GPT-SoVITS style TTS service (`/models`, `/spks`, `/infer_single`), empty to disable"""
+    tts_api_key: str = ""
+    """Bearer token of the TTS service"""
+    tts_models: tuple[str, ...] = ()
+    """TTS models whose speakers are fetched by `nb deepseek tts update`, empty for all models of the service"""
+    tts_concurrency: int = Field(default=4, ge=1)
+    """Concurrent requests to the TTS service, for speaker lists and for the sentences of one reply"""
+    tts_chunk_chars: int = Field(default=150, gt=0)
+    """Replies are synthesised in chunks of whole sentences of at most about this many characters"""
+    tts_cache_max_bytes: int = 128 * 1024 * 1024
+    """Maximum disk usage (bytes) of the synthesised audio cache"""
+    semantic_cache: bool = False
+    """Answer first questions that nearly duplicate an earlier one in the same group and persona from memory"""
+    semantic_cache_threshold: float = Field(default=0.7, ge=0, le=1)
+    """Minimum estimated Jaccard similarity of normalised character bigrams for a cache hit"""
+    semantic_cache_ttl: float = Field(default=3600, gt=0)
+    """Seconds a cached reply stays valid; replies also expire at local midnight"""
+    semantic_cache_max_entries: int = Field(default=2048, ge=1)
+    """Maximum cached questions across all groups; the least recently used are evicted"""
+    semantic_cache_sample_rate: float = Field(default=0.05, ge=0, le=1)
+    """Fraction of cache hits re-asked in the background to estimate (and evict) false hits"""
+    compact_threshold_tokens: int = Field(default=8000, ge=0)
+    """Estimated conversation tokens above which older turns are summarised while the user is idle, 0 to disable"""
+    compact_idle_seconds: float = Field(default=5, ge=0)
+    """Seconds without a new message after a reply before a long conversation is compacted"""
+    compact_keep_turns: int = Field(default=2, ge=1)
+    """Most recent user turns (with their replies) kept verbatim when compacting"""
+    compact_model: str = ""
+    """Model that writes the summaries, empty for the first enabled model not listed in `router_reasoning_models`"""
+    config_watch_interval: float = 2
+    """Interval (seconds) to check config files for changes and reload them, 0 to disable"""
 
     def get_enable_models(self) -> list[str]:
         return [model.name for model in self.enable_models]
@@ -163,11 +424,78 @@ class ScopedConfig(BaseModel):
         raise ValueError(f"Model {model_name} not enabled")
 
 
+class TTSConfig:
+    """TTS 服务的设置，每次读取当前的插件配置"""
+
+    @property
+    def enabled(self) -> bool:
+        return bool(config.tts_api_url)
+
+    @property
+    def base_url(self) -> str:
+        return config.tts_api_url.rstrip("/")
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {config.tts_api_key}"} if config.tts_api_key else {}
+
+    async def get_available_tts(self) -> dict[str, list[str]]:
+        """并发获取各模型的说话人，获取失败的模型被跳过"""
+        from .apis.request import API
+        from .schemas.tts import TTSResponse
+
+        models = config.tts_models or await API.get_tts_models()
+        semaphore = asyncio.Semaphore(config.tts_concurrency)
+
+        async def fetch(model: str) -> TTSResponse:
+            async with semaphore:
+                return await TTSResponse.create(model)
+
+        results = await asyncio.gather(*(fetch(model) for model in models), return_exceptions=True)
+        available: dict[str, list[str]] = {}
+        for model, result in zip(models, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"获取 TTS 模型 {model} 的说话人失败：{result}")
+            elif result.speakers:
+                available[model] = result.speakers
+        return available
+
+
 class Config(BaseModel):
     deepseek: ScopedConfig = Field(default_factory=ScopedConfig)
     """DeepSeek Plugin Config"""
 
 
-config = (get_plugin_config(Config)).deepseek
+class ConfigProxy:
+    """`ScopedConfig` 的代理
+
+    热重载时通过 `swap` 整体替换所代理的快照，这是一次原子的引用赋值；
+    需要在一段流程中保持配置一致时，应通过 `snapshot` 取得快照后使用
+    """
+
+    __slots__ = ("_snapshot",)
+
+    def __init__(self, snapshot: ScopedConfig) -> None:
+        object.__setattr__(self, "_snapshot", snapshot)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._snapshot, name)
+
+    def snapshot(self) -> ScopedConfig:
+        return self._snapshot
+
+    def swap(self, snapshot: ScopedConfig) -> None:
+        object.__setattr__(self, "_snapshot", snapshot)
+
+
+config = cast(ScopedConfig, ConfigProxy(get_plugin_config(Config).deepseek))
+
+
+def config_snapshot() -> ScopedConfig:
+    """当前插件配置的快照，之后的热重载不会影响已取得的快照"""
+    return config.snapshot()  # type: ignore
+
+
 model_config = ModelConfig()
+tts_config = TTSConfig()
 logger.debug(f"load deepseek model: {config.get_enable_models()}")
@@ -0,0 +1,139 @@
+import time
+import asyncio
+from typing import Optional
+from collections import deque
+from dataclasses import dataclass
+
+import httpx
+from nonebot.log import logger
+
+from .apis import API
+from .schemas import Balance
+from .exception import RequestException
+from .ledger import DayRollup, render_rollup
+
+_BURN_WINDOW = 24 * 3600
+"""计算消耗速度所用的余额样本的时间窗口（秒）"""
+_MIN_BURN_SPAN = 600
+"""样本跨度短于该秒数时不估算消耗速度"""
+
+
+@dataclass(frozen=True)
+class BalanceSample:
+    fetched_at: float
+    """获取时的 Unix 时间戳"""
+    totals: dict[str, float]
+    """各币种的总可用余额"""
+
+
+class BalanceMonitor:
+    """在后台定时刷新账户余额，查询时只读取缓存，不等待上游接口"""
+
+    def __init__(self) -> None:
+        self.balance: Optional[Balance] = None
+        self.error: Optional[str] = None
+        """最近一次刷新失败的原因，成功后清空"""
+        self.interval: float = 0
+        self.samples: deque[BalanceSample] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._refreshing: Optional[asyncio.Task] = None
+
+    @property
+    def fetched_at(self) -> Optional[float]:
+        return self.samples[-1].fetched_at if self.samples else None
+
+    def age(self) -> Optional[float]:
+        """缓存的余额距今的秒数，尚未获取时为 `None`"""
+        return None if self.fetched_at is None else time.time() - self.fetched_at
+
+    def stale(self) -> bool:
+        """缓存是否已过期：尚未获取、已错过两次刷新，或未启用后台刷新"""
+        age = self.age()
+        return age is None or self.interval <= 0 or age > self.interval * 2
+
+    async def refresh(self) -> None:
+        try:
+            balance = await API.query_balance()
+        except (httpx.HTTPError, RequestException, ValueError) as e:
+            self.error = str(e.args[0]) if e.args else type(e).__name__
+            logger.warning(f"刷新余额失败：{self.error}")
+            return
+        now = time.time()
+        self.balance, self.error = balance, None
+        self.samples.append(
+            BalanceSample(now, {info.currency: float(info.total_balance) for info in balance.balance_infos})
+        )
+        while self.samples and self.samples[0].fetched_at < now - _BURN_WINDOW:
+            self.samples.popleft()
+
+    def refresh_soon(self) -> None:
+        """在后台刷新一次，已有刷新进行中时不重复发起"""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self.refresh())
+
+    def burn_rate(self, currency: str) -> Optional[float]:
+        """窗口内每天消耗的余额，充值造成的增加不计入；样本不足时为 `None`"""
+        samples = [sample for sample in self.samples if currency in sample.totals]
+        if len(samples) < 2 or samples[-1].fetched_at - samples[0].fetched_at < _MIN_BURN_SPAN:
+            return None
+        spent = sum(
+            max(previous.totals[currency] - current.totals[currency], 0)
+            for previous, current in zip(samples, samples[1:])
+        )
+        return spent * 86400 / (samples[-1].fetched_at - samples[0].fetched_at)
+
+    async def _run(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self, interval: float) -> None:
+        self.interval = interval
+        if self._task is None and interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        for task in (self._task, self._refreshing):
+            if task is not None:
+                task.cancel()
+        self._task = self._refreshing = None
+
+
+def _format_age(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f} 秒前"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} 分钟前"
+    return f"{seconds / 3600:.1f} 小时前"
+
+
+def render_dashboard(monitor: BalanceMonitor, rollup: DayRollup, *, top: int = 5) -> str:
+    """汇总缓存的余额、消耗速度与账本中的当日用量"""
+    lines: list[str] = []
+    if monitor.balance is None:
+        lines.append(f"余额尚未获取{f'（{monitor.error}）' if monitor.error else ''}，已在后台刷新，请稍后再试")
+    else:
+        age = monitor.age() or 0
+        status = "已过期" if monitor.stale() else "最新"
+        lines.append(f"余额（{status}，更新于 {_format_age(age)}）：")
+        for info in monitor.balance.balance_infos:
+            lines.append(
+                f"- {info.currency} {info.total_balance}（赠金 {info.granted_balance}，充值 {info.topped_up_balance}）"
+            )
+            if (rate := monitor.burn_rate(info.currency)) is None:
+                lines.append("  消耗速度：样本不足")
+            elif rate == 0:
+                lines.append("  消耗速度：0 / 天")
+            else:
+                lines.append(f"  消耗速度：{rate:.2f} / 天，预计可用 {float(info.total_balance) / rate:.1f} 天")
+        if monitor.error:
+            lines.append(f"最近一次刷新失败：{monitor.error}")
+        if not monitor.balance.is_available:
+            lines.append("账户当前余额不足，API 调用将失败")
+
+    # 用量与 `/deepseek usage` 及配额同样取自账本，口径一致
+    lines.append(render_rollup(rollup, top=top))
+    return "\n".join(lines)
+
+
+balance_monitor = BalanceMonitor()
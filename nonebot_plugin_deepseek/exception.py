@@ -1,3 +1,5 @@
+from typing import Optional
+
 from nonebot.exception import NoneBotException
 
 
@@ -7,3 +9,16 @@ class Exception(NoneBotException):
 
 class RequestException(Exception):
     """请求错误"""
+
+
+class QuotaExceeded(RequestException):
+    """超出每日用量配额"""
+
+
+class RateLimited(RequestException):
+    """接口返回 429"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+        """`Retry-After` 响应头给出的等待秒数"""
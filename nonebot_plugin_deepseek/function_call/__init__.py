@@ -1,2 +1,3 @@
 from . import builtins as builtins
 from .registry import registry as registry
+from .budget import ToolBudget as ToolBudget
@@ -0,0 +1,70 @@
+import json
+import time
+from typing import Optional
+from dataclasses import field, dataclass
+
+from ..schemas import ToolCalls
+from ..schemas.usage import Usage
+
+REPEATED_CALL_NOTICE = "（该工具调用与之前完全相同，已直接返回上次结果，请勿重复调用）"
+
+
+@dataclass
+class ToolBudget:
+    """单轮对话的工具调用预算"""
+
+    max_rounds: int
+    """最多允许的工具调用轮数"""
+    timeout: float
+    """本轮对话允许的总时长（秒）"""
+    max_tokens: int
+    """本轮对话累计消耗的 token 上限"""
+    max_repeats: int = 2
+    """允许出现的重复工具调用次数，超过后不再提供工具"""
+    rounds: int = 0
+    tokens: int = 0
+    repeats: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    _results: dict[tuple[str, str], str] = field(default_factory=dict, repr=False)
+
+    @staticmethod
+    def _key(tool_call: ToolCalls) -> tuple[str, str]:
+        arguments = tool_call.function.arguments or "{}"
+        try:
+            arguments = json.dumps(json.loads(arguments), sort_keys=True, ensure_ascii=False)
+        except ValueError:
+            pass
+        return tool_call.function.name, arguments
+
+    def consume(self, usage: Optional[Usage]) -> None:
+        if usage:
+            self.tokens += usage.total_tokens
+
+    def start_round(self) -> None:
+        self.rounds += 1
+
+    def repeated(self, tool_call: ToolCalls) -> Optional[str]:
+        """若本轮已执行过相同的工具调用，返回上次的结果"""
+        if (result := self._results.get(self._key(tool_call))) is None:
+            return None
+        self.repeats += 1
+        return f"{result}\n{REPEATED_CALL_NOTICE}"
+
+    def remember(self, tool_call: ToolCalls, result: str) -> None:
+        self._results[self._key(tool_call)] = result
+
+    def remaining(self) -> float:
+        """本轮对话剩余的时长（秒）"""
+        return max(0.0, self.started_at + self.timeout - time.monotonic())
+
+    def exhausted(self) -> Optional[str]:
+        """预算耗尽时返回原因"""
+        if self.rounds >= self.max_rounds:
+            return f"工具调用已达 {self.max_rounds} 轮"
+        if time.monotonic() - self.started_at >= self.timeout:
+            return f"本轮对话已超过 {self.timeout} 秒"
+        if self.tokens >= self.max_tokens:
+            return f"累计消耗 {self.tokens} token"
+        if self.repeats >= self.max_repeats:
+            return f"重复工具调用 {self.repeats} 次"
+        return None
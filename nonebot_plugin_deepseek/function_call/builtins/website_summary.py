@@ -1,11 +1,64 @@
-from bs4 import BeautifulSoup
-from httpx import AsyncClient
+import re
+import asyncio
+from typing import Optional
 
+import nonebot_plugin_localstore as store
+from httpx import HTTPError, InvalidURL, AsyncClient
+
+from ...config import config
 from ..registry import registry
+from ...utils import truncate_to_tokens
+from ...web import HTTPCache, CacheEntry, fetch, extract_main_content
 
 headers = {
     "User-Agent": "Firefox/90.0 (Windows NT 10.0; Win64; x64; rv:90.0) Gecko/20100101 Firefox/90.0"  # noqa: E501
 }
+cache: Optional[HTTPCache] = None
+MAX_CONCURRENT_FETCHES = 4
+
+
+def get_cache() -> HTTPCache:
+    """首次使用时才创建缓存，避免导入时解析插件目录"""
+    global cache
+    if cache is None:
+        cache = HTTPCache(store.get_plugin_cache_dir() / "web", max_bytes=config.web_cache_max_bytes)
+    return cache
+
+
+async def fetch_page_text(client: AsyncClient, url: str) -> str:
+    """获取网页正文，优先使用磁盘缓存，过期时发送条件请求重新验证"""
+    cache = get_cache()
+    entry = await cache.load(url) if config.web_cache else None
+    if entry and entry.text is not None and entry.is_fresh():
+        return entry.text
+
+    result = await fetch(
+        client,
+        url,
+        max_bytes=config.web_max_bytes,
+        timeout=config.web_timeout,
+        headers={**headers, **(entry.conditional_headers() if entry else {})},
+    )
+
+    if result.status_code == 304 and entry:
+        if entry.text is None and (body := await asyncio.to_thread(cache.read_body, entry)) is not None:
+            entry.text = await asyncio.to_thread(extract_main_content, body.decode(entry.encoding, errors="replace"))
+        if entry.text is not None:
+            entry.refresh(result.headers)
+            await cache.store(entry)
+            return entry.text
+        return f"获取网页内容失败：缓存已失效（{url}）"
+
+    if result.status_code != 200:
+        return "获取网页内容失败：" + str(result.status_code)
+
+    text = await asyncio.to_thread(extract_main_content, result.text)
+    # 触及大小或时间上限的正文不完整，不能当作完整页面缓存并重新验证
+    if config.web_cache and not result.truncated:
+        entry = CacheEntry(url=url, encoding=result.encoding, content_type=result.content_type, text=text)
+        if entry.refresh(result.headers):
+            await cache.store(entry, result.content)
+    return text
 
 
 @registry.register()
@@ -13,14 +66,22 @@ async def get_web_content(url: str):
     """通过链接获取网页内容
 
     参数:
-        url: 网页链接
+        url: 网页链接，可传入多个链接，使用空格分隔
     """
+    urls = list(dict.fromkeys(re.split(r"\s+", url.strip())))
+    budget = config.web_max_tokens // len(urls)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
 
-    async with AsyncClient() as client:
-        response = await client.get(url, headers=headers)
-        if response.status_code != 200:
-            return "获取网页内容失败：" + str(response.status_code)
+    async def run(client: AsyncClient, link: str) -> str:
+        async with semaphore:
+            try:
+                return truncate_to_tokens(await fetch_page_text(client, link), budget)
+            except (HTTPError, InvalidURL) as e:
+                return f"获取网页内容失败：{type(e).__name__}"
 
-        soup = BeautifulSoup(response.text, "html.parser")
+    async with AsyncClient() as client:
+        contents = await asyncio.gather(*(run(client, link) for link in urls))
 
-    return soup.get_text()
+    if len(urls) == 1:
+        return contents[0]
+    return "\n\n".join(f"## {link}\n{content}" for link, content in zip(urls, contents))
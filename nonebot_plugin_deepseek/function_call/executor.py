@@ -0,0 +1,111 @@
+import json
+import asyncio
+import inspect
+import functools
+from collections.abc import Callable
+from typing import Any, Literal, Optional
+from typing_extensions import TypeAlias
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+
+from nonebot.log import logger
+
+ExecutorType: TypeAlias = Literal["auto", "inline", "thread", "process"]
+"""
+工具执行策略
+- `auto`: 协程函数在事件循环中执行，同步函数放入线程池
+- `inline`: 直接在事件循环中执行
+- `thread`: 放入线程池，适合阻塞 I/O
+- `process`: 放入进程池，适合 CPU 密集的纯函数，函数必须定义在模块顶层且参数与返回值可被 pickle
+"""
+
+
+class ToolTimeoutError(TimeoutError):
+    """工具执行超时"""
+
+
+def resolve_executor(func: Callable, executor: ExecutorType) -> ExecutorType:
+    is_coroutine = inspect.iscoroutinefunction(func)
+    if executor == "auto":
+        return "inline" if is_coroutine else "thread"
+    if executor == "process":
+        if is_coroutine:
+            raise ValueError(f"Coroutine function '{func.__name__}' cannot run in a process pool")
+        if func.__qualname__ != func.__name__:
+            raise ValueError(f"Function '{func.__qualname__}' must be defined at module level to run in a process pool")
+    return executor
+
+
+def serialize_result(result: Any) -> str:
+    """将工具返回值转换为可放入 `tool` 消息的文本"""
+    if isinstance(result, str):
+        return result
+    if result is None:
+        return ""
+    try:
+        return json.dumps(result, ensure_ascii=False, default=str)
+    except (TypeError, ValueError):
+        return str(result)
+
+
+class ToolExecutor:
+    """管理工具调用使用的线程池与进程池，池在首次使用时按配置创建"""
+
+    def __init__(
+        self,
+        thread_workers: Optional[int] = None,
+        process_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.timeout = timeout
+        """未单独声明超时的工具使用的默认超时（秒）"""
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    def configure(
+        self, thread_workers: Optional[int], process_workers: Optional[int], timeout: Optional[float]
+    ) -> None:
+        """更新池大小与默认超时，已创建的池会在下次使用时按新配置重建"""
+        self.shutdown()
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.timeout = timeout
+
+    def _pool(self, executor: ExecutorType) -> Executor:
+        if executor == "process":
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+            return self._process_pool
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="deepseek-tool")
+        return self._thread_pool
+
+    async def _call(self, func: Callable, kwargs: dict[str, Any], executor: ExecutorType) -> Any:
+        if executor == "inline":
+            result = func(**kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(executor), functools.partial(func, **kwargs))
+
+    async def run(
+        self, func: Callable, kwargs: dict[str, Any], executor: ExecutorType, timeout: Optional[float] = None
+    ) -> Any:
+        """按执行策略调用工具，超过 `timeout` 秒时抛出 `ToolTimeoutError`
+
+        线程与进程中的任务无法被强制终止，超时后其结果将被丢弃
+        """
+        timeout = timeout or self.timeout
+        try:
+            return await asyncio.wait_for(self._call(func, kwargs, executor), timeout)
+        except asyncio.TimeoutError as e:
+            raise ToolTimeoutError(f"'{func.__name__}' timed out after {timeout}s") from e
+
+    def shutdown(self) -> None:
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._thread_pool = self._process_pool = None
+        logger.debug("Function call executors shut down")
@@ -0,0 +1,170 @@
+import ast
+import json
+import typing
+import inspect
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+
+from nonebot.log import logger
+
+if TYPE_CHECKING:
+    from .registry import FunctionRegistry
+
+MANIFEST_VERSION = 1
+
+_ANNOTATION_NAMESPACE: dict[str, Any] = {
+    "str": str,
+    "int": int,
+    "float": float,
+    "bool": bool,
+    "list": list,
+    "dict": dict,
+    "tuple": tuple,
+    "set": set,
+    "frozenset": frozenset,
+    "None": None,
+    **{name: getattr(typing, name) for name in ("Any", "Optional", "Union", "Literal", "List", "Dict", "Tuple", "Set")},
+}
+_TYPING_MODULES = ("typing", "typing_extensions")
+_ANNOTATION_NODES = (
+    ast.Expression,
+    ast.Name,
+    ast.Attribute,
+    ast.Subscript,
+    ast.Tuple,
+    ast.List,
+    ast.Constant,
+    ast.BinOp,
+    ast.BitOr,
+    ast.Load,
+)
+
+
+class StaticInspectionError(Exception):
+    """无法通过静态分析得到工具声明，需要导入模块"""
+
+
+def _evaluate_annotation(node: Optional[ast.expr]) -> Any:
+    if node is None:
+        return Any
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        # 字符串形式的前向引用
+        node = ast.parse(node.value, mode="eval").body
+    expression = ast.Expression(body=node)
+    for child in ast.walk(expression):
+        if not isinstance(child, _ANNOTATION_NODES):
+            raise StaticInspectionError(f"unsupported annotation: {ast.dump(node)}")
+        if isinstance(child, ast.Attribute):
+            if not (isinstance(child.value, ast.Name) and child.value.id in _TYPING_MODULES):
+                raise StaticInspectionError(f"unsupported annotation: {ast.unparse(node)}")
+        elif isinstance(child, ast.Name) and child.id not in _ANNOTATION_NAMESPACE and child.id not in _TYPING_MODULES:
+            raise StaticInspectionError(f"unknown type: {child.id}")
+
+    namespace = {**_ANNOTATION_NAMESPACE, **dict.fromkeys(_TYPING_MODULES, typing)}
+    return eval(compile(expression, "<annotation>", "eval"), {"__builtins__": {}}, namespace)
+
+
+def _is_register_call(decorator: ast.expr) -> Optional[ast.Call]:
+    if isinstance(decorator, ast.Call):
+        func = decorator.func
+        if (isinstance(func, ast.Attribute) and func.attr == "register") or (
+            isinstance(func, ast.Name) and func.id == "register"
+        ):
+            return decorator
+    return None
+
+
+def _literal_argument(call: ast.Call, index: int, keyword: str) -> Optional[str]:
+    node = next((kw.value for kw in call.keywords if kw.arg == keyword), None)
+    if node is None and len(call.args) > index:
+        node = call.args[index]
+    if node is None:
+        return None
+    value = ast.literal_eval(node)
+    if value is not None and not isinstance(value, str):
+        raise StaticInspectionError(f"`{keyword}` must be a string literal")
+    return value
+
+
+def inspect_file(path: Path, registry: "FunctionRegistry") -> list[dict]:
+    """不导入模块，静态提取文件中由 `registry.register` 注册的工具声明"""
+    tree = ast.parse(path.read_text("utf-8"), filename=str(path))
+    tools = []
+
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        calls = [call for decorator in node.decorator_list if (call := _is_register_call(decorator))]
+        if not calls:
+            continue
+
+        call = calls[0]
+        docstring = ast.get_docstring(node) or ""
+        name = _literal_argument(call, 0, "name") or node.name
+        description = _literal_argument(call, 1, "description") or registry._parse_description(docstring)
+        param_docs = registry._parse_param_docs(docstring)
+
+        args = node.args
+        positional = [*args.posonlyargs, *args.args]
+        defaults: list[Optional[ast.expr]] = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+        parameters = {}
+        for arg, default in [*zip(positional, defaults), *zip(args.kwonlyargs, args.kw_defaults)]:
+            try:
+                default_value = ast.literal_eval(default) if default is not None else inspect.Parameter.empty
+            except (ValueError, TypeError, SyntaxError):
+                default_value = inspect.Parameter.empty
+            parameters[arg.arg] = {
+                "type": _evaluate_annotation(arg.annotation),
+                "description": param_docs.get(arg.arg, ""),
+                "required": default is None,
+                "default": default_value,
+            }
+
+        tools.append({"name": name, "schema": registry._compile_schema(name, description, parameters)})
+    return tools
+
+
+class ToolManifest:
+    """工具清单索引，以文件路径、修改时间与大小为键缓存工具声明"""
+
+    def __init__(self, file: Path) -> None:
+        self.file = file
+        self.files: dict[str, dict] = {}
+        self.dirty = False
+        try:
+            data = json.loads(file.read_text("utf-8"))
+            if data.get("version") == MANIFEST_VERSION:
+                self.files = data["files"]
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Ignoring corrupt tool manifest {file}: {e}")
+
+    @staticmethod
+    def _fingerprint(path: Path) -> list[int]:
+        stat = path.stat()
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def lookup(self, path: Path) -> Optional[list[dict]]:
+        entry = self.files.get(str(path))
+        if entry and entry["fingerprint"] == self._fingerprint(path):
+            return entry["tools"]
+        return None
+
+    def update(self, path: Path, tools: list[dict]) -> None:
+        self.files[str(path)] = {"fingerprint": self._fingerprint(path), "tools": tools}
+        self.dirty = True
+
+    def prune(self, paths: set[str]) -> None:
+        for stale in set(self.files) - paths:
+            del self.files[stale]
+            self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.file.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps({"version": MANIFEST_VERSION, "files": self.files}, ensure_ascii=False), "utf-8")
+        tmp_file.replace(self.file)
+        self.dirty = False
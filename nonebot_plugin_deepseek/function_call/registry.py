@@ -1,35 +1,50 @@
 import re
 import sys
 import json
+import time
+import asyncio
 import inspect
-import functools
 import importlib.util
 from pathlib import Path
+from types import CodeType
 from collections.abc import Callable
-from typing import Any, Union, Optional
+from typing import Any, Union, Optional, get_type_hints
 
 from nonebot.log import logger
 
+from ..tracing import span
+from ..recorder import recorder
 from ..schemas import ToolCalls
+from ..metrics import errors, tool_latency
+from .schema import compile_type, with_default
+from .manifest import ToolManifest, StaticInspectionError, inspect_file
+from .executor import ExecutorType, ToolExecutor, ToolTimeoutError, resolve_executor, serialize_result
 
 
 class FunctionRegistry:
     def __init__(self):
         self._registry = {}
-        self._type_mapping = {
-            str: "string",
-            int: "integer",
-            float: "number",
-            bool: "boolean",
-            list: "array",
-            dict: "object",
-            Any: "any",
-        }
+        self.executor = ToolExecutor()
+        self._tools: Optional[list[dict]] = None
+        self._tools_json: Optional[bytes] = None
+        self._import_locks: dict[str, asyncio.Lock] = {}
 
     def load(
-        self, *directories: str, base_dir: Optional[Union[Path, str]] = None
+        self,
+        *directories: str,
+        base_dir: Optional[Union[Path, str]] = None,
+        manifest: Optional[Path] = None,
     ) -> None:
+        """加载目录中的工具模块
+
+        指定 `manifest` 时启用清单模式：工具声明通过静态分析提取并按文件修改时间缓存至清单文件，
+        模块在其工具首次被调用时才导入
+        """
+        start = time.perf_counter()
         base_path = Path(base_dir).resolve() if base_dir else Path.cwd()
+        tool_manifest = ToolManifest(manifest) if manifest else None
+        seen: set[str] = set()
+        lazy_count = 0
 
         if str(base_path) not in sys.path:
             sys.path.insert(0, str(base_path))
@@ -51,18 +66,95 @@ class FunctionRegistry:
                 if module_name in sys.modules:
                     continue
 
-                spec = importlib.util.spec_from_file_location(module_name, py_file)
-                if not spec or not spec.loader:
-                    continue
+                if tool_manifest is not None:
+                    seen.add(str(py_file))
+                    if (tools := self._load_manifest_entry(tool_manifest, module_name, py_file)) is not None:
+                        lazy_count += len(tools)
+                        continue
+
+                self._import_module(module_name, py_file)
+
+        if tool_manifest is not None:
+            tool_manifest.prune(seen)
+            tool_manifest.save()
+        logger.info(
+            f"Loaded tool modules in {(time.perf_counter() - start) * 1000:.1f} ms "
+            f"({lazy_count} lazy tools, manifest {'on' if tool_manifest else 'off'})"
+        )
+
+    def _load_manifest_entry(self, manifest: ToolManifest, module_name: str, py_file: Path) -> Optional[list[dict]]:
+        """从清单注册惰性工具，无法静态分析时返回 `None` 以回退到直接导入"""
+        tools = manifest.lookup(py_file)
+        if tools is None:
+            try:
+                tools = inspect_file(py_file, self)
+            except (SyntaxError, ValueError, StaticInspectionError) as e:
+                logger.debug(f"Static inspection of {module_name} failed, importing it: {e}")
+                return None
+            manifest.update(py_file, tools)
+
+        for tool in tools:
+            self._registry[tool["name"]] = {
+                "name": tool["name"],
+                "description": tool["schema"]["function"]["description"],
+                "schema": tool["schema"],
+                "module": (module_name, py_file),
+            }
+        if tools:
+            self._invalidate()
+        return tools
 
-                try:
-                    module = importlib.util.module_from_spec(spec)
-                    sys.modules[module_name] = module
-                    spec.loader.exec_module(module)
-                except Exception as e:
-                    logger.error(f"Failed to loaded {module_name}: {str(e)}")
+    def _import_module(self, module_name: str, py_file: Path, code: Optional[CodeType] = None) -> None:
+        if module_name in sys.modules:
+            return
+        spec = importlib.util.spec_from_file_location(module_name, py_file)
+        if not spec or not spec.loader:
+            return
+
+        try:
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            if code is None:
+                spec.loader.exec_module(module)
+            else:
+                exec(code, module.__dict__)
+        except Exception as e:
+            sys.modules.pop(module_name, None)
+            logger.error(f"Failed to loaded {module_name}: {str(e)}")
+
+    async def _import_lazy(self, module_name: str, py_file: Path) -> None:
+        """导入惰性工具的模块
+
+        读取与编译源码在线程中进行；执行模块（其中的注册会修改注册表）留在事件循环线程，
+        同一模块的并发首次调用只导入一次
+        """
+        lock = self._import_locks.setdefault(module_name, asyncio.Lock())
+        async with lock:
+            if module_name in sys.modules:
+                return
+            try:
+                code = await asyncio.to_thread(_compile_source, module_name, py_file)
+            except (OSError, SyntaxError, ValueError) as e:
+                logger.error(f"Failed to loaded {module_name}: {str(e)}")
+                return
+            self._import_module(module_name, py_file, code)
+
+    def register(
+        self,
+        name: Optional[str] = None,
+        description: Optional[str] = None,
+        executor: ExecutorType = "auto",
+        timeout: Optional[float] = None,
+    ):
+        """注册工具
+
+        参数:
+            name: 工具名，默认为函数名
+            description: 工具描述，默认取自函数文档
+            executor: 执行策略，参见 `ExecutorType`
+            timeout: 单次调用的超时（秒），默认使用全局配置
+        """
 
-    def register(self, name: Optional[str] = None, description: Optional[str] = None):
         def decorator(func: Callable):
             nonlocal name, description
             func_name = name or func.__name__
@@ -72,36 +164,51 @@ class FunctionRegistry:
 
             func_description = description or self._parse_description(func.__doc__)  # type: ignore
 
-            @functools.wraps(func)
-            def wrapper(*args, **kwargs):
-                return func(*args, **kwargs)
-
             self._registry[func_name] = {
                 "name": func_name,
                 "description": func_description,
                 "raw_parameters": parameters,
-                "func": wrapper,
+                "func": func,
+                "executor": resolve_executor(func, executor),
+                "timeout": timeout,
+                "schema": self._compile_schema(func_name, func_description, parameters),
+                "convert": self._compile_arguments(parameters),
             }
+            self._invalidate()
             logger.debug(f'Succeeded to load function "{func_name}"')
-            return wrapper
+            # 返回原函数本身，进程池才能按模块路径 pickle 该函数
+            return func
 
         return decorator
 
+    def unregister(self, name: str) -> None:
+        if self._registry.pop(name, None):
+            self._invalidate()
+
+    def _invalidate(self) -> None:
+        self._tools = None
+        self._tools_json = None
+
     def _parse_description(self, docstring: str) -> str:
         return docstring.split("\n\n")[0].strip() if docstring else ""
 
     def _parse_parameters(self, func: Callable, sig: inspect.Signature) -> dict:
         param_docs = self._parse_param_docs(func.__doc__ or "")
+        try:
+            type_hints = get_type_hints(func)
+        except Exception:
+            type_hints = {}
         parameters = {}
 
         for name, param in sig.parameters.items():
-            param_type = (
-                param.annotation if param.annotation != inspect.Parameter.empty else Any
-            )
+            if param.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+                continue
+            param_type = type_hints.get(name, param.annotation if param.annotation != inspect.Parameter.empty else Any)
             parameters[name] = {
                 "type": param_type,
                 "description": param_docs.get(name, ""),
                 "required": param.default == inspect.Parameter.empty,
+                "default": param.default,
             }
         return parameters
 
@@ -125,95 +232,118 @@ class FunctionRegistry:
                     args_section = False
         return param_docs
 
-    def _convert_type(self, py_type: type) -> str:
-        return self._type_mapping.get(py_type, "any")
-
-    def to_json(self) -> list:
-        result = []
-        for func_name, info in self._registry.items():
-            params = info["raw_parameters"]
-            properties = {}
-            required = []
-
-            for name, param in params.items():
-                properties[name] = {
-                    "type": self._convert_type(param["type"]),
-                    "description": param["description"],
-                }
-                if param["required"]:
-                    required.append(name)
-
-            func_schema = {
-                "type": "function",
-                "function": {
-                    "name": func_name,
-                    "description": info["description"],
-                    "parameters": {
-                        "type": "object",
-                        "properties": properties,
-                        "required": required,
-                    },
+    def _compile_schema(self, func_name: str, description: str, parameters: dict) -> dict:
+        properties = {}
+        required = []
+
+        for name, param in parameters.items():
+            schema, _ = compile_type(param["type"])
+            if param["description"]:
+                schema = {**schema, "description": param["description"]}
+            if param["required"]:
+                required.append(name)
+            else:
+                schema = with_default(schema, param["default"])
+            properties[name] = schema
+
+        return {
+            "type": "function",
+            "function": {
+                "name": func_name,
+                "description": description,
+                "parameters": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": required,
                 },
-            }
-            result.append(func_schema)
-        return result
+            },
+        }
 
-    async def execute_tool_call(self, tool_call: ToolCalls) -> Any:
+    def _compile_arguments(self, parameters: dict) -> Callable[[dict[str, Any]], dict[str, Any]]:
+        """预编译参数校验与转换函数，调用时无需再遍历参数声明"""
+        converters = {name: compile_type(param["type"])[1] for name, param in parameters.items()}
+        required = [name for name, param in parameters.items() if param["required"]]
+        required_set = frozenset(required)
+
+        def explain(args: dict[str, Any]) -> ValueError:
+            for param_name, converter in converters.items():
+                if param_name not in args:
+                    continue
+                value = args[param_name]
+                try:
+                    converter(value)
+                except Exception as e:
+                    param_type = parameters[param_name]["type"]
+                    return ValueError(
+                        f"Parameter '{param_name}' value {value} cannot be converted to {param_type}: {e}"  # noqa: E501
+                    )
+            return ValueError("Invalid parameters")
+
+        def convert(args: dict[str, Any]) -> dict[str, Any]:
+            if not args.keys() >= required_set:
+                missing = next(name for name in required if name not in args)
+                raise ValueError(f"Missing required parameter: {missing}")
+            converted_args = {}
+            try:
+                for name, value in args.items():
+                    if converter := converters.get(name):
+                        converted_args[name] = converter(value)
+            except Exception as e:
+                raise explain(args) from e
+            return converted_args
+
+        return convert
+
+    def to_json(self) -> list:
+        if self._tools is None:
+            self._tools = [info["schema"] for info in self._registry.values()]
+        return self._tools
+
+    def to_json_bytes(self) -> bytes:
+        """预序列化的工具列表，注册表变更前重复调用不会重新编码"""
+        if self._tools_json is None:
+            self._tools_json = json.dumps(self.to_json(), ensure_ascii=False).encode()
+        return self._tools_json
+
+    async def execute_tool_call(self, tool_call: ToolCalls, timeout: Optional[float] = None) -> str:
+        """执行工具调用，`timeout` 为调用方剩余的时长，与工具自身的超时取较小者"""
         func_name = tool_call.function.name
         func_info = self._registry.get(func_name)
-        if not func_info:
+        if func_info and "func" not in func_info:
+            # 清单模式下的惰性工具，首次调用时导入模块完成真正的注册
+            await self._import_lazy(*func_info["module"])
+            func_info = self._registry.get(func_name)
+        if not func_info or "func" not in func_info:
             raise ValueError(f"Function '{func_name}' is not registered.")
 
-        args: dict[str, Any] = json.loads(tool_call.function.arguments)
-        converted_args = {}
-
-        for param_name, param_spec in func_info["raw_parameters"].items():
-            if param_name not in args:
-                if param_spec["required"]:
-                    raise ValueError(f"Missing required parameter: {param_name}")
-                continue
-            value = args[param_name]
-            param_type = param_spec["type"]
-            try:
-                converted_value = self._convert_value(value, param_type)
-            except Exception as e:
-                raise ValueError(
-                    f"Parameter '{param_name}' value {value} cannot be converted to {param_type}: {e}"  # noqa: E501
-                ) from e
-            converted_args[param_name] = converted_value
-
-        func = func_info["func"]
-
-        result = func(**converted_args)
-        if inspect.isawaitable(result):
-            result = await result
-
-        logger.debug(f"Calling {func_name} function")
-        return result
-
-    def _convert_value(self, value: Any, param_type: type) -> Any:
-        if param_type is Any:
-            return value
-
-        if param_type is bool:
-            if isinstance(value, bool):
-                return value
-            if isinstance(value, str):
-                lower_val = value.lower()
-                if lower_val == "true":
-                    return True
-                elif lower_val == "false":
-                    return False
-                else:
-                    raise ValueError(f"Invalid boolean string: {value}")
-            return bool(value)
+        args: dict[str, Any] = json.loads(tool_call.function.arguments or "{}")
+        converted_args = func_info["convert"](args)
 
+        if limit := func_info["timeout"] or self.executor.timeout:
+            timeout = limit if timeout is None else min(limit, timeout)
+        logger.debug(f"Calling {func_name} function ({func_info['executor']})")
+        ts = time.time()
+        start = time.perf_counter()
         try:
-            return param_type(value)
-        except (TypeError, ValueError):
-            if param_type in (int, float):
-                return param_type(str(value))
-            raise
+            with span("tool", tool=func_name):
+                result = await self.executor.run(func_info["func"], converted_args, func_info["executor"], timeout)
+        except ToolTimeoutError as e:
+            errors.inc(key=type(e).__name__)
+            logger.warning(f"Function {func_name} timed out: {e}")
+            output = f"工具 {func_name} 执行超时"
+            duration = time.perf_counter() - start
+            recorder.tool_call(func_name, tool_call.function.arguments, output, ts, duration, "timeout")
+            return output
+        finally:
+            tool_latency.observe(time.perf_counter() - start, func_name)
+
+        output = serialize_result(result)
+        recorder.tool_call(func_name, tool_call.function.arguments, output, ts, time.perf_counter() - start)
+        return output
+
+
+def _compile_source(module_name: str, py_file: Path) -> CodeType:
+    return compile(py_file.read_bytes(), str(py_file), "exec", dont_inherit=True)
 
 
 registry = FunctionRegistry()
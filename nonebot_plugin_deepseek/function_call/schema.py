@@ -0,0 +1,270 @@
+import sys
+import enum
+import json
+import types
+import dataclasses
+from collections.abc import Callable
+from typing import Any, Union, Literal, get_args, get_origin, get_type_hints
+
+from pydantic import BaseModel
+from nonebot.compat import PYDANTIC_V2, type_validate_python
+
+Converter = Callable[[Any], Any]
+
+_UNION_TYPES: tuple[Any, ...] = (Union, types.UnionType) if sys.version_info >= (3, 10) else (Union,)
+_SCALARS: dict[Any, str] = {str: "string", int: "integer", float: "number", bool: "boolean"}
+_JSON_TYPES: dict[type, str] = {str: "string", bool: "boolean", int: "integer", float: "number", type(None): "null"}
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _to_str(value: Any) -> str:
+    return value if type(value) is str else str(value)
+
+
+def _to_int(value: Any) -> int:
+    value_type = type(value)
+    if value_type is int:
+        return value
+    if value_type is str:
+        return int(value)
+    if value_type is float:
+        if not value.is_integer():
+            raise ValueError(f"{value} is not an integer")
+        return int(value)
+    if value_type is bool:
+        raise TypeError("boolean is not an integer")
+    return int(str(value))
+
+
+def _to_float(value: Any) -> float:
+    value_type = type(value)
+    if value_type is float:
+        return value
+    if value_type is int or value_type is str:
+        return float(value)
+    if value_type is bool:
+        raise TypeError("boolean is not a number")
+    return float(str(value))
+
+
+_BOOL_STRINGS = {"true": True, "false": False}
+
+
+def _to_bool(value: Any) -> bool:
+    if value is True or value is False:
+        return value
+    if isinstance(value, str):
+        if (result := _BOOL_STRINGS.get(value.lower())) is None:
+            raise ValueError(f"Invalid boolean string: {value}")
+        return result
+    return bool(value)
+
+
+_SCALAR_CONVERTERS: dict[Any, Converter] = {str: _to_str, int: _to_int, float: _to_float, bool: _to_bool}
+
+
+def with_default(schema: dict, default: Any) -> dict:
+    """在 schema 中声明默认值，无法序列化为 JSON 的默认值将被忽略"""
+    if isinstance(default, enum.Enum):
+        default = default.value
+    try:
+        json.dumps(default)
+    except (TypeError, ValueError):
+        return schema
+    return {**schema, "default": default}
+
+
+def _compile_union(members: tuple[Any, ...]) -> tuple[dict, Converter]:
+    nullable = type(None) in members
+    compiled = [compile_type(member) for member in members if member is not type(None)]
+    if len(compiled) == 1:
+        schema, convert = compiled[0]
+        options = [schema]
+    else:
+        options = [schema for schema, _ in compiled]
+        converters = [convert for _, convert in compiled]
+
+        def convert(value: Any) -> Any:
+            errors = []
+            for member in converters:
+                try:
+                    return member(value)
+                except (TypeError, ValueError) as e:
+                    errors.append(str(e))
+            raise ValueError("; ".join(errors))
+
+    if nullable:
+        options = [*options, {"type": "null"}]
+        inner = convert
+
+        def convert(value: Any) -> Any:
+            return None if value is None else inner(value)
+
+    return (options[0] if len(options) == 1 else {"anyOf": options}), convert
+
+
+def _compile_literal(values: tuple[Any, ...]) -> tuple[dict, Converter]:
+    schema: dict[str, Any] = {"enum": list(values)}
+    if len(kinds := {_JSON_TYPES.get(type(value)) for value in values}) == 1 and None not in kinds:
+        schema["type"] = kinds.pop()
+    by_text = {str(value): value for value in values}
+
+    def convert(value: Any) -> Any:
+        if value in values:
+            return value
+        # 模型有时会把数字枚举值作为字符串返回
+        if (key := str(value)) in by_text:
+            return by_text[key]
+        raise ValueError(f"{value!r} is not one of {list(values)}")
+
+    return schema, convert
+
+
+def _compile_sequence(origin: Any, args: tuple[Any, ...]) -> tuple[dict, Converter]:
+    if origin is tuple and args and args[-1] is not Ellipsis:
+        compiled = [compile_type(arg) for arg in args]
+        schema = {
+            "type": "array",
+            "prefixItems": [item for item, _ in compiled],
+            "minItems": len(args),
+            "maxItems": len(args),
+        }
+        converters = [convert for _, convert in compiled]
+
+        def convert_fixed(value: Any) -> tuple:
+            if len(value) != len(converters):
+                raise ValueError(f"expected {len(converters)} items, got {len(value)}")
+            return tuple(item_convert(item) for item_convert, item in zip(converters, value))
+
+        return schema, convert_fixed
+
+    item_schema, item_convert = compile_type(args[0]) if args else ({}, _identity)
+    factory = list if origin in (list, None) else origin
+    schema: dict[str, Any] = {"type": "array"}
+    if item_schema:
+        schema["items"] = item_schema
+    if factory in (set, frozenset):
+        schema["uniqueItems"] = True
+
+    def convert(value: Any) -> Any:
+        if isinstance(value, (str, bytes, dict)) or not hasattr(value, "__iter__"):
+            raise TypeError(f"{type(value).__name__} is not an array")
+        return factory(item_convert(item) for item in value)
+
+    return schema, convert
+
+
+def _compile_mapping(args: tuple[Any, ...]) -> tuple[dict, Converter]:
+    value_schema, value_convert = compile_type(args[1]) if len(args) == 2 else ({}, _identity)
+    schema: dict[str, Any] = {"type": "object"}
+    if value_schema:
+        schema["additionalProperties"] = value_schema
+
+    def convert(value: Any) -> dict:
+        if not isinstance(value, dict):
+            raise TypeError(f"{type(value).__name__} is not an object")
+        return {key: value_convert(item) for key, item in value.items()}
+
+    return schema, convert
+
+
+def _compile_enum(enum_type: type[enum.Enum]) -> tuple[dict, Converter]:
+    schema, convert_value = _compile_literal(tuple(member.value for member in enum_type))
+
+    def convert(value: Any) -> enum.Enum:
+        return value if isinstance(value, enum_type) else enum_type(convert_value(value))
+
+    return schema, convert
+
+
+def _inline_refs(schema: Any, definitions: dict[str, Any], expanding: frozenset[str] = frozenset()) -> Any:
+    """以定义替换 `$ref`，工具参数中的 schema 嵌在属性内，引用无法相对于根节点解析"""
+    if isinstance(schema, list):
+        return [_inline_refs(item, definitions, expanding) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    if isinstance(ref := schema.get("$ref"), str):
+        name = ref.rsplit("/", 1)[-1]
+        siblings = {key: value for key, value in schema.items() if key != "$ref"}
+        # 自引用的模型无法展开，递归处退化为任意对象
+        if name in expanding or name not in definitions:
+            return {"type": "object", **_inline_refs(siblings, definitions, expanding)}
+        resolved = _inline_refs(definitions[name], definitions, expanding | {name})
+        return {**resolved, **_inline_refs(siblings, definitions, expanding)}
+    return {key: _inline_refs(value, definitions, expanding) for key, value in schema.items()}
+
+
+def _compile_model(model: type[BaseModel]) -> tuple[dict, Converter]:
+    schema = model.model_json_schema() if PYDANTIC_V2 else model.schema()  # type: ignore
+    definitions = {**schema.pop("definitions", {}), **schema.pop("$defs", {})}
+    schema = _inline_refs(schema, definitions)
+    schema.pop("title", None)
+
+    def convert(value: Any) -> BaseModel:
+        return value if isinstance(value, model) else type_validate_python(model, value)
+
+    return schema, convert
+
+
+def _compile_dataclass(cls: type) -> tuple[dict, Converter]:
+    hints = get_type_hints(cls)
+    properties = {}
+    required = []
+    converters = {}
+    for dc_field in dataclasses.fields(cls):
+        if not dc_field.init:
+            continue
+        schema, converters[dc_field.name] = compile_type(hints.get(dc_field.name, Any))
+        if dc_field.default is not dataclasses.MISSING:
+            schema = with_default(schema, dc_field.default)
+        elif dc_field.default_factory is dataclasses.MISSING:
+            required.append(dc_field.name)
+        properties[dc_field.name] = schema
+
+    def convert(value: Any) -> Any:
+        if isinstance(value, cls):
+            return value
+        if not isinstance(value, dict):
+            raise TypeError(f"{type(value).__name__} is not an object")
+        if missing := [name for name in required if name not in value]:
+            raise ValueError(f"missing fields: {', '.join(missing)}")
+        return cls(**{name: converters[name](item) for name, item in value.items() if name in converters})
+
+    return {"type": "object", "properties": properties, "required": required}, convert
+
+
+def compile_type(tp: Any) -> tuple[dict, Converter]:
+    """将类型注解编译为 JSON Schema 与对应的参数转换函数"""
+    if tp is Any or tp is object:
+        return {}, _identity
+    if tp in _SCALARS:
+        return {"type": _SCALARS[tp]}, _SCALAR_CONVERTERS[tp]
+    if tp is type(None) or tp is None:
+        return {"type": "null"}, _identity
+
+    origin = get_origin(tp)
+    args = get_args(tp)
+    if origin in _UNION_TYPES:
+        return _compile_union(args)
+    if origin is Literal:
+        return _compile_literal(args)
+    if tp in (list, tuple, set, frozenset) or origin in (list, tuple, set, frozenset):
+        return _compile_sequence(origin or tp, args)
+    if tp is dict or origin is dict:
+        return _compile_mapping(args)
+    if isinstance(tp, type):
+        if issubclass(tp, enum.Enum):
+            return _compile_enum(tp)
+        if issubclass(tp, BaseModel):
+            return _compile_model(tp)
+        if dataclasses.is_dataclass(tp):
+            return _compile_dataclass(tp)
+
+        def convert(value: Any) -> Any:
+            return value if isinstance(value, tp) else tp(value)
+
+        return {}, convert
+    return {}, _identity
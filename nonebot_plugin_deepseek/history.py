@@ -0,0 +1,51 @@
+from typing import Any, Union, overload
+from collections.abc import Iterable, Iterator
+
+from .apis.template import encode_json
+
+
+class MessageHistory:
+    """对话历史，逐条缓存消息的 JSON 编码
+
+    每条消息只在追加时编码一次，组装请求体时直接拼接已编码的片段，
+    因此每轮的编码开销与历史长度无关。消息追加后不应再被修改
+    """
+
+    def __init__(self, messages: Iterable[dict[str, Any]] = ()) -> None:
+        self._messages: list[dict[str, Any]] = []
+        self._encoded: list[bytes] = []
+        for message in messages:
+            self.append(message)
+
+    def append(self, message: dict[str, Any]) -> None:
+        self._encoded.append(encode_json(message))
+        self._messages.append(message)
+
+    def replace(self, start: int, end: int, messages: Iterable[dict[str, Any]]) -> None:
+        """将 `[start, end)` 范围内的消息替换为 `messages`"""
+        messages = list(messages)
+        encoded = [encode_json(message) for message in messages]
+        self._messages[start:end] = messages
+        self._encoded[start:end] = encoded
+
+    def encoded(self) -> bytes:
+        """已编码的消息，为 JSON 数组去掉首尾方括号后的内容"""
+        return b",".join(self._encoded)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        return iter(self._messages)
+
+    @overload
+    def __getitem__(self, index: int) -> dict[str, Any]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[dict[str, Any]]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[dict[str, Any], list[dict[str, Any]]]:
+        return self._messages[index]
+
+    def __repr__(self) -> str:
+        return repr(self._messages)
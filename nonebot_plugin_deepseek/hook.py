@@ -1,19 +1,123 @@
+from pathlib import Path
+
 from nonebot import get_driver
 from nonebot.log import logger
 from nonebot_plugin_alconna import command_manager
 from nonebot_plugin_localstore import get_plugin_cache_dir
+from nonebot.drivers import URL, Request, Response, ASGIMixin, HTTPServerSetup
+
+from .ledger import ledger
+from .recorder import recorder
+from .metrics import metrics
+from .watcher import watcher
+from .outbound import outbound
+from .function_call import registry
+from .apis.template import templates
+from .dashboard import balance_monitor
+from .config import config, model_config
+from .render import get_renderer, close_renderer
 
 driver = get_driver()
-cach_dir = get_plugin_cache_dir() / "shortcut.db"
+
+
+def shortcut_cache_file() -> Path:
+    return get_plugin_cache_dir() / "shortcut.db"
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    if config.metrics_token and request.headers.get("Authorization") != f"Bearer {config.metrics_token}":
+        return Response(401, content="Unauthorized")
+    return Response(
+        200,
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        content=metrics.render_prometheus(),
+    )
+
+
+if config.metrics_path and isinstance(driver, ASGIMixin):
+    driver.setup_http_server(HTTPServerSetup(URL(config.metrics_path), "GET", "deepseek_metrics", metrics_endpoint))
 
 
 @driver.on_startup
 async def _() -> None:
-    command_manager.load_cache(cach_dir)
+    command_manager.load_cache(shortcut_cache_file())
     logger.debug("DeekSeek shortcuts cache loaded")
 
 
+@driver.on_startup
+async def _() -> None:
+    model_config.load()
+    templates.build()
+    watcher.subscribe(templates.build)
+    watcher.subscribe(model_config.ensure_enabled)
+    watcher.start(config.config_watch_interval)
+
+
+@driver.on_startup
+async def _() -> None:
+    registry.executor.configure(config.tool_thread_workers, config.tool_process_workers, config.tool_timeout)
+    if config.tool_dirs:
+        registry.load(
+            *config.tool_dirs, manifest=get_plugin_cache_dir() / "tool_manifest.json" if config.tool_manifest else None
+        )
+
+
 @driver.on_shutdown
 async def _() -> None:
-    command_manager.dump_cache(cach_dir)
+    command_manager.dump_cache(shortcut_cache_file())
     logger.debug("DeekSeek shortcuts cache dumped")
+
+
+@driver.on_shutdown
+async def _() -> None:
+    registry.executor.shutdown()
+
+
+@driver.on_startup
+async def _() -> None:
+    if renderer := get_renderer():
+        try:
+            await renderer.warm_up()
+            logger.debug("DeepSeek markdown renderer warmed up")
+        except Exception as e:
+            logger.warning(f"Failed to warm up markdown renderer: {e}")
+
+
+@driver.on_shutdown
+async def _() -> None:
+    await close_renderer()
+
+
+@driver.on_shutdown
+async def _() -> None:
+    await outbound.close()
+
+
+@driver.on_shutdown
+async def _() -> None:
+    watcher.stop()
+
+
+@driver.on_startup
+async def _() -> None:
+    balance_monitor.start(config.balance_refresh_interval)
+
+
+@driver.on_shutdown
+async def _() -> None:
+    balance_monitor.stop()
+
+
+@driver.on_startup
+async def _() -> None:
+    await ledger.start(config.ledger_flush_interval)
+
+
+@driver.on_shutdown
+async def _() -> None:
+    await ledger.stop()
+
+
+@driver.on_shutdown
+async def _() -> None:
+    await recorder.flush()
@@ -0,0 +1,319 @@
+import os
+import json
+import time
+import asyncio
+from pathlib import Path
+from typing import Any, Optional
+from dataclasses import field, asdict, dataclass
+
+from nonebot.log import logger
+import nonebot_plugin_localstore as store
+
+from .config import config
+from .schemas.usage import Usage
+
+_BATCH_SIZE = 200
+"""待写入的记录达到该数量时立即写入，不等待下一次定时写入"""
+
+
+def today() -> str:
+    return time.strftime("%Y-%m-%d")
+
+
+@dataclass
+class UsageTotals:
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hit_tokens: int = 0
+    """prompt 中命中上下文缓存的 token 数"""
+    cache_miss_tokens: int = 0
+    reasoning_tokens: int = 0
+    """completion 中思维链的 token 数"""
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, usage: Usage) -> None:
+        self.requests += 1
+        self.prompt_tokens += usage.prompt_tokens
+        self.completion_tokens += usage.completion_tokens
+        self.cache_hit_tokens += usage.prompt_cache_hit_tokens or 0
+        self.cache_miss_tokens += usage.prompt_cache_miss_tokens or 0
+        if usage.completion_tokens_details:
+            self.reasoning_tokens += usage.completion_tokens_details.reasoning_tokens or 0
+
+
+@dataclass(frozen=True)
+class UsageRecord:
+    """一次模型请求的用量"""
+
+    ts: float
+    """完成时的 Unix 时间戳"""
+    day: str
+    """本地日期（`YYYY-MM-DD`），配额按此统计"""
+    user_id: str
+    group_id: Optional[str]
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    reasoning_tokens: int
+    cache_hit_tokens: int
+    cache_miss_tokens: int
+    latency: float
+    """请求耗时（秒）"""
+
+    @classmethod
+    def of(cls, model: str, usage: Usage, user_id: str, group_id: Optional[str], latency: float) -> "UsageRecord":
+        details = usage.completion_tokens_details
+        return cls(
+            ts=round(time.time(), 3),
+            day=today(),
+            user_id=user_id,
+            group_id=group_id,
+            model=model,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            reasoning_tokens=(details.reasoning_tokens or 0) if details else 0,
+            cache_hit_tokens=usage.prompt_cache_hit_tokens or 0,
+            cache_miss_tokens=usage.prompt_cache_miss_tokens or 0,
+            latency=round(latency, 3),
+        )
+
+    def usage(self) -> Usage:
+        return Usage(
+            completion_tokens=self.completion_tokens,
+            prompt_tokens=self.prompt_tokens,
+            total_tokens=self.prompt_tokens + self.completion_tokens,
+            prompt_cache_hit_tokens=self.cache_hit_tokens,
+            prompt_cache_miss_tokens=self.cache_miss_tokens,
+            completion_tokens_details={"reasoning_tokens": self.reasoning_tokens},  # type: ignore
+        )
+
+
+@dataclass
+class DayRollup:
+    """单日用量按用户、群与模型的汇总"""
+
+    day: str
+    total: UsageTotals = field(default_factory=UsageTotals)
+    users: dict[str, UsageTotals] = field(default_factory=dict)
+    groups: dict[str, UsageTotals] = field(default_factory=dict)
+    models: dict[str, UsageTotals] = field(default_factory=dict)
+    offset: int = 0
+    """汇总已覆盖的当日账本文件字节数"""
+
+    def add(self, record: UsageRecord) -> None:
+        usage = record.usage()
+        self.total.add(usage)
+        for totals, key in ((self.users, record.user_id), (self.groups, record.group_id), (self.models, record.model)):
+            if key is None:
+                continue
+            if (entry := totals.get(key)) is None:
+                entry = totals[key] = UsageTotals()
+            entry.add(usage)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "day": self.day,
+            "offset": self.offset,
+            "total": asdict(self.total),
+            **{
+                name: {key: asdict(entry) for key, entry in getattr(self, name).items()}
+                for name in ("users", "groups", "models")
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "DayRollup":
+        return cls(
+            day=data["day"],
+            offset=data["offset"],
+            total=UsageTotals(**data["total"]),
+            **{
+                name: {key: UsageTotals(**entry) for key, entry in data[name].items()}
+                for name in ("users", "groups", "models")
+            },
+        )
+
+
+def quota_for(kind: str, key: str) -> int:
+    """`kind`（`user` 或 `group`）为 `key` 的每日 token 配额，0 为不限"""
+    if (quota := config.quota_overrides.get(f"{kind}:{key}")) is not None:
+        return quota
+    return config.quota_user_daily_tokens if kind == "user" else config.quota_group_daily_tokens
+
+
+class UsageLedger:
+    """按日分文件的只追加用量账本
+
+    记录先在事件循环中计入当日汇总（配额检查即时生效），再由后台任务分批在线程中追加写入
+    `<日期>.jsonl`，并一同写入覆盖到该处的汇总 `<日期>.rollup.json`；按日查询只需读取汇总，
+    启动时只补读汇总之后追加的记录
+    """
+
+    def __init__(self) -> None:
+        self.days: dict[str, DayRollup] = {}
+        self._directory: Optional[Path] = None
+        self._pending: list[UsageRecord] = []
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Task] = None
+
+    @property
+    def directory(self) -> Path:
+        if self._directory is None:
+            self._directory = store.get_plugin_data_dir() / "ledger"
+        return self._directory
+
+    @directory.setter
+    def directory(self, value: Path) -> None:
+        self._directory = value
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """串行化磁盘读写，在首次使用时创建以绑定到运行中的事件循环"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def record(
+        self, model: str, usage: Optional[Usage], user_id: str, group_id: Optional[str], latency: float
+    ) -> Optional[UsageRecord]:
+        if usage is None:
+            return None
+        record = UsageRecord.of(model, usage, user_id, group_id, latency)
+        if (rollup := self.days.get(record.day)) is None:
+            # 启动后才开始的日期，磁盘上不会有更早的记录
+            rollup = self.days[record.day] = DayRollup(record.day)
+        rollup.add(record)
+        if config.usage_ledger:
+            self._pending.append(record)
+            if len(self._pending) >= _BATCH_SIZE:
+                self.flush_soon()
+        return record
+
+    def used(self, kind: str, key: str, day: Optional[str] = None) -> int:
+        rollup = self.days.get(day or today())
+        entry = rollup and (rollup.users if kind == "user" else rollup.groups).get(key)
+        return entry.total_tokens if entry else 0
+
+    def check(self, user_id: str, group_id: Optional[str]) -> Optional[str]:
+        """检查用户与群当日的配额，超出时返回提示"""
+        for kind, key, name in (("user", user_id, "你"), ("group", group_id, "本群")):
+            if key is None or (quota := quota_for(kind, key)) <= 0:
+                continue
+            if (used := self.used(kind, key)) >= quota:
+                return f"{name}今日的用量已达上限（{used}/{quota} tokens），请明天再试"
+        return None
+
+    async def rollup(self, day: Optional[str] = None) -> DayRollup:
+        """某日的用量汇总，未在内存中时在线程中从磁盘读取"""
+        day = day or today()
+        if (rollup := self.days.get(day)) is None:
+            async with self.lock:
+                rollup = self.days.get(day) or await asyncio.to_thread(self._load, day)
+                self.days[day] = rollup
+        return rollup
+
+    def _load(self, day: str) -> DayRollup:
+        rollup_file = self.directory / f"{day}.rollup.json"
+        try:
+            rollup = DayRollup.from_dict(json.loads(rollup_file.read_text(encoding="utf-8")))
+        except FileNotFoundError:
+            rollup = DayRollup(day)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"用量汇总 {rollup_file.name} 已损坏，将从账本重建：{e}")
+            rollup = DayRollup(day)
+        # 补读汇总之后追加的记录（例如写入汇总前进程退出）
+        try:
+            with (self.directory / f"{day}.jsonl").open("rb") as f:
+                f.seek(rollup.offset)
+                for line in f:
+                    if line.endswith(b"\n"):
+                        rollup.add(UsageRecord(**json.loads(line)))
+                        rollup.offset += len(line)
+        except FileNotFoundError:
+            pass
+        return rollup
+
+    def _write(self, batches: dict[str, list[str]], snapshots: dict[str, dict[str, Any]]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for day, lines in batches.items():
+            with (self.directory / f"{day}.jsonl").open("a", encoding="utf-8") as f:
+                f.writelines(lines)
+                f.flush()
+                offset = f.tell()
+            snapshot = snapshots[day]
+            snapshot["offset"] = offset
+            tmp = self.directory / f"{day}.rollup.json.tmp"
+            tmp.write_text(json.dumps(snapshot, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.directory / f"{day}.rollup.json")
+
+    async def flush(self) -> None:
+        """将待写入的记录写入磁盘"""
+        async with self.lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            batches: dict[str, list[str]] = {}
+            for record in batch:
+                batches.setdefault(record.day, []).append(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+            # 与取出记录同时生成汇总快照，快照恰好覆盖到本批的最后一条记录
+            snapshots = {day: self.days[day].to_dict() for day in batches}
+            try:
+                await asyncio.to_thread(self._write, batches, snapshots)
+            except OSError as e:
+                logger.error(f"写入用量账本失败，{len(batch)} 条记录将在下次重试：{e}")
+                self._pending[:0] = batch
+                return
+            for day, snapshot in snapshots.items():
+                self.days[day].offset = snapshot["offset"]
+
+    def flush_soon(self) -> None:
+        if self._flushing is None or self._flushing.done():
+            self._flushing = asyncio.create_task(self.flush())
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    async def start(self, interval: float) -> None:
+        """载入当日汇总并开始定时写入"""
+        await self.rollup()
+        if self._task is None and interval > 0:
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+def render_rollup(rollup: DayRollup, *, top: int = 5) -> str:
+    total = rollup.total
+    lines = [
+        f"{rollup.day} 用量：{total.requests} 次请求，{total.total_tokens} tokens"
+        f"（输入 {total.prompt_tokens}，缓存命中 {total.cache_hit_tokens}，输出 {total.completion_tokens}，"
+        f"思维链 {total.reasoning_tokens}）"
+    ]
+    for title, totals in (("按模型", rollup.models), ("按用户", rollup.users), ("按群", rollup.groups)):
+        ranked = sorted(totals.items(), key=lambda item: -item[1].total_tokens)[:top]
+        lines.append(f"{title}：" + ("、".join(f"{key} {entry.total_tokens}" for key, entry in ranked) or "无"))
+    return "\n".join(lines)
+
+
+def render_quota(ledger: UsageLedger, user_id: str, group_id: Optional[str]) -> str:
+    lines = []
+    for kind, key, name in (("user", user_id, "你"), ("group", group_id, "本群")):
+        if key is None:
+            continue
+        used, quota = ledger.used(kind, key), quota_for(kind, key)
+        lines.append(f"{name}今日已用 {used} tokens" + (f"，配额 {quota}" if quota > 0 else "，不限额"))
+    return "\n".join(lines)
+
+
+ledger = UsageLedger()
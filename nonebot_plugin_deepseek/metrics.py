@@ -0,0 +1,227 @@
+import math
+from bisect import bisect_left
+from typing import Union, Optional
+
+from .schemas.usage import Usage
+
+Number = Union[int, float]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+"""秒级耗时的默认分桶上界"""
+FAST_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 0.01, 0.05)
+"""微秒至毫秒级耗时（如请求体拼装）的分桶上界"""
+
+
+class _Series:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, size: int) -> None:
+        self.counts = [0] * size
+        """各分桶的计数（非累计），最后一个为 `+Inf` 桶"""
+        self.sum: float = 0
+
+
+class Histogram:
+    """固定分桶的直方图
+
+    记录只有一次二分查找与两次加法，不加锁（仅在事件循环线程中记录）；
+    `label` 为可选的单个标签名，不同标签值各自计数
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...] = LATENCY_BUCKETS, label: str = "") -> None:
+        self.name = name
+        self.help = help
+        self.bounds = buckets
+        self.label = label
+        self.series: dict[str, _Series] = {}
+
+    def observe(self, value: float, key: str = "") -> None:
+        """记录一个样本，`key` 为标签值"""
+        if (series := self.series.get(key)) is None:
+            series = self.series[key] = _Series(len(self.bounds) + 1)
+        series.counts[bisect_left(self.bounds, value)] += 1
+        series.sum += value
+
+    def count(self, key: Optional[str] = None) -> int:
+        return sum(sum(series.counts) for name, series in self.series.items() if key is None or name == key)
+
+    def quantile(self, q: float, key: Optional[str] = None) -> Optional[float]:
+        """按分桶线性插值估算分位数，没有样本时为 `None`，落入 `+Inf` 桶时返回最大的上界"""
+        counts = [0] * (len(self.bounds) + 1)
+        for name, series in self.series.items():
+            if key is None or name == key:
+                counts = [a + b for a, b in zip(counts, series.counts)]
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                if index == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0
+                return lower + (self.bounds[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, series in sorted(self.series.items()):
+            prefix = f'{self.label}="{_escape(key)}",' if self.label else ""
+            cumulative = 0
+            for bound, count in zip((*self.bounds, math.inf), series.counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            labels = f"{{{prefix[:-1]}}}" if prefix else ""
+            lines.append(f"{self.name}_sum{labels} {series.sum!r}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Counter:
+    """只增计数器，`label` 为可选的单个标签名"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label: str = "") -> None:
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values: dict[str, Number] = {}
+
+    def inc(self, amount: Number = 1, key: str = "") -> None:
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def total(self) -> Number:
+        return sum(self.values.values())
+
+    def samples(self) -> list[str]:
+        return [
+            f'{self.name}{{{self.label}="{_escape(key)}"}} {value}' if self.label else f"{self.name} {value}"
+            for key, value in sorted(self.values.items())
+        ]
+
+
+Metric = Union[Histogram, Counter]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.metrics: dict[str, Metric] = {}
+
+    def histogram(
+        self, name: str, help: str, buckets: tuple[float, ...] = LATENCY_BUCKETS, label: str = ""
+    ) -> Histogram:
+        metric = self.metrics[name] = Histogram(name, help, buckets, label)
+        return metric
+
+    def counter(self, name: str, help: str, label: str = "") -> Counter:
+        metric = self.metrics[name] = Counter(name, help, label)
+        return metric
+
+    def render_prometheus(self) -> str:
+        """以 Prometheus 文本格式（0.0.4）输出全部指标"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def render_summary(self) -> str:
+        """供聊天指令展示的摘要：直方图的次数与分位数，计数器按标签展开"""
+        lines = []
+        for metric in self.metrics.values():
+            if isinstance(metric, Histogram):
+                if not (count := metric.count()):
+                    continue
+                p50, p95 = metric.quantile(0.5), metric.quantile(0.95)
+                lines.append(f"{metric.help}：{count} 次，p50 {_format_seconds(p50)}，p95 {_format_seconds(p95)}")
+            elif metric.values:
+                detail = "，".join(f"{key} {value}" for key, value in sorted(metric.values.items()) if key)
+                lines.append(f"{metric.help}：{metric.total()}" + (f"（{detail}）" if detail else ""))
+        return "\n".join(lines) or "暂无数据"
+
+    def reset(self) -> None:
+        for metric in self.metrics.values():
+            if isinstance(metric, Histogram):
+                metric.series.clear()
+            else:
+                metric.values.clear()
+
+
+def _format_seconds(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    if value < 1e-3:
+        return f"{value * 1e6:.0f}µs"
+    if value < 1:
+        return f"{value * 1e3:.0f}ms"
+    return f"{value:.2f}s"
+
+
+metrics = MetricsRegistry()
+
+queue_wait = metrics.histogram("deepseek_send_queue_wait_seconds", "发送排队")
+ocr_latency = metrics.histogram("deepseek_ocr_seconds", "图片识别")
+prompt_assembly = metrics.histogram("deepseek_prompt_assembly_seconds", "请求体拼装", FAST_BUCKETS)
+first_token = metrics.histogram("deepseek_time_to_first_token_seconds", "首 token", label="model")
+completion_latency = metrics.histogram("deepseek_completion_seconds", "模型请求", label="model")
+tool_latency = metrics.histogram("deepseek_tool_seconds", "工具调用", label="tool")
+send_latency = metrics.histogram("deepseek_send_seconds", "消息发送")
+tokens = metrics.counter("deepseek_tokens_total", "tokens", label="type")
+errors = metrics.counter("deepseek_errors_total", "错误", label="type")
+cancellations = metrics.counter("deepseek_cancellations_total", "取消的会话")
+semantic_cache_lookups = metrics.counter("deepseek_semantic_cache_lookups_total", "语义缓存", label="result")
+semantic_cache_samples = metrics.counter("deepseek_semantic_cache_samples_total", "语义缓存抽检", label="verdict")
+compactions = metrics.counter("deepseek_compactions_total", "对话压缩", label="result")
+compaction_saved_tokens = metrics.counter("deepseek_compaction_saved_tokens_total", "对话压缩节省的 tokens")
+
+
+def cache_hit_ratio() -> Optional[float]:
+    """prompt 中命中上下文缓存的 token 比例"""
+    hit = tokens.values.get("prompt_cache_hit", 0)
+    miss = tokens.values.get("prompt_cache_miss", 0)
+    return hit / (hit + miss) if hit + miss else None
+
+
+def semantic_cache_ratios() -> tuple[Optional[float], Optional[float]]:
+    """语义缓存的命中率，与抽检中疑似误命中的比例"""
+    hit = semantic_cache_lookups.values.get("hit", 0)
+    total = semantic_cache_lookups.total()
+    inconsistent = semantic_cache_samples.values.get("inconsistent", 0)
+    sampled = semantic_cache_samples.total()
+    return (hit / total if total else None), (inconsistent / sampled if sampled else None)
+
+
+def render_stats() -> str:
+    summary = metrics.render_summary()
+    if (ratio := cache_hit_ratio()) is not None:
+        summary += f"\n上下文缓存命中率：{ratio:.1%}"
+    hit_ratio, false_ratio = semantic_cache_ratios()
+    if hit_ratio is not None:
+        summary += f"\n语义缓存命中率：{hit_ratio:.1%}"
+    if false_ratio is not None:
+        summary += f"，抽检疑似误命中率：{false_ratio:.1%}"
+    return summary
+
+
+def record_usage(usage: Optional[Usage]) -> None:
+    if usage is None:
+        return
+    tokens.inc(usage.prompt_tokens, "prompt")
+    tokens.inc(usage.completion_tokens, "completion")
+    if usage.prompt_cache_hit_tokens is not None:
+        tokens.inc(usage.prompt_cache_hit_tokens, "prompt_cache_hit")
+    if usage.prompt_cache_miss_tokens is not None:
+        tokens.inc(usage.prompt_cache_miss_tokens, "prompt_cache_miss")
+    if usage.completion_tokens_details and usage.completion_tokens_details.reasoning_tokens:
+        tokens.inc(usage.completion_tokens_details.reasoning_tokens, "reasoning")
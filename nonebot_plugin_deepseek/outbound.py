@@ -0,0 +1,292 @@
+import time
+import asyncio
+from collections import deque
+from typing import Union, Optional
+from dataclasses import field, dataclass
+
+from nonebot.log import logger
+from nonebot.adapters import Bot, Event
+from nonebot_plugin_alconna.uniseg import UniMessage
+
+from .config import config
+from .tracing import span
+from .render import split_markdown
+from .metrics import errors, queue_wait, send_latency
+
+OutgoingMessage = Union[str, UniMessage]
+
+_IDLE_TIMEOUT = 60
+"""队列空闲该秒数后其发送协程退出，队列随之被移除"""
+_LATENCY_ALPHA = 0.2
+
+
+class TokenBucket:
+    """令牌桶限速，`rate` 为每秒补充的令牌数，`capacity` 为允许的突发量"""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> float:
+        """尝试取出一个令牌，成功返回 0，否则返回需要等待的秒数"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        while (delay := self.try_acquire()) > 0:
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class Outgoing:
+    bot: Bot
+    """发送时使用的机器人，重连后同一账号会对应新的实例"""
+    event: Event
+    message: OutgoingMessage
+    at_sender: bool
+    forward: Optional[list[str]] = None
+    """非空时作为合并转发消息发送的各段文本"""
+    future: Optional[asyncio.Future] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class QueueStats:
+    depth: int = 0
+    sent: int = 0
+    """实际调用发送接口的次数"""
+    messages: int = 0
+    """经由队列发送的消息条数（合并前）"""
+    coalesced: int = 0
+    failed: int = 0
+    latency: float = 0
+    """入队到发送完成的耗时（秒，指数滑动平均）"""
+    max_latency: float = 0
+
+
+def target_key(bot: Bot, event: Event) -> str:
+    """按机器人与会话目标（群或用户）区分队列"""
+    if (group_id := getattr(event, "group_id", None)) is not None:
+        return f"{bot.self_id}:group:{group_id}"
+    return f"{bot.self_id}:user:{event.get_user_id()}"
+
+
+def _coalescable(head: Outgoing, item: Outgoing) -> bool:
+    return (
+        isinstance(item.message, str)
+        and item.forward is None
+        and item.at_sender == head.at_sender
+        and item.event.get_user_id() == head.event.get_user_id()
+    )
+
+
+class SendQueue:
+    """单个会话目标的发送队列
+
+    由独立的发送协程按令牌桶节奏依次发送，等待令牌期间入队的相邻短文本会合并为一条消息
+    """
+
+    def __init__(self, key: str, owner: Optional[dict[str, "SendQueue"]] = None) -> None:
+        self.key = key
+        self.bucket = TokenBucket(config.send_rate, config.send_burst)
+        self.stats = QueueStats()
+        self._items: deque[Outgoing] = deque()
+        self._changed = asyncio.Condition()
+        self._worker: Optional[asyncio.Task] = None
+        self._owner = owner
+        """登记该队列的映射，发送协程因空闲退出时从中移除，重新启动时再登记"""
+
+    @property
+    def pressure(self) -> float:
+        """队列占用比例，达到 1 时新消息的入队将被阻塞"""
+        return len(self._items) / config.send_queue_size
+
+    async def put(self, item: Outgoing) -> None:
+        async with self._changed:
+            if len(self._items) >= config.send_queue_size:
+                logger.warning(f"发送队列 {self.key} 已满，等待发送")
+            await self._changed.wait_for(lambda: len(self._items) < config.send_queue_size)
+            # 取得队列后、入队前该队列可能恰好因空闲被移除，且已有新的队列登记；
+            # 此时交给登记的队列发送，同一会话目标始终只有一个发送协程，限速不会被绕过
+            registered = self if self._owner is None else self._owner.setdefault(self.key, self)
+            if registered is self:
+                self._items.append(item)
+                self.stats.depth = len(self._items)
+                self._changed.notify_all()
+                if self._worker is None or self._worker.done():
+                    self._worker = asyncio.create_task(self._run())
+                return
+        await registered.put(item)
+
+    def _take_batch(self) -> list[Outgoing]:
+        batch = [self._items.popleft()]
+        head = batch[0]
+        if not _coalescable(head, head):
+            return batch
+        size = len(head.message)
+        # 合并后不应超过拆分长度，否则拆分出的相邻段落会被重新合并
+        limit = min(config.send_coalesce_chars, config.send_max_chars)
+        while self._items and _coalescable(head, self._items[0]):
+            if size + len(self._items[0].message) > limit:
+                break
+            item = self._items.popleft()
+            size += len(item.message) + 1
+            batch.append(item)
+        return batch
+
+    async def _send(self, batch: list[Outgoing]) -> None:
+        head = batch[0]
+        bot = head.bot
+        if head.forward is not None:
+            nodes = [
+                {"type": "node", "data": {"name": "DeepSeek", "uin": bot.self_id, "content": piece}}
+                for piece in head.forward
+            ]
+            if (group_id := getattr(head.event, "group_id", None)) is not None:
+                await bot.call_api("send_group_forward_msg", group_id=group_id, messages=nodes)
+            else:
+                await bot.call_api("send_private_forward_msg", user_id=head.event.get_user_id(), messages=nodes)
+        elif isinstance(head.message, UniMessage):
+            await head.message.send(target=head.event, bot=bot, at_sender=head.at_sender)
+        else:
+            text = "\n".join(item.message for item in batch)  # type: ignore
+            await bot.send(head.event, text, at_sender=head.at_sender)
+
+    async def _run(self) -> None:
+        while True:
+            async with self._changed:
+                try:
+                    await asyncio.wait_for(self._changed.wait_for(lambda: self._items), _IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    if not self._items:
+                        self._worker = None
+                        # 不保留空闲的队列，否则每个收到过回复的群或用户都会一直占用一个队列
+                        if self._owner is not None and self._owner.get(self.key) is self:
+                            del self._owner[self.key]
+                        return
+
+            # 先等待令牌，期间入队的相邻短消息可以合并
+            await self.bucket.acquire()
+            async with self._changed:
+                batch = self._take_batch()
+                self.stats.depth = len(self._items)
+                self._changed.notify_all()
+
+            start = time.monotonic()
+            for item in batch:
+                queue_wait.observe(start - item.enqueued_at)
+            try:
+                await self._send(batch)
+            except Exception as e:
+                errors.inc(key=type(e).__name__)
+                self.stats.failed += len(batch)
+                logger.error(f"发送消息至 {self.key} 失败：{e}")
+                for item in batch:
+                    if item.future and not item.future.done():
+                        item.future.set_exception(e)
+                continue
+
+            now = time.monotonic()
+            send_latency.observe(now - start)
+            stats = self.stats
+            stats.sent += 1
+            stats.messages += len(batch)
+            stats.coalesced += len(batch) - 1
+            for item in batch:
+                latency = now - item.enqueued_at
+                stats.latency += (latency - stats.latency) * _LATENCY_ALPHA
+                stats.max_latency = max(stats.max_latency, latency)
+                if item.future and not item.future.done():
+                    item.future.set_result(None)
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        for item in self._items:
+            if item.future and not item.future.done():
+                item.future.cancel()
+        self._items.clear()
+
+
+class Outbound:
+    """出站消息调度，所有回复都应经由此处发送"""
+
+    def __init__(self) -> None:
+        self.queues: dict[str, SendQueue] = {}
+
+    def queue(self, bot: Bot, event: Event) -> SendQueue:
+        key = target_key(bot, event)
+        if (queue := self.queues.get(key)) is None:
+            queue = self.queues[key] = SendQueue(key, self.queues)
+        return queue
+
+    def pressure(self, bot: Bot, event: Event) -> float:
+        """会话目标的背压信号，0 表示空闲，1 表示队列已满"""
+        queue = self.queues.get(target_key(bot, event))
+        return queue.pressure if queue else 0
+
+    def congested(self, bot: Bot, event: Event) -> bool:
+        return self.pressure(bot, event) >= config.send_congestion_threshold
+
+    def _split(self, bot: Bot, event: Event, message: str, forward: bool) -> list[tuple[str, Optional[list[str]]]]:
+        if len(message) <= config.send_max_chars and not forward:
+            return [(message, None)]
+        pieces = split_markdown(message, config.send_max_chars)
+        if bot.adapter.get_name() == "OneBot V11" and (
+            forward
+            or (config.send_long_as_forward and len(pieces) > 1 and getattr(event, "group_id", None) is not None)
+        ):
+            return [(message, pieces)]
+        return [(piece, None) for piece in pieces]
+
+    async def send(
+        self,
+        bot: Bot,
+        event: Event,
+        message: OutgoingMessage,
+        *,
+        at_sender: bool = False,
+        wait: bool = True,
+        forward: bool = False,
+    ) -> None:
+        """将消息放入会话目标的发送队列
+
+        参数:
+            at_sender: 是否 @ 发送者，长消息拆分后只在第一条中 @
+            wait: 是否等待消息实际发出，为 `False` 时发送失败只记录日志
+            forward: 是否以可折叠的合并转发消息发送（仅 OneBot V11，其余适配器按普通消息发送）
+        """
+        queue = self.queue(bot, event)
+        parts = self._split(bot, event, message, forward) if isinstance(message, str) else [(message, None)]
+        loop = asyncio.get_running_loop()
+        futures = []
+        with span("send", parts=len(parts), wait=wait):
+            for index, (part, nodes) in enumerate(parts):
+                future = loop.create_future() if wait else None
+                await queue.put(Outgoing(bot, event, part, at_sender and index == 0, nodes, future))
+                if future is not None:
+                    futures.append(future)
+            if futures:
+                await asyncio.gather(*futures)
+
+    def stats(self) -> dict[str, QueueStats]:
+        return {key: queue.stats for key, queue in self.queues.items()}
+
+    async def close(self) -> None:
+        for queue in self.queues.values():
+            await queue.close()
+        self.queues.clear()
+
+
+outbound = Outbound()
@@ -0,0 +1,230 @@
+import re
+import gzip
+import json
+import time
+import codecs
+import asyncio
+from pathlib import Path
+from collections import deque
+from typing import Any, Optional, cast
+from collections.abc import AsyncIterator
+
+import httpx
+from nonebot.log import logger
+import nonebot_plugin_localstore as store
+
+from .config import config
+
+_SECRET_PATTERN = re.compile(r"sk-[A-Za-z0-9_\-]{8,}|Bearer\s+[^\s\"]+")
+_REDACTED = "***"
+
+
+def archive_path() -> Optional[Path]:
+    """录制文件的路径，未启用录制时为 `None`；相对路径位于插件数据目录下"""
+    if not config.record_path:
+        return None
+    path = Path(config.record_path)
+    return path if path.is_absolute() else store.get_plugin_data_dir() / path
+
+
+def sanitize(text: str) -> str:
+    """移除 API Key 与 Bearer 凭据"""
+    if config.api_key:
+        text = text.replace(config.api_key, _REDACTED)
+    return _SECRET_PATTERN.sub(_REDACTED, text)
+
+
+def open_archive(path: Path, mode: str):
+    """以文本模式打开录制文件，`.gz` 结尾时为 gzip 压缩（追加写入时每批为一个 gzip 成员）"""
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return path.open(mode, encoding="utf-8")
+
+
+def load_archive(path: Path) -> list[dict[str, Any]]:
+    with open_archive(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class Recorder:
+    """将模型请求与工具调用录制为 JSONL，供 `benchmarks.bench_replay` 回放
+
+    每条记录在事件循环中生成，由后台任务在线程中分批追加写入；凭据在写入前移除，
+    请求头不录制
+    """
+
+    def __init__(self) -> None:
+        self._pending: list[dict[str, Any]] = []
+        self._flushing: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(config.record_path)
+
+    def add(self, entry: dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        self._pending.append(entry)
+        # 写入进行中时新记录留待下一批
+        if self._flushing is None or self._flushing.done():
+            self._flushing = asyncio.create_task(self.flush())
+
+    def _write(self, path: Path, lines: list[str]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open_archive(path, "a") as f:
+            f.writelines(lines)
+
+    async def flush(self) -> None:
+        while self._pending and (path := archive_path()) is not None:
+            batch, self._pending = self._pending, []
+            lines = [sanitize(json.dumps(entry, ensure_ascii=False, separators=(",", ":"))) + "\n" for entry in batch]
+            try:
+                await asyncio.to_thread(self._write, path, lines)
+            except OSError as e:
+                logger.error(f"写入录制文件失败，丢弃 {len(batch)} 条记录：{e}")
+
+    def client(self) -> httpx.AsyncClient:
+        """供模型请求使用的客户端，启用录制时经由 `RecordingTransport`"""
+        if not self.enabled:
+            return httpx.AsyncClient()
+        return httpx.AsyncClient(transport=RecordingTransport(httpx.AsyncHTTPTransport(), self))
+
+    def tool_call(
+        self, name: str, arguments: str, result: Optional[str], ts: float, duration: float, error: Optional[str] = None
+    ) -> None:
+        self.add(
+            {
+                "kind": "tool",
+                "ts": round(ts, 4),
+                "name": name,
+                "arguments": arguments,
+                "result": result,
+                "duration": round(duration, 4),
+                "error": error,
+            }
+        )
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, entry: dict[str, Any], start: float, recorder: Recorder) -> None:
+        self.stream = stream
+        self.entry = entry
+        self.start = start
+        self.recorder = recorder
+        # 多字节字符可能跨分块
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.stream:
+            self.entry["chunks"].append([round(time.perf_counter() - self.start, 4), self.decoder.decode(chunk)])
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self.stream.aclose()
+        self.entry["duration"] = round(time.perf_counter() - self.start, 4)
+        self.recorder.add(self.entry)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """包装实际的传输层，记录请求体、响应状态与带时间偏移的响应分块"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, recorder: Recorder) -> None:
+        self.transport = transport
+        self.recorder = recorder
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        # 要求不压缩的响应，分块即为可直接回放的文本
+        request.headers["Accept-Encoding"] = "identity"
+        ts = time.time()
+        start = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        entry = {
+            "kind": "chat",
+            "ts": round(ts, 4),
+            "method": request.method,
+            "path": request.url.path,
+            "request": json.loads(request.content or b"null"),
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", ""),
+            "ttfb": round(time.perf_counter() - start, 4),
+            "chunks": [],
+        }
+        stream = cast(httpx.AsyncByteStream, response.stream)
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(stream, entry, start, self.recorder),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def request_key(request: Any) -> str:
+    """按模型、消息与是否流式匹配录制的请求"""
+    if not isinstance(request, dict):
+        return ""
+    fields = [request.get("model"), bool(request.get("stream")), request.get("messages")]
+    return json.dumps(fields, ensure_ascii=False, sort_keys=True)
+
+
+class _ReplayStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: list[list[Any]], start: float, speed: float) -> None:
+        self.chunks = chunks
+        self.start = start
+        self.speed = speed
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for offset, text in self.chunks:
+            if (delay := self.start + offset / self.speed - time.perf_counter()) > 0:
+                await asyncio.sleep(delay)
+            yield text.encode()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """以录制的响应应答模型请求，按原始（或以 `speed` 倍加速的）首字节与分块时间回放，不访问网络
+
+    请求按模型、消息与是否流式精确匹配录制记录，匹配不到时依次取同一模型尚未回放的记录；
+    仍无可用记录时应答 404 并计入 `misses`
+    """
+
+    def __init__(self, entries: list[dict[str, Any]], speed: float = 1) -> None:
+        self.speed = speed
+        self.misses = 0
+        self._by_key: dict[str, deque[dict[str, Any]]] = {}
+        self._by_model: dict[Any, deque[dict[str, Any]]] = {}
+        self._used: set[int] = set()
+        for entry in entries:
+            if entry.get("kind") != "chat":
+                continue
+            self._by_key.setdefault(request_key(entry["request"]), deque()).append(entry)
+            self._by_model.setdefault((entry["request"] or {}).get("model"), deque()).append(entry)
+
+    def _take(self, queue: Optional[deque[dict[str, Any]]]) -> Optional[dict[str, Any]]:
+        while queue:
+            entry = queue.popleft()
+            if id(entry) not in self._used:
+                self._used.add(id(entry))
+                return entry
+        return None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        body = json.loads(request.content or b"null")
+        entry = self._take(self._by_key.get(request_key(body)))
+        if entry is None and isinstance(body, dict):
+            entry = self._take(self._by_model.get(body.get("model")))
+        if entry is None:
+            self.misses += 1
+            return httpx.Response(404, json={"error": {"message": "No recorded response for this request"}})
+        if (delay := start + entry["ttfb"] / self.speed - time.perf_counter()) > 0:
+            await asyncio.sleep(delay)
+        return httpx.Response(
+            entry["status"],
+            headers={"content-type": entry["content_type"]},
+            stream=_ReplayStream(entry["chunks"], start, self.speed),
+        )
+
+
+recorder = Recorder()
@@ -0,0 +1,274 @@
+import os
+import html
+import time
+import asyncio
+import hashlib
+from pathlib import Path
+from importlib.util import find_spec
+from contextlib import asynccontextmanager
+from typing import Any, Literal, Optional, Protocol
+from collections.abc import Callable, Awaitable, AsyncIterator
+
+from nonebot.log import logger
+import nonebot_plugin_localstore as store
+
+from .config import config
+
+ThemeType = Literal["light", "dark"]
+
+_THEMES: dict[str, str] = {
+    "light": "--fg:#1f2328;--bg:#ffffff;--muted:#59636e;--code-bg:#f6f8fa;--border:#d1d9e0;--link:#0969da;",
+    "dark": "--fg:#e6edf3;--bg:#0d1117;--muted:#9198a1;--code-bg:#151b23;--border:#3d444d;--link:#4493f8;",
+}
+_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><style>
+:root {{ {variables} }}
+html, body {{ margin: 0; padding: 0; background: var(--bg); }}
+#content {{
+  width: {width}px; box-sizing: border-box; padding: 24px 28px; color: var(--fg); font-size: 16px; line-height: 1.6;
+  font-family: -apple-system, "Segoe UI", "Noto Sans CJK SC", "Microsoft YaHei", sans-serif; word-wrap: break-word;
+}}
+#content pre, #content code {{ font-family: "JetBrains Mono", "Fira Code", Consolas, monospace; font-size: 14px; }}
+#content pre {{ background: var(--code-bg); padding: 12px 16px; border-radius: 6px; white-space: pre-wrap; }}
+#content :not(pre) > code {{ background: var(--code-bg); padding: 2px 5px; border-radius: 4px; }}
+#content blockquote {{ margin: 0; padding: 0 1em; color: var(--muted); border-left: 4px solid var(--border); }}
+#content table {{ border-collapse: collapse; }}
+#content th, #content td {{ border: 1px solid var(--border); padding: 6px 12px; }}
+#content a {{ color: var(--link); }}
+</style></head><body><div id="content"></div></body></html>"""
+# 替换正文后等待字体与图片加载完成，避免截图中出现回退字体
+_SET_CONTENT_SCRIPT = """async (html) => {
+  document.getElementById("content").innerHTML = html;
+  await document.fonts.ready;
+  await Promise.all(Array.from(document.images).map(img => img.complete ? null : img.decode().catch(() => null)));
+}"""
+
+
+class RenderPage(Protocol):
+    """渲染所需的页面接口，与 playwright 的 `Page` 保持一致"""
+
+    async def set_content(self, html: str) -> Any: ...
+
+    async def evaluate(self, expression: str, arg: Any = None) -> Any: ...
+
+    async def screenshot(self, *, full_page: bool, type: Literal["png"]) -> bytes: ...
+
+    async def close(self) -> Any: ...
+
+
+PageFactory = Callable[[int], Awaitable[RenderPage]]
+
+
+def markdown_to_html(text: str) -> str:
+    try:
+        import markdown
+    except ImportError:
+        return f"<pre>{html.escape(text)}</pre>"
+    return markdown.markdown(text, extensions=["fenced_code", "tables", "sane_lists", "nl2br"])
+
+
+def _markdown_blocks(text: str) -> list[str]:
+    """按空行切分段落，代码块内的空行不作为分隔"""
+    blocks: list[str] = []
+    current: list[str] = []
+    in_fence = False
+
+    for line in text.splitlines(keepends=True):
+        if line.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+        if not in_fence and not line.strip():
+            if current:
+                blocks.append("".join(current).rstrip("\n"))
+                current = []
+            continue
+        current.append(line)
+
+    if current:
+        blocks.append("".join(current).rstrip("\n"))
+    return blocks
+
+
+def split_markdown(text: str, max_chars: int) -> list[str]:
+    """按段落将 Markdown 切分为约 `max_chars` 字的块，不在段落与代码块内部切分
+
+    超过 `max_chars` 两倍的单个段落按行强制切分，以保证单张图片的大小有界
+    """
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+
+    def flush() -> None:
+        nonlocal current, size
+        if current:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+
+    for block in _markdown_blocks(text):
+        if current and size + len(block) > max_chars:
+            flush()
+        if len(block) <= max_chars * 2:
+            current.append(block)
+            size += len(block) + 2
+            continue
+
+        lines: list[str] = []
+        length = 0
+        for line in block.splitlines():
+            if lines and length + len(line) > max_chars:
+                chunks.append("\n".join(lines))
+                lines, length = [], 0
+            lines.append(line)
+            length += len(line) + 1
+        current, size = ["\n".join(lines)], length
+
+    flush()
+    return chunks
+
+
+class MarkdownRenderer:
+    """基于预热页面池的 Markdown 转图片渲染器
+
+    页面在首次使用时创建并加载模板（样式与字体），之后渲染只替换正文节点；
+    渲染结果按内容与主题的哈希缓存至磁盘
+    """
+
+    def __init__(
+        self,
+        page_factory: PageFactory,
+        cache_dir: Optional[Path] = None,
+        *,
+        pool_size: int = 2,
+        width: int = 720,
+        theme: ThemeType = "light",
+        chunk_chars: int = 3000,
+        cache_max_bytes: int = 64 * 1024 * 1024,
+        to_html: Callable[[str], str] = markdown_to_html,
+    ) -> None:
+        self.page_factory = page_factory
+        self.cache_dir = cache_dir
+        self.pool_size = pool_size
+        self.width = width
+        self.theme: ThemeType = theme
+        self.chunk_chars = chunk_chars
+        self.cache_max_bytes = cache_max_bytes
+        self.to_html = to_html
+        self._idle: asyncio.Queue[RenderPage] = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(pool_size)
+        self._pages: list[RenderPage] = []
+
+    async def _new_page(self) -> RenderPage:
+        page = await self.page_factory(self.width)
+        await page.set_content(_TEMPLATE.format(variables=_THEMES[self.theme], width=self.width))
+        self._pages.append(page)
+        return page
+
+    async def warm_up(self) -> None:
+        """预先创建并加载所有页面"""
+        for _ in range(self.pool_size - len(self._pages)):
+            self._idle.put_nowait(await self._new_page())
+
+    @asynccontextmanager
+    async def _page(self) -> AsyncIterator[RenderPage]:
+        async with self._semaphore:
+            page = self._idle.get_nowait() if not self._idle.empty() else await self._new_page()
+            try:
+                yield page
+            except BaseException:
+                # 出错的页面状态未知，直接丢弃，后续按需重建
+                self._pages.remove(page)
+                await asyncio.shield(page.close())
+                raise
+            self._idle.put_nowait(page)
+
+    def _cache_path(self, chunk: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        key = hashlib.sha256(f"{self.theme}:{self.width}:{chunk}".encode()).hexdigest()
+        return self.cache_dir / f"{key}.png"
+
+    def _read_cache(self, path: Path) -> Optional[bytes]:
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        now = time.time()
+        os.utime(path, (now, now))
+        return data
+
+    def _write_cache(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+        files = [(file, file.stat()) for file in path.parent.glob("*.png")]
+        total = sum(stat.st_size for _, stat in files)
+        for file, stat in sorted(files, key=lambda item: item[1].st_mtime):
+            if total <= self.cache_max_bytes:
+                break
+            file.unlink(missing_ok=True)
+            total -= stat.st_size
+
+    async def _render_chunk(self, chunk: str) -> bytes:
+        path = self._cache_path(chunk)
+        if path and (cached := await asyncio.to_thread(self._read_cache, path)) is not None:
+            return cached
+
+        body = self.to_html(chunk)
+        async with self._page() as page:
+            await page.evaluate(_SET_CONTENT_SCRIPT, body)
+            image = await page.screenshot(full_page=True, type="png")
+
+        if path:
+            try:
+                await asyncio.to_thread(self._write_cache, path, image)
+            except OSError as e:
+                logger.warning(f"Failed to cache rendered markdown: {e}")
+        return image
+
+    async def render(self, text: str) -> AsyncIterator[bytes]:
+        """将 Markdown 渲染为图片，长文本按段落切分为多张并逐张产出，内存占用与文本长度无关"""
+        for chunk in split_markdown(text, self.chunk_chars):
+            yield await self._render_chunk(chunk)
+
+    async def close(self) -> None:
+        pages, self._pages = self._pages, []
+        self._idle = asyncio.Queue()
+        for page in pages:
+            await page.close()
+
+
+async def htmlrender_page(width: int) -> RenderPage:
+    """使用 `nonebot-plugin-htmlrender` 提供的浏览器创建页面"""
+    from nonebot_plugin_htmlrender import get_browser
+
+    browser = await get_browser()
+    return await browser.new_page(viewport={"width": width, "height": 10}, device_scale_factor=2)
+
+
+_renderer: Optional[MarkdownRenderer] = None
+
+
+def get_renderer() -> Optional[MarkdownRenderer]:
+    """获取全局渲染器，未启用 `md_to_pic` 或未安装 `nonebot-plugin-htmlrender` 时返回 `None`
+
+    渲染器内部的队列与信号量须在事件循环中创建，因此在首次使用时才初始化
+    """
+    global _renderer
+    if _renderer is None and config.md_to_pic and find_spec("nonebot_plugin_htmlrender"):
+        _renderer = MarkdownRenderer(
+            htmlrender_page,
+            store.get_plugin_cache_dir() / "render",
+            pool_size=config.render_pool_size,
+            theme=config.render_theme,
+            chunk_chars=config.render_chunk_chars,
+            cache_max_bytes=config.render_cache_max_bytes,
+        )
+    return _renderer
+
+
+async def close_renderer() -> None:
+    global _renderer
+    if _renderer is not None:
+        await _renderer.close()
+        _renderer = None
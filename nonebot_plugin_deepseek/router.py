@@ -0,0 +1,201 @@
+import re
+import time
+from typing import Optional
+from dataclasses import dataclass
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from nonebot.log import logger
+
+from .config import config
+
+# 特征均为子串匹配，比等价的正则分支快一个数量级
+_CODE_MARKERS = (
+    "```", "def ", "class ", "import ", "#include", "function ", "=>", "();", "){", "public ", "console.", "print(",
+)  # fmt: skip
+_MATH_MARKERS = (
+    "$", "\\frac", "\\sum", "\\int", "\\sqrt", "∫", "∑", "√", "≤", "≥", "≠", "∞",
+    "方程", "函数", "证明", "求解", "导数", "积分", "概率", "矩阵", "equation", "integral", "derivative", "prove",
+)  # fmt: skip
+_REASONING_MARKERS = (
+    "为什么", "怎么", "如何", "分析", "推导", "比较", "解释", "步骤", "why", "how", "explain", "analy", "step",
+)  # fmt: skip
+_ARITHMETIC_PATTERN = re.compile(r"\d\s*[-+*/^=]\s*\d")
+_SCAN_CHARS = 512
+"""特征只从开头的这些字符中提取"""
+_SAMPLE_CHARS = 256
+"""按开头这些字符的中英文比例估算全文的 token 数"""
+_LATENCY_ALPHA = 0.2
+_ERROR_ALPHA = 0.1
+_ERROR_HALF_LIFE = 60
+"""失败率在没有新请求时按该半衰期（秒）衰减，被避开的端点之后会重新得到请求以确认是否恢复"""
+
+
+@dataclass(frozen=True)
+class RouteFeatures:
+    prompt_tokens: int
+    """本轮用户输入的估算 token 数"""
+    has_code: bool
+    has_math: bool
+    asks_reasoning: bool
+    depth: int
+    """对话中用户发言的轮数"""
+    ocr_chars: int
+    """图片识别出的文字长度"""
+
+
+@dataclass
+class EndpointStats:
+    """单个模型端点的实时统计"""
+
+    latency: Optional[float] = None
+    """请求耗时（秒，指数滑动平均），尚无样本时为 `None`"""
+    error_rate: float = 0
+    """最近一次请求后的失败率（指数滑动平均），当前值见 `current_error_rate`"""
+    inflight: int = 0
+    requests: int = 0
+    errors: int = 0
+    updated: float = 0
+    """最近一次请求完成的时间（`time.monotonic`）"""
+
+    def current_error_rate(self, now: float) -> float:
+        if not self.error_rate:
+            return 0
+        return self.error_rate * 0.5 ** ((now - self.updated) / _ERROR_HALF_LIFE)
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    model: str
+    score: float
+    """输入的复杂度评分（0-1）"""
+    reason: str
+    features: RouteFeatures
+
+
+def extract_features(text: str, *, depth: int = 1, ocr_chars: int = 0) -> RouteFeatures:
+    """提取路由所用的廉价特征，只扫描文本开头部分，耗时与输入长度无关"""
+    head = text[:_SCAN_CHARS].lower()
+    sample = text[:_SAMPLE_CHARS]
+    # 中日韩字符的 UTF-8 编码为 3 字节，由编码长度即可得到其数量，比逐字匹配快得多
+    cjk = (len(sample.encode()) - len(sample)) // 2
+    tokens = (cjk * 0.6 + (len(sample) - cjk) * 0.3) * len(text) / len(sample) if sample else 0
+    return RouteFeatures(
+        prompt_tokens=int(tokens),
+        has_code=any(marker in head for marker in _CODE_MARKERS),
+        has_math=any(marker in head for marker in _MATH_MARKERS) or _ARITHMETIC_PATTERN.search(head) is not None,
+        asks_reasoning=any(marker in head for marker in _REASONING_MARKERS),
+        depth=depth,
+        ocr_chars=ocr_chars,
+    )
+
+
+def complexity(features: RouteFeatures) -> float:
+    """按特征加权估计输入的复杂度，问候等短输入接近 0，代码与数学题接近 1"""
+    score = min(features.prompt_tokens / 1500, 1) * 0.25
+    score += 0.3 if features.has_code else 0
+    score += 0.45 if features.has_math else 0
+    score += 0.15 if features.asks_reasoning and features.prompt_tokens > 8 else 0
+    score += min(features.depth / 8, 1) * 0.1
+    score += min(features.ocr_chars / 800, 1) * 0.15
+    return min(score, 1)
+
+
+class ModelRouter:
+    """`auto` 模型的路由器
+
+    按输入复杂度在推理模型与对话模型两档间选择，同档内选择近期耗时最短、失败率最低的端点；
+    所有模型请求的耗时与成败都由 `observe` 记入端点统计，失败率随时间衰减，
+    因失败被避开的端点在冷却后会重新分到请求，成功即恢复，失败则继续被避开
+    """
+
+    def __init__(self) -> None:
+        self.stats: dict[str, EndpointStats] = {}
+
+    def _stats(self, model: str) -> EndpointStats:
+        if (stats := self.stats.get(model)) is None:
+            stats = self.stats[model] = EndpointStats()
+        return stats
+
+    def _cost(self, model: str, now: float) -> float:
+        stats = self.stats.get(model)
+        if stats is None or stats.requests == 0:
+            # 尚无样本的端点优先尝试一次
+            return 0
+        if stats.latency is None:
+            return float("inf")
+        return stats.latency * (1 + 0.2 * stats.inflight) / max(1 - stats.current_error_rate(now), 0.05)
+
+    def route(self, features: RouteFeatures) -> RouteDecision:
+        models = config.get_enable_models()
+        score = complexity(features)
+        reasoning = score >= config.router_complexity_threshold
+        preferred = [model for model in models if (model in config.router_reasoning_models) == reasoning]
+        now = time.monotonic()
+        healthy = [
+            model for model in models if self._stats(model).current_error_rate(now) <= config.router_max_error_rate
+        ]
+
+        if candidates := [model for model in preferred if model in healthy]:
+            reason = "reasoning" if reasoning else "chat"
+        elif candidates := healthy:
+            reason = "fallback"
+        else:
+            candidates, reason = preferred or models, "degraded"
+        model = min(candidates, key=lambda model: self._cost(model, now))
+
+        return RouteDecision(model, score, reason, features)
+
+    def observe(self, model: str, latency: float, ok: bool) -> None:
+        """记录一次模型请求的结果"""
+        stats = self._stats(model)
+        stats.requests += 1
+        if ok:
+            stats.latency = (
+                latency if stats.latency is None else stats.latency + (latency - stats.latency) * _LATENCY_ALPHA
+            )
+        else:
+            stats.errors += 1
+        now = time.monotonic()
+        error_rate = stats.current_error_rate(now)
+        stats.error_rate = error_rate + ((0 if ok else 1) - error_rate) * _ERROR_ALPHA
+        stats.updated = now
+
+    @contextmanager
+    def track(self, model: str) -> Iterator[None]:
+        """统计包裹的模型请求的耗时、成败与并发数"""
+        stats = self._stats(model)
+        stats.inflight += 1
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.observe(model, time.perf_counter() - start, ok=False)
+            raise
+        else:
+            self.observe(model, time.perf_counter() - start, ok=True)
+        finally:
+            stats.inflight -= 1
+
+    @contextmanager
+    def outcome(self, decision: Optional[RouteDecision]) -> Iterator[None]:
+        """记录路由决策及其结果，供调整策略使用；未经路由（`decision` 为 `None`）时不记录"""
+        if decision is None:
+            yield
+            return
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            features = decision.features
+            logger.info(
+                f"自动路由 {decision.model}（{decision.reason}，复杂度 {decision.score:.2f}，"
+                f"tokens={features.prompt_tokens} code={features.has_code} math={features.has_math} "
+                f"reasoning={features.asks_reasoning} depth={features.depth} ocr={features.ocr_chars}）"
+                f"{'成功' if ok else '失败'}，耗时 {time.perf_counter() - start:.2f}s"
+            )
+
+
+router = ModelRouter()
@@ -0,0 +1,185 @@
+import time
+import random
+import asyncio
+import hashlib
+import unicodedata
+from typing import Any, Optional
+from collections import OrderedDict
+from dataclasses import field, dataclass
+
+import httpx
+from nonebot.log import logger
+
+from .apis import API
+from .config import config
+from .ledger import today, ledger
+from .exception import RequestException
+from .utils import extract_content_and_think
+from .metrics import semantic_cache_lookups, semantic_cache_samples
+
+_PRIME = (1 << 61) - 1
+"""MinHash 置换所用的梅森素数"""
+_MAX_QUESTION_CHARS = 200
+"""规范化后超过该长度的问题不参与缓存：长提问几乎不会被逐字重复，签名的计算量却与长度成正比"""
+
+
+def normalize(text: str) -> str:
+    """全半角统一、转小写并去掉标点与空白，使仅在措辞符号上不同的问题得到相同的签名"""
+    return "".join(char for char in unicodedata.normalize("NFKC", text).lower() if char.isalnum())
+
+
+def shingles(text: str) -> set[str]:
+    """规范化文本的字符二元组，不足两个字符时以整体为一个元素"""
+    return {text[index : index + 2] for index in range(len(text) - 1)} or ({text} if text else set())
+
+
+def jaccard(a: set[str], b: set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1
+
+
+@dataclass
+class CacheEntry:
+    scope: str
+    question: str
+    answer: str
+    signature: tuple[int, ...] = field(repr=False)
+    created: float = field(default_factory=time.monotonic)
+    day: str = field(default_factory=today)
+    """写入时的本地日期，跨日即过期，避免“今天几号”一类的回复在午夜后仍被复用"""
+
+
+class SemanticCache:
+    """近似重复问题的回复缓存
+
+    问题规范化后取字符二元组的 MinHash 签名，按 `bands` × `rows` 分段做 LSH：
+    作用域（群、模型与人设）与每段签名共同组成桶键，查询只比较同桶的候选，
+    再以签名估算的 Jaccard 相似度与阈值比较。条目总数有上限，按最近使用淘汰
+    """
+
+    def __init__(self, bands: int = 16, rows: int = 4, agreement: float = 0.25, seed: int = 0) -> None:
+        self.bands = bands
+        self.rows = rows
+        self.agreement = agreement
+        """抽检时重新生成的回复与缓存回复的二元组 Jaccard 低于此值即视为疑似误命中"""
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(_PRIME)) for _ in range(bands * rows)]
+        self.entries: OrderedDict[int, CacheEntry] = OrderedDict()
+        self.buckets: dict[tuple[str, int, tuple[int, ...]], set[int]] = {}
+        self._next_id = 0
+        self._sampling: set[asyncio.Task] = set()
+
+    @staticmethod
+    def scope(target: str, system_prompt: str, model: str) -> str:
+        """`target` 为群号或私聊用户，模型或人设不同的回复互不共享"""
+        return f"{target}:{model}:{hashlib.sha1(system_prompt.encode()).hexdigest()[:16]}"
+
+    def signature(self, text: str) -> Optional[tuple[int, ...]]:
+        """问题为空或过长时返回 `None`，表示不参与缓存"""
+        if len(text := normalize(text)) > _MAX_QUESTION_CHARS or not (grams := shingles(text)):
+            return None
+        hashes = [int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=8).digest(), "little") for gram in grams]
+        return tuple(min((a * value + b) % _PRIME for value in hashes) for a, b in self._perms)
+
+    def _bucket_keys(self, scope: str, signature: tuple[int, ...]) -> list[tuple[str, int, tuple[int, ...]]]:
+        return [(scope, band, signature[band * self.rows : (band + 1) * self.rows]) for band in range(self.bands)]
+
+    def _remove(self, entry_id: int) -> None:
+        if (entry := self.entries.pop(entry_id, None)) is None:
+            return
+        for key in self._bucket_keys(entry.scope, entry.signature):
+            if (bucket := self.buckets.get(key)) is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def lookup(self, scope: str, question: str, signature: Optional[tuple[int, ...]] = None) -> Optional[CacheEntry]:
+        """返回同一作用域内相似度最高且不低于阈值的未过期条目
+
+        已为 `question` 计算过签名时可通过 `signature` 传入，避免重复计算
+        """
+        if signature is None and (signature := self.signature(question)) is None:
+            return None
+        candidates = set().union(*(self.buckets.get(key, ()) for key in self._bucket_keys(scope, signature)))
+        now, day = time.monotonic(), today()
+        best, best_score = None, config.semantic_cache_threshold
+        for entry_id in candidates:
+            entry = self.entries[entry_id]
+            if now - entry.created > config.semantic_cache_ttl or entry.day != day:
+                self._remove(entry_id)
+                continue
+            score = sum(a == b for a, b in zip(signature, entry.signature)) / len(signature)
+            if score >= best_score:
+                best, best_score = entry_id, score
+        semantic_cache_lookups.inc(key="miss" if best is None else "hit")
+        if best is None:
+            return None
+        self.entries.move_to_end(best)
+        return self.entries[best]
+
+    def store(self, scope: str, question: str, answer: str, signature: Optional[tuple[int, ...]] = None) -> None:
+        if signature is None and (signature := self.signature(question)) is None:
+            return
+        entry_id = self._next_id
+        self._next_id += 1
+        self.entries[entry_id] = CacheEntry(scope, question, answer, signature)
+        for key in self._bucket_keys(scope, signature):
+            self.buckets.setdefault(key, set()).add(entry_id)
+        while len(self.entries) > config.semantic_cache_max_entries:
+            self._remove(next(iter(self.entries)))
+
+    def invalidate(self, entry: CacheEntry) -> None:
+        for entry_id, candidate in self.entries.items():
+            if candidate is entry:
+                self._remove(entry_id)
+                return
+
+    def sample(
+        self,
+        entry: CacheEntry,
+        messages: list[dict[str, Any]],
+        model: str,
+        user_id: str = "",
+        group_id: Optional[str] = None,
+    ) -> None:
+        """按 `semantic_cache_sample_rate` 抽取命中，在后台重新请求以估算误命中率，不影响本次回复"""
+        if random.random() >= config.semantic_cache_sample_rate:
+            return
+        task = asyncio.create_task(self.verify(entry, messages, model, user_id, group_id))
+        self._sampling.add(task)
+        task.add_done_callback(self._sampling.discard)
+
+    async def verify(
+        self,
+        entry: CacheEntry,
+        messages: list[dict[str, Any]],
+        model: str,
+        user_id: str = "",
+        group_id: Optional[str] = None,
+    ) -> Optional[bool]:
+        """重新生成回复并与缓存的回复比较，疑似误命中时移除该条目；请求失败时返回 `None`
+
+        抽检的用量记在触发命中的用户与群名下
+        """
+        start = time.perf_counter()
+        try:
+            completion = await API.chat(messages, model=model)
+        except (RequestException, httpx.HTTPError, ValueError) as e:
+            logger.warning(f"语义缓存抽检请求失败：{e}")
+            return None
+        if user_id:
+            ledger.record(model, completion.usage, user_id, group_id, time.perf_counter() - start)
+        fresh, _ = extract_content_and_think(completion.choices[0].message)
+        if jaccard(shingles(normalize(fresh)), shingles(normalize(entry.answer))) >= self.agreement:
+            semantic_cache_samples.inc(key="consistent")
+            return True
+        semantic_cache_samples.inc(key="inconsistent")
+        logger.warning(f"语义缓存疑似误命中：{messages[-1]['content']!r} 命中了 {entry.question!r}，已移除该条目")
+        self.invalidate(entry)
+        return False
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.buckets.clear()
+
+
+semantic_cache = SemanticCache()
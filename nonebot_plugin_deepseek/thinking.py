@@ -0,0 +1,87 @@
+import asyncio
+from typing import Optional
+
+from nonebot.log import logger
+from nonebot.adapters import Bot, Event
+
+from .config import config
+from .outbound import outbound
+from .utils import TRUNCATED_MARK
+
+THINKING_HEADER = "💭 思考过程：\n"
+
+
+class ReasoningStreamer:
+    """在流式请求期间节流发送思维链
+
+    推理内容经 `feed` 累积，每隔 `interval` 秒最多发送一次新增部分，总长度不超过 `max_chars`；
+    消息以不等待送达的方式入队，不会阻塞流的读取与最终回复
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        event: Event,
+        interval: Optional[float] = None,
+        max_chars: Optional[int] = None,
+    ) -> None:
+        self.bot = bot
+        self.event = event
+        self.interval = config.thinking_interval if interval is None else interval
+        self.max_chars = config.thinking_max_chars if max_chars is None else max_chars
+        self.updates = 0
+        self._parts: list[str] = []
+        self._length = 0
+        self._sent = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, delta: str) -> None:
+        """追加一段推理内容，首次调用时启动定时发送"""
+        self._parts.append(delta)
+        self._length += len(delta)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._sent < self.max_chars:
+            await asyncio.sleep(self.interval)
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if self._sent >= self.max_chars or self._length <= self._sent:
+            return
+        text = self.text
+        chunk = text[self._sent : self.max_chars]
+        if not chunk.strip():
+            return
+        end = self._sent + len(chunk)
+        message = chunk + TRUNCATED_MARK if end < len(text) and end >= self.max_chars else chunk
+        if self.updates == 0:
+            message = THINKING_HEADER + message.lstrip()
+        await outbound.send(self.bot, self.event, message, wait=False, forward=True)
+        self._sent = end
+        self.updates += 1
+
+    async def finish(self, thinking: Optional[str] = None) -> None:
+        """停止定时发送并发出剩余的推理内容
+
+        参数:
+            thinking: 完整的思维链，非流式得到的思维链（如 `<think>` 标签）也由此发送
+        """
+        self.close()
+        if thinking and len(thinking) > self._length:
+            self._parts, self._length = [thinking], len(thinking)
+        if outbound.congested(self.bot, self.event):
+            # 发送队列拥塞时放弃剩余的思维链，优先送达最终回复
+            logger.debug(f"发送队列拥塞，跳过 {self._length - self._sent} 字思维链")
+            return
+        await self._flush()
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
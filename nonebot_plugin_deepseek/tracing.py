@@ -0,0 +1,212 @@
+import json
+import time
+import heapq
+import itertools
+from pathlib import Path
+from collections import deque
+from typing import Any, Optional
+from contextvars import ContextVar
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import field, dataclass
+
+import nonebot_plugin_localstore as store
+
+from .config import config
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    """相对 trace 开始的秒数"""
+    duration: float = 0
+    depth: int = 0
+    """嵌套层级，0 为最外层"""
+    attrs: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Trace:
+    """一轮对话（收到消息至发出回复）的各阶段耗时"""
+
+    session_id: str
+    user_id: str
+    started_at: float = field(default_factory=time.time)
+    """开始时的 Unix 时间戳"""
+    start: float = field(default_factory=time.perf_counter)
+    duration: Optional[float] = None
+    """结束前为 `None`"""
+    error: Optional[str] = None
+    spans: list[Span] = field(default_factory=list)
+    _depth: int = field(default=0, repr=False)
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[dict[str, Any]]:
+        """记录包裹的阶段，产出的字典可在阶段内补充属性"""
+        record = Span(name, time.perf_counter() - self.start, depth=self._depth, attrs=attrs)
+        self.spans.append(record)
+        self._depth += 1
+        try:
+            yield record.attrs
+        except BaseException as e:
+            record.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            self._depth -= 1
+            record.duration = time.perf_counter() - self.start - record.start
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("deepseek_trace", default=None)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[dict[str, Any]]:
+    """在当前 trace 中记录一个阶段，不在 trace 中时只产出一个空字典"""
+    if (trace := _current.get()) is None:
+        yield attrs
+        return
+    with trace.span(name, **attrs) as record:
+        yield record
+
+
+class Tracer:
+    """保留耗时最长的 `trace_slowest` 个与最近的 `trace_recent` 个 trace"""
+
+    def __init__(self) -> None:
+        self.slowest: list[tuple[float, int, Trace]] = []
+        """以耗时为键的小顶堆"""
+        self.recent: deque[Trace] = deque()
+        self._seq = itertools.count()
+
+    def begin(self, session_id: str, user_id: str) -> Trace:
+        return Trace(session_id, user_id)
+
+    @contextmanager
+    def activate(self, trace: Trace) -> Iterator[Trace]:
+        """使包裹的代码（及其中创建的任务）中的 `span` 记录到 `trace`"""
+        token = _current.set(trace)
+        try:
+            yield trace
+        finally:
+            _current.reset(token)
+
+    def finish(self, trace: Trace, error: Optional[str] = None) -> None:
+        """结束 trace 并放入缓冲区，重复调用时忽略"""
+        if trace.duration is not None:
+            return
+        trace.duration = time.perf_counter() - trace.start
+        trace.error = error
+        if config.trace_recent > 0:
+            self.recent.append(trace)
+            while len(self.recent) > config.trace_recent:
+                self.recent.popleft()
+        if config.trace_slowest > 0:
+            entry = (trace.duration, next(self._seq), trace)
+            if len(self.slowest) < config.trace_slowest:
+                heapq.heappush(self.slowest, entry)
+            elif entry > self.slowest[0]:
+                heapq.heapreplace(self.slowest, entry)
+            while len(self.slowest) > config.trace_slowest:
+                heapq.heappop(self.slowest)
+
+    def ranked(self) -> list[Trace]:
+        """按耗时从长到短排列的慢 trace"""
+        return [trace for _, _, trace in sorted(self.slowest, reverse=True)]
+
+    def find(self, key: str) -> Optional[Trace]:
+        """按慢 trace 的序号（从 1 开始）、会话 ID 或其前缀查找，同一会话取最近的一轮"""
+        ranked = self.ranked()
+        if key.isdigit() and 0 < int(key) <= len(ranked):
+            return ranked[int(key) - 1]
+        candidates = [*ranked, *self.recent]
+        matched = [trace for trace in candidates if trace.session_id.startswith(key)]
+        return max(matched, key=lambda trace: trace.started_at) if matched else None
+
+    def clear(self) -> None:
+        self.slowest.clear()
+        self.recent.clear()
+
+
+def _format_time(timestamp: float) -> str:
+    return time.strftime("%m-%d %H:%M:%S", time.localtime(timestamp))
+
+
+def _format_attrs(attrs: dict[str, Any]) -> str:
+    return " ".join(f"{key}={value}" for key, value in attrs.items())
+
+
+def render_list(traces: list[Trace]) -> str:
+    if not traces:
+        return "暂无记录"
+    lines = []
+    for index, trace in enumerate(traces, 1):
+        top = max((span for span in trace.spans if span.depth == 0), key=lambda span: span.duration, default=None)
+        lines.append(
+            f"{index}. {trace.duration or 0:.2f}s {trace.session_id}（{_format_time(trace.started_at)}）"
+            + (f" 主要耗时 {top.name} {top.duration:.2f}s" if top else "")
+            + (f" 失败：{trace.error}" if trace.error else "")
+        )
+    return "\n".join(lines)
+
+
+def render_timeline(trace: Trace, width: int = 20) -> str:
+    """以文本时间轴展示各阶段的起止与耗时"""
+    total = trace.duration or time.perf_counter() - trace.start
+    lines = [
+        f"会话 {trace.session_id}（用户 {trace.user_id}，{_format_time(trace.started_at)}）共 {total:.2f}s"
+        + (f"，失败：{trace.error}" if trace.error else "")
+    ]
+    for span in trace.spans:
+        begin = int(span.start / total * width) if total else 0
+        end = max(int((span.start + span.duration) / total * width) if total else 0, begin + 1)
+        bar = " " * begin + "█" * (min(end, width) - begin)
+        lines.append(
+            f"|{bar:<{width}}| +{span.start:.2f}s {span.duration:.2f}s {'  ' * span.depth}{span.name}"
+            + (f" {_format_attrs(span.attrs)}" if span.attrs else "")
+        )
+    return "\n".join(lines)
+
+
+def to_chrome_trace(traces: list[Trace]) -> dict[str, Any]:
+    """转换为 Chrome Trace Event 格式，可由 Perfetto 或 chrome://tracing 载入；每个 trace 为一个线程"""
+    events: list[dict[str, Any]] = []
+    for tid, trace in enumerate(traces, 1):
+        base = trace.started_at * 1e6
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": trace.session_id}})
+        events.append(
+            {
+                "name": "turn",
+                "ph": "X",
+                "pid": 1,
+                "tid": tid,
+                "ts": base,
+                "dur": (trace.duration or 0) * 1e6,
+                "args": {"user_id": trace.user_id, "error": trace.error},
+            }
+        )
+        events.extend(
+            {
+                "name": span.name,
+                "ph": "X",
+                "pid": 1,
+                "tid": tid,
+                "ts": base + span.start * 1e6,
+                "dur": span.duration * 1e6,
+                "args": {key: str(value) for key, value in span.attrs.items()},
+            }
+            for span in trace.spans
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def export_trace(trace: Trace, directory: Optional[Path] = None) -> Path:
+    """将 trace 以 Chrome Trace 格式写入文件（默认为插件数据目录下的 `traces`），返回文件路径"""
+    directory = directory or store.get_plugin_data_dir() / "traces"
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{trace.session_id}-{int(trace.started_at)}.json"
+    path.write_text(json.dumps(to_chrome_trace([trace]), ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+tracer = Tracer()
@@ -0,0 +1,132 @@
+import os
+import re
+import time
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Optional
+from collections.abc import AsyncIterator
+
+from nonebot.log import logger
+import nonebot_plugin_localstore as store
+
+from .apis import API
+from .config import config, model_config
+
+_SENTENCE_END = re.compile(r"(?<=[。！？!?；;…\n])|(?<=\.)(?=\s)")
+
+
+def split_sentences(text: str, max_chars: int) -> list[str]:
+    """按句切分并合并为不超过 `max_chars` 的片段，单句过长时按长度硬切"""
+    chunks: list[str] = []
+    current = ""
+    for sentence in _SENTENCE_END.split(text):
+        if not (sentence := sentence.strip()):
+            continue
+        while len(sentence) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def resolve_voice(voice: str) -> tuple[str, str]:
+    """将 `<模型>-<说话人>` 拆分为模型与说话人，模型名本身可含 `-`"""
+    for model, speakers in model_config.tts_model_dict.items():
+        if voice.startswith(f"{model}-") and voice[len(model) + 1 :] in speakers:
+            return model, voice[len(model) + 1 :]
+    model, _, speaker = voice.partition("-")
+    return model, speaker
+
+
+class AudioCache:
+    """以 `(模型, 说话人, 文本)` 哈希为键的磁盘语音缓存，超出容量时淘汰最久未使用的文件"""
+
+    def __init__(self, directory: Path, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, model: str, speaker: str, text: str) -> Path:
+        key = hashlib.sha256(f"{model}\0{speaker}\0{text}".encode()).hexdigest()
+        return self.directory / f"{key}.audio"
+
+    def _read(self, path: Path) -> Optional[bytes]:
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        now = time.time()
+        os.utime(path, (now, now))
+        return data
+
+    def _write(self, path: Path, data: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+        files = [(file, file.stat()) for file in self.directory.glob("*.audio")]
+        total = sum(stat.st_size for _, stat in files)
+        for file, stat in sorted(files, key=lambda item: item[1].st_mtime):
+            if total <= self.max_bytes:
+                break
+            file.unlink(missing_ok=True)
+            total -= stat.st_size
+
+    async def load(self, model: str, speaker: str, text: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read, self.path(model, speaker, text))
+
+    async def store(self, model: str, speaker: str, text: str, data: bytes) -> None:
+        try:
+            await asyncio.to_thread(self._write, self.path(model, speaker, text), data)
+        except OSError as e:
+            logger.warning(f"写入语音缓存失败：{e}")
+
+
+class Synthesizer:
+    """将回复按句切分后并发合成，按原顺序逐段产出，首段合成完成即可发送"""
+
+    def __init__(self, cache: Optional[AudioCache] = None) -> None:
+        self._cache = cache
+
+    @property
+    def cache(self) -> AudioCache:
+        if self._cache is None:
+            self._cache = AudioCache(store.get_plugin_cache_dir() / "tts", config.tts_cache_max_bytes)
+        return self._cache
+
+    async def synthesize(self, text: str, model: str, speaker: str) -> bytes:
+        if (cached := await self.cache.load(model, speaker, text)) is not None:
+            return cached
+        audio = await API.text_to_speech(text, model, speaker)
+        await self.cache.store(model, speaker, text, audio)
+        return audio
+
+    async def stream(self, text: str, voice: str) -> AsyncIterator[bytes]:
+        model, speaker = resolve_voice(voice)
+        semaphore = asyncio.Semaphore(config.tts_concurrency)
+
+        async def job(chunk: str) -> bytes:
+            async with semaphore:
+                return await self.synthesize(chunk, model, speaker)
+
+        tasks = [asyncio.create_task(job(chunk)) for chunk in split_sentences(text, config.tts_chunk_chars)]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            # 发送中途出错或被取消时，不再合成剩余片段
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+synthesizer = Synthesizer()
@@ -2,6 +2,9 @@ import re
 
 from .schemas import Message
 
+_CJK_PATTERN = re.compile(r"[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+TRUNCATED_MARK = "\n……（内容过长，已截断）"
+
 
 def extract_content_and_think(message: Message) -> tuple[str, str]:
     thinking = message.reasoning_content
@@ -13,3 +16,31 @@ def extract_content_and_think(message: Message) -> tuple[str, str]:
     content = re.sub(r"<think>.*?</think>", "", message.content or "", flags=re.DOTALL).strip()
 
     return content, thinking
+
+
+def estimate_tokens(text: str) -> int:
+    """估算文本的 token 数
+
+    参照 DeepSeek 官方换算：1 个中文字符约 0.6 个 token，1 个英文字符约 0.3 个 token
+    """
+    cjk = len(_CJK_PATTERN.findall(text))
+    return int(cjk * 0.6 + (len(text) - cjk) * 0.3) + 1 if text else 0
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """将文本截断至约 `max_tokens` 个 token，尽量在换行处截断"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    budget = max_tokens - estimate_tokens(TRUNCATED_MARK)
+    cost = 0.0
+    end = 0
+    for end, char in enumerate(text):
+        cost += 0.6 if _CJK_PATTERN.match(char) else 0.3
+        if cost > budget:
+            break
+
+    cut = text.rfind("\n", 0, end)
+    if cut < end * 0.8:
+        cut = end
+    return text[:cut].rstrip() + TRUNCATED_MARK
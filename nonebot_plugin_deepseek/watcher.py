@@ -0,0 +1,109 @@
+import asyncio
+from pathlib import Path
+from typing import Optional
+from collections.abc import Callable
+
+from nonebot import get_driver
+from nonebot.log import logger
+from pydantic import ValidationError
+from nonebot.compat import model_dump, type_validate_python
+
+from .config import Config, ScopedConfig, config, model_config
+
+ReloadListener = Callable[[ScopedConfig], None]
+
+
+def _env_files() -> list[Path]:
+    return [Path(".env"), Path(f".env.{get_driver().env}")]
+
+
+def load_plugin_config() -> ScopedConfig:
+    """重新读取 `.env` 文件，构造新的插件配置快照
+
+    `nonebot.init` 的关键字参数在无法从文件中读取到对应配置时保留
+    """
+    driver = get_driver()
+    fresh = type(driver.config)(_env_file=tuple(_env_files()))  # type: ignore
+    data = {**model_dump(driver.config), **model_dump(fresh, exclude_unset=True)}
+    return type_validate_python(Config, data).deepseek
+
+
+class ConfigWatcher:
+    """轮询 `config.json` 与 `.env` 文件，变更后重新加载并原子替换配置快照
+
+    重新加载后依次通知监听者（如重建请求模板），已开始的请求继续使用其持有的快照
+    """
+
+    def __init__(self) -> None:
+        self.listeners: list[ReloadListener] = []
+        self._env_fingerprints: dict[Path, Optional[tuple[int, int]]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, listener: ReloadListener) -> ReloadListener:
+        self.listeners.append(listener)
+        return listener
+
+    @staticmethod
+    def _fingerprint(path: Path) -> Optional[tuple[int, int]]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _scan_env(self) -> bool:
+        fingerprints = {path: self._fingerprint(path) for path in _env_files()}
+        changed = bool(self._env_fingerprints) and fingerprints != self._env_fingerprints
+        self._env_fingerprints = fingerprints
+        return changed
+
+    def reload_plugin_config(self) -> bool:
+        try:
+            snapshot = load_plugin_config()
+        except (ValidationError, ValueError) as e:
+            logger.error(f"插件配置无效，继续使用当前配置：{e}")
+            return False
+        config.swap(snapshot)  # type: ignore
+        for listener in self.listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.opt(exception=e).error(f"配置重载回调 {listener} 执行失败")
+        logger.success(f"插件配置已重新加载，启用模型：{snapshot.get_enable_models()}")
+        return True
+
+    def reload_model_config(self) -> bool:
+        try:
+            model_config.load()
+        except (OSError, ValueError) as e:
+            logger.error(f"读取 {model_config.file} 失败，继续使用当前配置：{e}")
+            return False
+        logger.success(f"模型设置已重新加载，默认模型：{model_config.default_model}")
+        return True
+
+    async def check(self) -> None:
+        if await asyncio.to_thread(self._scan_env):
+            self.reload_plugin_config()
+        if await asyncio.to_thread(model_config.changed):
+            self.reload_model_config()
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.opt(exception=e).error("检查配置文件变更失败")
+
+    def start(self, interval: float) -> None:
+        if self._task is None and interval > 0:
+            self._scan_env()
+            self._task = asyncio.create_task(self._run(interval))
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+watcher = ConfigWatcher()
@@ -0,0 +1,5 @@
+from .fetch import fetch as fetch
+from .cache import HTTPCache as HTTPCache
+from .cache import CacheEntry as CacheEntry
+from .fetch import FetchResult as FetchResult
+from .extract import extract_main_content as extract_main_content
@@ -0,0 +1,153 @@
+import json
+import time
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Optional
+from email.utils import parsedate_to_datetime
+from dataclasses import field, asdict, dataclass
+
+from nonebot.log import logger
+
+# 未声明有效期时，按 RFC 9111 启发式取 Last-Modified 距今时长的 10%，且不超过一天
+HEURISTIC_FRACTION = 0.1
+HEURISTIC_MAX_AGE = 24 * 60 * 60
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_cache_control(value: str) -> dict[str, Optional[str]]:
+    directives: dict[str, Optional[str]] = {}
+    for part in value.split(","):
+        key, _, arg = part.strip().partition("=")
+        if key:
+            directives[key.lower()] = arg.strip('"') or None
+    return directives
+
+
+@dataclass
+class CacheEntry:
+    """HTTP 缓存条目元数据"""
+
+    url: str
+    encoding: str
+    content_type: str = ""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    stored_at: float = field(default_factory=time.time)
+    expires_at: float = 0
+    """新鲜期截止时间戳，为 0 时每次使用前都需要重新验证"""
+    text: Optional[str] = None
+    """已提取的正文，命中缓存时无需重新解析"""
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) < self.expires_at
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def refresh(self, headers: dict[str, str], now: Optional[float] = None) -> bool:
+        """根据响应头更新校验器与新鲜期，返回该响应是否允许缓存"""
+        now = now or time.time()
+        directives = parse_cache_control(headers.get("cache-control", ""))
+        if "no-store" in directives:
+            return False
+
+        self.etag = headers.get("etag", self.etag)
+        self.last_modified = headers.get("last-modified", self.last_modified)
+        self.stored_at = now
+
+        if "no-cache" in directives:
+            self.expires_at = 0
+        elif (max_age := directives.get("max-age")) is not None and max_age.isdigit():
+            age = int(headers["age"]) if headers.get("age", "").isdigit() else 0
+            self.expires_at = now + max(int(max_age) - age, 0)
+        elif (expires := _parse_http_date(headers.get("expires"))) is not None:
+            date = _parse_http_date(headers.get("date")) or now
+            self.expires_at = now + max(expires - date, 0)
+        elif (modified := _parse_http_date(self.last_modified)) is not None:
+            self.expires_at = now + min((now - modified) * HEURISTIC_FRACTION, HEURISTIC_MAX_AGE)
+        else:
+            self.expires_at = 0
+        return bool(self.etag or self.last_modified or self.expires_at)
+
+
+class HTTPCache:
+    """以 URL 哈希为键的磁盘 HTTP 缓存
+
+    每个条目由 `<key>.json`（元数据与提取后的正文）和 `<key>.body`（原始响应体）两个文件组成
+    """
+
+    def __init__(self, directory: Path, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.body"
+
+    def _load(self, url: str) -> Optional[CacheEntry]:
+        meta_path, _ = self._paths(url)
+        try:
+            return CacheEntry(**json.loads(meta_path.read_text("utf-8")))
+        except FileNotFoundError:
+            return None
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Dropping corrupt web cache entry for {url}: {e}")
+            meta_path.unlink(missing_ok=True)
+            return None
+
+    def _store(self, entry: CacheEntry, content: Optional[bytes]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta_path, body_path = self._paths(entry.url)
+        if content is not None:
+            body_path.write_bytes(content)
+        tmp_path = meta_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(asdict(entry), ensure_ascii=False), "utf-8")
+        tmp_path.replace(meta_path)
+        self._evict()
+
+    def _evict(self) -> None:
+        files = [(path, path.stat()) for path in self.directory.iterdir() if path.suffix in (".json", ".body")]
+        total = sum(stat.st_size for _, stat in files)
+        if total <= self.max_bytes:
+            return
+        # 按最近写入时间淘汰，元数据与响应体成对删除
+        for path, stat in sorted(files, key=lambda item: item[1].st_mtime):
+            if total <= self.max_bytes:
+                break
+            for sibling in (path.with_suffix(".json"), path.with_suffix(".body")):
+                try:
+                    size = sibling.stat().st_size
+                    sibling.unlink()
+                except FileNotFoundError:
+                    continue
+                total -= size
+
+    def read_body(self, entry: CacheEntry) -> Optional[bytes]:
+        try:
+            return self._paths(entry.url)[1].read_bytes()
+        except FileNotFoundError:
+            return None
+
+    async def load(self, url: str) -> Optional[CacheEntry]:
+        return await asyncio.to_thread(self._load, url)
+
+    async def store(self, entry: CacheEntry, content: Optional[bytes] = None) -> None:
+        """写入缓存条目，`content` 为 `None` 时仅更新元数据（如 304 重新验证后）"""
+        try:
+            await asyncio.to_thread(self._store, entry, content)
+        except OSError as e:
+            logger.warning(f"Failed to write web cache entry for {entry.url}: {e}")
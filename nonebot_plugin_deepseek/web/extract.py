@@ -0,0 +1,72 @@
+import re
+
+_NOISE_TAGS = frozenset(
+    ("noscript", "iframe", "canvas", "form", "button", "select", "nav", "header", "footer", "aside")
+)
+# 脚本、样式等块在解析前直接剔除，可显著减少建树开销
+_STRIP_BLOCKS = re.compile(r"<(script|style|template|svg)\b[^>]*>.*?</\1\s*>|<!--.*?-->", re.IGNORECASE | re.DOTALL)
+_NOISE_ATTR = re.compile(
+    r"(^|[\s_-])(nav|navbar|menu|sidebar|side-bar|footer|header|breadcrumbs?|comments?|advert|ads?|banner|cookie|"
+    r"share|social|related|recommend|popup|modal|subscribe|login|copyright)($|[\s_-])",
+    re.IGNORECASE,
+)
+_MAIN_SELECTORS = ("article", "main", "[role=main]", "#content", ".content", ".article", ".post")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+_SPACES = re.compile(r"[ \t\r\f\v\u00a0\u3000]+")
+
+
+def _is_noise(tag) -> bool:
+    if tag.name in _NOISE_TAGS:
+        return True
+    attrs = tag.attrs
+    if not attrs:
+        return False
+    classes = attrs.get("class") or ()
+    marker = " ".join(classes) if isinstance(classes, list) else str(classes)
+    if tag_id := attrs.get("id"):
+        marker = f"{marker} {tag_id}"
+    return _NOISE_ATTR.search(marker) is not None
+
+
+def _remove_noise(root) -> None:
+    """深度优先遍历，移除模板节点时跳过其子树"""
+    from bs4 import Tag
+
+    stack = [child for child in root.children if isinstance(child, Tag)]
+    while stack:
+        tag = stack.pop()
+        if _is_noise(tag):
+            tag.decompose()
+        else:
+            stack.extend(child for child in tag.children if isinstance(child, Tag))
+
+
+def _normalize(text: str) -> str:
+    lines = (_SPACES.sub(" ", line).strip() for line in text.splitlines())
+    return _BLANK_LINES.sub("\n\n", "\n".join(line for line in lines if line)).strip()
+
+
+def extract_main_content(html: str) -> str:
+    """提取网页正文，去除脚本、导航、页眉页脚与广告等模板内容
+
+    该函数为 CPU 密集型，应在线程池或进程池中调用，避免阻塞事件循环
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(_STRIP_BLOCKS.sub("", html), "html.parser")
+
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    root = body = soup.body or soup
+    _remove_noise(body)
+
+    # 正文容器至少应包含页面两成的文字，以免误选摘要卡片
+    min_len = len(body.get_text(strip=True)) // 5
+    for selector in _MAIN_SELECTORS:
+        if candidates := [tag for tag in body.select(selector) if len(tag.get_text(strip=True)) > min_len]:
+            root = max(candidates, key=lambda tag: len(tag.get_text(strip=True)))
+            break
+
+    text = _normalize(root.get_text("\n"))
+    if title and not text.startswith(title):
+        text = f"{title}\n\n{text}"
+    return text
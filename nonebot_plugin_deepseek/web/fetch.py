@@ -0,0 +1,119 @@
+import re
+import time
+import codecs
+import asyncio
+from typing import Optional
+from dataclasses import field, dataclass
+
+from httpx import AsyncClient
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+
+@dataclass
+class FetchResult:
+    """网页抓取结果"""
+
+    url: str
+    """最终地址（跟随重定向后）"""
+    status_code: int
+    """HTTP 状态码"""
+    content: bytes
+    """响应体，超过 `max_bytes` 时被截断"""
+    encoding: str
+    """检测出的字符编码"""
+    content_type: str = ""
+    """响应的 `Content-Type`"""
+    headers: dict[str, str] = field(default_factory=dict)
+    """响应头，键名均为小写"""
+    truncated: bool = False
+    """响应体是否因超过大小或时间限制被截断"""
+    elapsed: float = 0
+    """抓取耗时（秒）"""
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+
+def _valid_codec(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.strip().strip("\"'")).name
+    except LookupError:
+        return None
+
+
+def detect_charset(content_type: str, head: bytes) -> str:
+    """依次根据 BOM、`Content-Type` 头、`<meta charset>` 检测编码，均无结果时进行试探解码"""
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+
+    for part in content_type.split(";")[1:]:
+        key, _, value = part.partition("=")
+        if key.strip().lower() == "charset" and (encoding := _valid_codec(value)):
+            return encoding
+
+    if (match := _META_CHARSET.search(head[:4096])) and (encoding := _valid_codec(match.group(1).decode("ascii"))):
+        # 国内站点常将 GBK 声明为 gb2312，使用超集解码以免乱码
+        return "gb18030" if encoding in ("gb2312", "gbk") else encoding
+
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # 截断位置可能恰好落在多字节字符中间
+        if e.start < len(head) - 3:
+            return "gb18030"
+    return "utf-8"
+
+
+async def fetch(
+    client: AsyncClient,
+    url: str,
+    *,
+    max_bytes: int,
+    timeout: float,
+    headers: Optional[dict[str, str]] = None,
+) -> FetchResult:
+    """流式抓取网页，响应体超过 `max_bytes` 或耗时超过 `timeout` 秒时停止读取并返回已读取部分"""
+    start = time.perf_counter()
+    chunks: list[bytes] = []
+    received = 0
+    truncated = False
+
+    async with client.stream("GET", url, headers=headers, timeout=timeout, follow_redirects=True) as response:
+        content_type = response.headers.get("Content-Type", "")
+
+        async def read() -> None:
+            nonlocal received, truncated
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                received += len(chunk)
+                if received >= max_bytes:
+                    truncated = True
+                    break
+
+        if response.status_code == 200:
+            try:
+                await asyncio.wait_for(read(), timeout=max(timeout - (time.perf_counter() - start), 0))
+            except asyncio.TimeoutError:
+                truncated = True
+
+    content = b"".join(chunks)[:max_bytes]
+    return FetchResult(
+        url=str(response.url),
+        status_code=response.status_code,
+        content=content,
+        encoding=detect_charset(content_type, content[:4096]),
+        content_type=content_type,
+        headers={key.lower(): value for key, value in response.headers.items()},
+        truncated=truncated,
+        elapsed=time.perf_counter() - start,
+    )
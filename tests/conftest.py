@@ -1,3 +1,10 @@
+import json
+import asyncio
+import functools
+from typing import Any
+from dataclasses import dataclass
+
+import httpx
 import pytest
 import nonebot
 from nonebug import NONEBOT_INIT_KWARGS
@@ -27,3 +34,93 @@ def _load_adapters(nonebug_init: None):
     driver.register_adapter(OneBotV11Adapter)
 
     nonebot.load_from_toml("pyproject.toml")
+
+
+@pytest.fixture
+def patch_config():
+    """以修改后的副本替换插件配置快照，测试结束后换回原快照"""
+    from nonebot_plugin_deepseek.config import config
+
+    original = config.snapshot()  # type: ignore
+
+    def patch(**changes):
+        config.swap(config.snapshot().model_copy(update=changes))  # type: ignore
+
+    yield patch
+    config.swap(original)  # type: ignore
+
+
+@pytest.fixture
+def mock_transport(monkeypatch):
+    """让此后创建的 `httpx.AsyncClient` 都经由给定的 transport 收发，传入处理函数时包装为 `httpx.MockTransport`"""
+
+    def install(transport):
+        if not isinstance(transport, httpx.AsyncBaseTransport):
+            transport = httpx.MockTransport(transport)
+        monkeypatch.setattr(httpx, "AsyncClient", functools.partial(httpx.AsyncClient, transport=transport))
+        return transport
+
+    return install
+
+
+@dataclass
+class MockAPI:
+    """DeepSeek 补全接口的替身，总是回复“词0词1…”，`stream` 请求以 SSE 逐词返回"""
+
+    latency: float = 0
+    """返回响应前等待的秒数"""
+    completion_tokens: int = 3
+    reasoning_tokens: int = 0
+    """流式回复前先逐字返回的思维链长度，计入 `completion_tokens` 用量"""
+    stream_delay: float = 0
+    """流式返回的相邻两个词之间等待的秒数"""
+    status: int = 200
+    """非 200 时所有补全请求都以该状态码失败"""
+    completions: int = 0
+    streamed: int = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        await asyncio.sleep(self.latency)
+        if self.status != 200:
+            return httpx.Response(self.status, json={"error": {"message": "Mock error", "type": "server_error"}})
+        self.completions += 1
+        prompt_tokens = sum(len(str(message.get("content") or "")) for message in body.get("messages", []))
+        completion_tokens = self.completion_tokens + self.reasoning_tokens
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "completion_tokens_details": {"reasoning_tokens": self.reasoning_tokens},
+        }
+        base = {"id": f"mock-{self.completions}", "created": 0, "model": body.get("model", "deepseek-chat")}
+        words = [f"词{index}" for index in range(self.completion_tokens)]
+        if not body.get("stream"):
+            message: dict[str, Any] = {"role": "assistant", "content": "".join(words)}
+            if self.reasoning_tokens:
+                message["reasoning_content"] = "想" * self.reasoning_tokens
+            choice = {"index": 0, "finish_reason": "stop", "message": message}
+            return httpx.Response(200, json={**base, "object": "chat.completion", "choices": [choice], "usage": usage})
+
+        self.streamed += 1
+        deltas = [{"reasoning_content": "想"}] * self.reasoning_tokens + [{"content": word} for word in words]
+        chunks = [{"choices": [{"index": 0, "delta": delta}]} for delta in deltas]
+        chunks.append({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage})
+
+        async def events():
+            for index, chunk in enumerate(chunks):
+                if index:
+                    await asyncio.sleep(self.stream_delay)
+                event = {**base, "object": "chat.completion.chunk", **chunk}
+                yield b"data: " + json.dumps(event, ensure_ascii=False).encode() + b"\n\n"
+            yield b"data: [DONE]\n\n"
+
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=events())
+
+
+@pytest.fixture
+def mock_api(mock_transport) -> MockAPI:
+    """以 `MockAPI` 应答插件发出的全部请求"""
+    api = MockAPI()
+    mock_transport(api)
+    return api
@@ -0,0 +1,125 @@
+import json
+
+import httpx
+
+
+def completion_handler(state: dict):
+    def handler(request: httpx.Request) -> httpx.Response:
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        state["requests"] += 1
+        if state["throttle"] > 0:
+            state["throttle"] -= 1
+            return httpx.Response(429, headers={"retry-after": "0"}, json={"error": {"message": "Rate limit"}})
+        if prompt == "坏":
+            return httpx.Response(500, json={"error": {"message": "Internal server error"}})
+        return httpx.Response(
+            200,
+            json={
+                "id": "1",
+                "created": 0,
+                "model": "deepseek-chat",
+                "object": "chat.completion",
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": prompt}}],
+                "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+            },
+        )
+
+    return handler
+
+
+async def test_run_batch_resumes(monkeypatch, mock_transport, tmp_path):
+    from nonebot_plugin_deepseek.cli.plugins.batch import run_batch
+
+    state = {"requests": 0, "throttle": 2}
+    mock_transport(completion_handler(state))
+    monkeypatch.setattr("random.uniform", lambda a, b: 0)
+    source = tmp_path / "prompts.jsonl"
+    lines = [{"id": "a", "prompt": "一"}, {"prompt": "二", "system": "简短"}, {"id": "c", "prompt": "坏"}]
+    source.write_text("\n".join(json.dumps(line, ensure_ascii=False) for line in lines) + "\n", encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+
+    report = await run_batch(source, output, concurrency=3, retries=2)
+    assert (report.total, report.succeeded, report.failed, report.rate_limited) == (3, 2, 1, 2)
+    # 两次限流后并发上限降至 1，随后的成功使其回升
+    assert report.final_limit == 2
+    records = {record["id"]: record for record in map(json.loads, output.read_text(encoding="utf-8").splitlines())}
+    assert records["a"]["content"] == "一"
+    assert records["2"]["usage"]["total_tokens"] == 5
+    assert records["c"]["error"] == "Internal server error"
+    assert "共 3 条：成功 2，失败 1，续跑跳过 0" in report.render()
+
+    # 续跑只重新请求失败的条目，一行写了一半的记录被忽略
+    with output.open("a", encoding="utf-8") as f:
+        f.write('{"id": "c", "con')
+    requests = state["requests"]
+    report = await run_batch(source, output, concurrency=2, retries=0)
+    assert (report.skipped, report.failed, state["requests"] - requests) == (2, 1, 1)
+
+    report = await run_batch(source, output, retries=0, restart=True)
+    assert (report.skipped, report.succeeded) == (0, 2)
+    assert len(output.read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_batch_command(monkeypatch, mock_transport, tmp_path):
+    from nonebot_plugin_deepseek.cli.__main__ import main
+    from nonebot_plugin_deepseek.config import model_config
+
+    state = {"requests": 0, "throttle": 0}
+    mock_transport(completion_handler(state))
+    monkeypatch.setattr(model_config, "snapshot", model_config.snapshot)
+    monkeypatch.setattr(model_config, "file", tmp_path / "config.json")
+    source = tmp_path / "prompts.jsonl"
+    source.write_text('{"prompt": "你好"}\n', encoding="utf-8")
+
+    main("batch", str(source), "-c", "2", "-m", "deepseek-chat")
+    record = json.loads((tmp_path / "prompts.out.jsonl").read_text(encoding="utf-8"))
+    assert (record["id"], record["model"], record["content"]) == ("1", "deepseek-chat", "你好")
+
+
+async def test_run_batch_invalid_lines(monkeypatch, mock_transport, tmp_path):
+    from nonebot_plugin_deepseek.cli.plugins.batch import run_batch
+
+    state = {"requests": 0, "throttle": 0}
+    mock_transport(completion_handler(state))
+    monkeypatch.setattr("random.uniform", lambda a, b: 0)
+    source = tmp_path / "prompts.jsonl"
+    lines = [
+        '{"prompt": "一"}',
+        '{"prompt": "坏',
+        "[1]",
+        '{"id": "m", "prompt": "二", "model": "not-enabled"}',
+        '{"id": "x"}',
+    ]
+    source.write_text("\n".join(lines + ['{"prompt": "三"}']) + "\n", encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+
+    # 无效行写出错误后继续处理后续行，未启用的模型不重试
+    report = await run_batch(source, output, concurrency=2, retries=3)
+    assert (report.total, report.succeeded, report.failed, report.retries) == (6, 2, 4, 0)
+    assert state["requests"] == 2
+    records = {record["id"]: record for record in map(json.loads, output.read_text(encoding="utf-8").splitlines())}
+    assert records["6"]["content"] == "三"
+    assert records["2"]["error"].startswith("第 2 行不是有效的 JSON")
+    assert records["3"]["error"] == "第 3 行不是 JSON 对象"
+    assert records["5"]["error"] == "第 5 行缺少 prompt 或 messages"
+    assert (records["m"]["error"], records["m"]["attempts"]) == ("Model not-enabled not enabled", 1)
+
+
+async def test_run_batch_resume_after_partial_line(mock_transport, tmp_path):
+    from nonebot_plugin_deepseek.cli.plugins.batch import run_batch, completed_ids
+
+    state = {"requests": 0, "throttle": 0}
+    mock_transport(completion_handler(state))
+    source = tmp_path / "prompts.jsonl"
+    source.write_text('{"id": "a", "prompt": "一"}\n{"id": "b", "prompt": "二"}\n', encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+    output.write_text('{"id": "a", "content": "一"}\n{"id": "b", "con', encoding="utf-8")
+    assert completed_ids(output) == {"a"}
+
+    # 写了一半的末行被截去，续跑的结果从新的一行开始，之后不再重复请求
+    report = await run_batch(source, output)
+    assert (report.skipped, report.succeeded) == (1, 1)
+    assert [json.loads(line)["id"] for line in output.read_text(encoding="utf-8").splitlines()] == ["a", "b"]
+    assert completed_ids(output) == {"a", "b"}
+    report = await run_batch(source, output)
+    assert (report.skipped, state["requests"]) == (2, 1)
@@ -0,0 +1,40 @@
+import json
+
+
+async def test_run_bench(mock_api):
+    from nonebot_plugin_deepseek.cli.plugins.bench import run_bench, render_table
+
+    mock_api.latency, mock_api.stream_delay, mock_api.completion_tokens, mock_api.reasoning_tokens = 0.01, 0.002, 5, 2
+
+    results = await run_bench(["deepseek-chat"], [1, 3], rounds=2, prompts=["一", "二"])
+    assert [(result.concurrency, result.requests, result.errors) for result in results] == [(1, 2, 0), (3, 6, 0)]
+    assert mock_api.streamed == 8
+    sample = results[1].samples[0]
+    assert sample.connect is None
+    assert 0 < sample.ttft < sample.latency
+    assert sample.completion_tokens == 7
+    assert results[1].tokens_per_second > 0
+    assert results[1].throughput > 0
+
+    mock_api.status = 500
+    (failed,) = await run_bench(["deepseek-chat"], [2], rounds=1, base_url="http://mock/")
+    assert (failed.base_url, failed.error_rate) == ("http://mock", 1)
+    assert failed.percentile("ttft", 0.5) is None
+
+    table = render_table([*results, failed]).splitlines()
+    assert table[0].split()[:4] == ["模型", "并发", "请求", "错误率"]
+    assert table[3].split()[:4] == ["deepseek-chat", "2", "2", "100%"]
+
+
+def test_bench_command(mock_api, tmp_path):
+    from nonebot_plugin_deepseek.cli.__main__ import main
+
+    prompts = tmp_path / "prompts.txt"
+    prompts.write_text('你好\n{"prompt": "再见"}\n', encoding="utf-8")
+    output = tmp_path / "bench.json"
+
+    main("bench", "-s", "1,2", "-n", "1", "-p", str(prompts), "-o", str(output))
+    data = json.loads(output.read_text(encoding="utf-8"))
+    assert [(result["concurrency"], result["requests"]) for result in data["results"]] == [(1, 1), (2, 2)]
+    assert data["results"][0]["error_rate"] == 0
+    assert mock_api.streamed == 3
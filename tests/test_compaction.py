@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def mock_api(mock_api, patch_config):
+    mock_api.latency = 0.05
+    patch_config(compact_threshold_tokens=500, compact_keep_turns=2, compact_idle_seconds=0.05)
+    return mock_api
+
+
+def long_history(turns: int):
+    from nonebot_plugin_deepseek.history import MessageHistory
+
+    history = MessageHistory([{"role": "system", "content": "你是爱音"}])
+    for turn in range(turns):
+        history.append({"role": "user", "content": f"第{turn}个问题" + "很长的内容" * 40})
+        history.append({"role": "assistant", "content": f"第{turn}个回答" + "很长的回复" * 40})
+    return history
+
+
+async def test_compact(mock_api):
+    from nonebot_plugin_deepseek.compaction import SUMMARY_PREFIX, Compactor, render_transcript
+
+    history = long_history(4)
+    recent = history[5:]
+    assert "用户：第0个问题" in render_transcript(history[1:3])
+
+    compactor = Compactor()
+    assert await compactor.compact(history) > 0
+    # 人设、摘要与最近两轮
+    assert [item["role"] for item in history] == ["system", "system", "user", "assistant", "user", "assistant"]
+    assert history[1]["content"] == SUMMARY_PREFIX + "词0词1词2"
+    assert history[2:] == recent
+    assert history.encoded().startswith(b'{"role":"system","content":"\xe4\xbd\xa0')
+
+    # 再次压缩时上次的摘要一并被总结，较早的部分太短时不再请求
+    history.append({"role": "user", "content": "再问一个"})
+    history.append({"role": "assistant", "content": "好的"})
+    assert await compactor.compact(history) > 0
+    assert len(history) == 6
+    history.append({"role": "user", "content": "最后一个"})
+    assert await compactor.compact(history) > 0
+    assert [item["content"] for item in history[2:]] == ["再问一个", "好的", "最后一个"]
+    history.append({"role": "assistant", "content": "嗯"})
+    history.append({"role": "user", "content": "再来"})
+    assert await compactor.compact(history) == 0
+    assert mock_api.completions == 3
+
+
+async def test_compact_during_conversation(mock_api):
+    from nonebot_plugin_deepseek.metrics import compactions
+    from nonebot_plugin_deepseek.compaction import Compactor
+
+    compactor = Compactor()
+    history = long_history(4)
+    task = asyncio.create_task(compactor.compact(history))
+    await asyncio.sleep(0.01)
+    # 压缩期间追加的新一轮对话保留在摘要之后
+    history.append({"role": "user", "content": "新的问题"})
+    assert await task > 0
+    assert history[-1]["content"] == "新的问题"
+    assert len(history) == 7
+
+    history = long_history(4)
+    task = asyncio.create_task(compactor.compact(history))
+    await asyncio.sleep(0.01)
+    history.replace(1, 2, [{"role": "user", "content": "被改动的消息"}])
+    skipped = compactions.values.get("skipped", 0)
+    assert await task == 0
+    assert len(history) == 9
+    assert compactions.values["skipped"] == skipped + 1
+
+
+async def test_idle_schedule(mock_api):
+    from nonebot_plugin_deepseek.compaction import Compactor
+
+    compactor = Compactor()
+    history = long_history(4)
+    # 空闲计时内收到新消息则不压缩
+    compactor.schedule(history, "10", None)
+    await asyncio.sleep(0.01)
+    compactor.postpone(history)
+    await asyncio.sleep(0.1)
+    assert mock_api.completions == 0
+
+    compactor.schedule(history, "10", None)
+    assert len(history) == 9
+    await asyncio.sleep(0.2)
+    assert len(history) == 6
+    assert not compactor._waiting
+    assert not compactor._running
+
+    # 未超过阈值的对话不计时
+    compactor.schedule(long_history(1), "10", None)
+    assert not compactor._waiting
@@ -0,0 +1,160 @@
+import os
+import json
+from pathlib import Path
+
+import pytest
+import nonebot
+from nonebug import App
+from nonebot.adapters.onebot.v11 import Bot
+
+from tests.test_tracing import private_message
+
+
+def test_model_config_atomic_save(tmp_path: Path, monkeypatch):
+    from nonebot_plugin_deepseek.config import ModelConfig, model_config
+
+    monkeypatch.setattr(model_config, "file", tmp_path / "config.json")
+    model_config.save()
+    assert not model_config.changed()
+    assert not list(tmp_path.glob("*.tmp"))
+
+    snapshot = model_config.snapshot
+    model_config.default_prompt = "新的人设"
+    # 修改只替换快照引用，已取得的快照保持不变
+    assert snapshot.default_prompt != "新的人设"
+    assert model_config.snapshot is not snapshot
+    model_config.save()
+    assert json.loads(model_config.file.read_text())["default_prompt"] == "新的人设"
+
+    data = {"default_model": "not-enabled", "default_prompt": "外部修改", "default_sub_prompt": ""}
+    model_config.file.write_text(json.dumps(data))
+    os.utime(model_config.file, ns=(0, 1))
+    assert model_config.changed()
+    model_config.load()
+    assert model_config.default_prompt == "外部修改"
+    assert model_config.default_model == "deepseek-chat"
+    assert not model_config.changed()
+    assert ModelConfig.default_model.fset is not None
+
+
+async def test_watcher_reload(tmp_path: Path, monkeypatch):
+    import nonebot_plugin_deepseek.watcher as watcher_module
+    from nonebot_plugin_deepseek.apis.template import templates
+    from nonebot_plugin_deepseek.config import ScopedConfig, config, model_config, config_snapshot
+
+    monkeypatch.setattr(model_config, "file", tmp_path / "config.json")
+    model_config.save()
+    watcher = watcher_module.ConfigWatcher()
+    watcher.subscribe(templates.build)
+    original = config_snapshot()
+    in_flight = templates.get("deepseek-chat")
+
+    fresh = ScopedConfig(
+        api_key="sk-new",
+        enable_models=[{"name": "deepseek-chat"}, {"name": "deepseek-reasoner"}],  # type: ignore
+    )
+    monkeypatch.setattr(watcher_module, "load_plugin_config", lambda: fresh)
+    try:
+        assert watcher.reload_plugin_config()
+        assert config_snapshot() is fresh
+        assert config.get_enable_models() == ["deepseek-chat", "deepseek-reasoner"]
+        assert templates.get("deepseek-chat").headers["Authorization"] == "Bearer sk-new"
+        # 已开始的请求持有旧的模板与快照
+        assert in_flight.headers["Authorization"] == "Bearer sk-xxx"
+        assert original.api_key == "sk-xxx"
+
+        def invalid():
+            raise ValueError("bad config")
+
+        monkeypatch.setattr(watcher_module, "load_plugin_config", invalid)
+        assert not watcher.reload_plugin_config()
+        assert config_snapshot() is fresh
+
+        model_config.file.write_text(json.dumps({"default_model": "deepseek-reasoner"}))
+        os.utime(model_config.file, ns=(0, 1))
+        await watcher.check()
+        assert model_config.default_model == "deepseek-reasoner"
+    finally:
+        config.swap(original)  # type: ignore
+        templates.build()
+        model_config.default_model = "deepseek-chat"
+
+
+def test_model_settings_immutable(tmp_path: Path, monkeypatch):
+    from nonebot_plugin_deepseek.config import model_config
+
+    monkeypatch.setattr(model_config, "snapshot", model_config.snapshot)
+    monkeypatch.setattr(model_config, "file", tmp_path / "config.json")
+    voices = ["char-a-旁白"]
+    speakers = {"char-a": ["旁白"]}
+    model_config.available_tts_models = voices
+    model_config.tts_model_dict = speakers
+    snapshot = model_config.snapshot
+    # 快照复制了传入的容器，修改原对象或快照本身都不会生效
+    voices.append("char-b-旁白")
+    speakers["char-a"].append("说话人")
+    assert snapshot.available_tts_models == ("char-a-旁白",)
+    assert snapshot.tts_model_dict == {"char-a": ("旁白",)}
+    with pytest.raises(TypeError):
+        snapshot.tts_model_dict["char-b"] = ()  # type: ignore
+
+    model_config.save()
+    data = json.loads(model_config.file.read_text())
+    assert data["available_tts_models"] == ["char-a-旁白"]
+    assert data["tts_model_dict"] == {"char-a": ["旁白"]}
+    model_config.load()
+    assert model_config.snapshot == snapshot
+    assert isinstance(model_config.tts_model_dict["char-a"], tuple)
+
+
+async def test_enabled_models_follow_reload(app: App, tmp_path: Path, monkeypatch):
+    from nonebot_plugin_deepseek import deepseek
+    import nonebot_plugin_deepseek.watcher as watcher_module
+    from nonebot_plugin_deepseek.config import ScopedConfig, config, model_config, config_snapshot
+
+    monkeypatch.setattr(nonebot.get_driver().config, "superusers", {"47"})
+    monkeypatch.setattr(model_config, "snapshot", model_config.snapshot)
+    monkeypatch.setattr(model_config, "file", tmp_path / "config.json")
+    original = config_snapshot()
+    watcher = watcher_module.ConfigWatcher()
+    watcher.subscribe(model_config.ensure_enabled)
+    fresh = ScopedConfig(enable_models=[{"name": "deepseek-chat"}, {"name": "deepseek-reasoner"}])  # type: ignore
+    monkeypatch.setattr(watcher_module, "load_plugin_config", lambda: fresh)
+    try:
+        # 重载后新启用的模型即可选择
+        assert watcher.reload_plugin_config()
+        async with app.test_matcher(deepseek) as ctx:
+            bot = ctx.create_bot(base=Bot)
+            event = private_message("/todeepseek model --set-default deepseek-reasoner", 4701, user_id=47)
+            ctx.receive_event(bot, event)
+            ctx.should_call_send(event, "已设置默认模型为：deepseek-reasoner", result=None)
+            ctx.should_finished(deepseek)
+
+        # 重载移除了默认模型时改用第一个启用的模型，移除的模型也不能再选择
+        monkeypatch.setattr(watcher_module, "load_plugin_config", lambda: original)
+        assert watcher.reload_plugin_config()
+        assert model_config.default_model == "deepseek-chat"
+        assert json.loads(model_config.file.read_text())["default_model"] == "deepseek-reasoner"
+        async with app.test_matcher(deepseek) as ctx:
+            bot = ctx.create_bot(base=Bot)
+            event = private_message("/todeepseek 你好 --use-model deepseek-reasoner", 4702, user_id=48)
+            ctx.receive_event(bot, event)
+            ctx.should_call_send(
+                event, "模型 deepseek-reasoner 未启用，预期为：['deepseek-chat', 'auto'] 其中之一", result=None
+            )
+            ctx.should_finished(deepseek)
+    finally:
+        config.swap(original)  # type: ignore
+
+
+def test_scoped_config_frozen():
+    from nonebot_plugin_deepseek.config import config, config_snapshot
+
+    snapshot = config_snapshot()
+    # 已取得的快照不会被修改，热重载与测试都只能整体替换
+    with pytest.raises(ValueError, match="frozen"):
+        snapshot.send_rate = 2
+    with pytest.raises(AttributeError):
+        config.send_rate = 2
+    assert isinstance(snapshot.enable_models, tuple)
+    assert snapshot.send_rate == config.send_rate
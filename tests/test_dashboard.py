@@ -0,0 +1,91 @@
+import httpx
+
+
+def balance_response(total: str) -> dict:
+    return {
+        "is_available": True,
+        "balance_infos": [
+            {"currency": "CNY", "total_balance": total, "granted_balance": "0.00", "topped_up_balance": total}
+        ],
+    }
+
+
+async def test_balance_monitor(mock_transport, tmp_path):
+    from nonebot_plugin_deepseek.ledger import UsageLedger
+    from nonebot_plugin_deepseek.schemas.usage import Usage
+    from nonebot_plugin_deepseek.dashboard import BalanceMonitor, BalanceSample, render_dashboard
+
+    responses = [
+        httpx.Response(500, json={"error": {"message": "服务繁忙"}}),
+        httpx.Response(200, json=balance_response("80.00")),
+    ]
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return responses.pop(0)
+
+    mock_transport(handler)
+    monitor = BalanceMonitor()
+    monitor.interval = 600
+    ledger = UsageLedger()
+    ledger.directory = tmp_path
+    assert monitor.stale()
+    assert "尚未获取" in render_dashboard(monitor, await ledger.rollup())
+
+    await monitor.refresh()
+    assert monitor.balance is None
+    assert monitor.error == "服务繁忙"
+    await monitor.refresh()
+    assert requests[-1].url.path == "/user/balance"
+    assert monitor.error is None
+    assert not monitor.stale()
+
+    # 一天前 100 元，中途充值 50 元，共消耗 70 元
+    now = monitor.samples[-1].fetched_at
+    monitor.samples.extendleft(
+        [
+            BalanceSample(now - 3600, {"CNY": 95.0}),
+            BalanceSample(now - 43200, {"CNY": 45.0}),
+            BalanceSample(now - 86000, {"CNY": 100.0}),
+        ]
+    )
+    rate = monitor.burn_rate("CNY")
+    assert rate is not None
+    assert abs(rate - 70 * 86400 / 86000) < 0.01
+    assert monitor.burn_rate("USD") is None
+
+    # 用量取自账本的当日汇总，与配额同源
+    ledger.record("deepseek-chat", Usage(10, 90, 100, prompt_cache_hit_tokens=45), "10001", "20001", 0.5)
+    ledger.record("deepseek-reasoner", Usage(200, 100, 300), "10002", None, 1)
+    ledger.record("deepseek-chat", None, "10002", None, 1)
+    rollup = await ledger.rollup()
+    assert rollup.total.requests == 2
+    assert ledger.used("user", "10002") == rollup.users["10002"].total_tokens == 300
+    assert list(rollup.groups) == ["20001"]
+
+    text = render_dashboard(monitor, rollup)
+    assert "CNY 80.00" in text
+    assert "最新" in text
+    assert "预计可用 1.1 天" in text
+    assert "按模型：deepseek-reasoner 300、deepseek-chat 100" in text
+    assert "按用户：10002 300、10001 100" in text
+    assert "缓存命中 45" in text
+
+
+async def test_balance_command_does_not_wait(mock_transport):
+    from nonebot_plugin_deepseek.dashboard import BalanceMonitor
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=balance_response("1.00"))
+
+    mock_transport(handler)
+    monitor = BalanceMonitor()
+    monitor.refresh_soon()
+    monitor.refresh_soon()
+    assert monitor.balance is None
+    refreshing = monitor._refreshing
+    assert refreshing is not None
+    await refreshing
+    assert monitor.balance is not None
+    monitor.stop()
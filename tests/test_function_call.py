@@ -0,0 +1,326 @@
+import json
+from enum import Enum
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+import pytest
+from pydantic import BaseModel
+
+
+class Unit(Enum):
+    CELSIUS = "c"
+    FAHRENHEIT = "f"
+
+
+@dataclass
+class Point:
+    x: int
+    y: int = 0
+
+
+class Filter(BaseModel):
+    keyword: str
+    limit: int = 10
+
+
+class Inner(BaseModel):
+    value: int
+
+
+class Middle(BaseModel):
+    inner: Inner
+    others: list[Inner] = []
+
+
+class Outer(BaseModel):
+    middle: Middle
+
+
+class Node(BaseModel):
+    name: str
+    children: list["Node"] = []
+
+
+def resolve_refs(node, root: dict) -> None:
+    """按 JSON Pointer 相对于整个工具声明解析每个 `$ref`，无法解析时抛出异常"""
+    if isinstance(node, list):
+        for item in node:
+            resolve_refs(item, root)
+    elif isinstance(node, dict):
+        if "$ref" in node:
+            target = root
+            for part in node["$ref"].removeprefix("#/").split("/"):
+                target = target[part]
+        for value in node.values():
+            resolve_refs(value, root)
+
+
+def tool_call(name: str, arguments: dict):
+    from nonebot_plugin_deepseek.schemas import ToolCalls
+
+    return ToolCalls(index=0, id="call_0", type="function", function={"name": name, "arguments": json.dumps(arguments)})
+
+
+async def test_compiled_schema_and_arguments():
+    from nonebot_plugin_deepseek.function_call.registry import FunctionRegistry
+
+    registry = FunctionRegistry()
+    calls = []
+
+    @registry.register()
+    def query(
+        ids: list[int],
+        mode: Literal["fast", "slow"],
+        unit: Unit = Unit.CELSIUS,
+        origin: Optional[Point] = None,
+        filter: Optional[Filter] = None,
+        tags: Optional[dict[str, str]] = None,
+    ):
+        """查询
+
+        参数:
+            ids: 编号列表
+        """
+        calls.append((ids, mode, unit, origin, filter, tags))
+        return {"count": len(ids)}
+
+    parameters = registry.to_json()[0]["function"]["parameters"]
+    assert parameters["required"] == ["ids", "mode"]
+    properties = parameters["properties"]
+    assert properties["ids"] == {"type": "array", "items": {"type": "integer"}, "description": "编号列表"}
+    assert properties["mode"] == {"enum": ["fast", "slow"], "type": "string"}
+    assert properties["unit"] == {"enum": ["c", "f"], "type": "string", "default": "c"}
+    assert properties["origin"]["anyOf"][0]["required"] == ["x"]
+    assert properties["filter"]["anyOf"][0]["properties"]["keyword"]["type"] == "string"
+    assert properties["tags"]["anyOf"][0] == {"type": "object", "additionalProperties": {"type": "string"}}
+
+    result = await registry.execute_tool_call(
+        tool_call(
+            "query",
+            {"ids": ["1", 2], "mode": "fast", "unit": "f", "origin": {"x": 3}, "filter": {"keyword": "ds"}},
+        )
+    )
+    assert result == '{"count": 2}'
+    ids, mode, unit, origin, filter, tags = calls[0]
+    assert ids == [1, 2]
+    assert mode == "fast"
+    assert unit is Unit.FAHRENHEIT
+    assert origin == Point(x=3)
+    assert filter == Filter(keyword="ds")
+    assert tags is None
+
+    with pytest.raises(ValueError, match="Missing required parameter: mode"):
+        await registry.execute_tool_call(tool_call("query", {"ids": []}))
+    with pytest.raises(ValueError, match="Parameter 'mode'"):
+        await registry.execute_tool_call(tool_call("query", {"ids": [], "mode": "medium"}))
+
+
+async def test_nested_model_schema():
+    from nonebot_plugin_deepseek.function_call.registry import FunctionRegistry
+
+    registry = FunctionRegistry()
+    calls = []
+
+    @registry.register()
+    def nested(outers: list[Outer], tree: Optional[Node] = None):
+        """嵌套模型"""
+        calls.append((outers, tree))
+
+    tool = registry.to_json()[0]
+    resolve_refs(tool, tool)
+    encoded = json.dumps(tool)
+    assert "$defs" not in encoded
+    assert "$ref" not in encoded
+    middle = tool["function"]["parameters"]["properties"]["outers"]["items"]["properties"]["middle"]
+    assert middle["properties"]["inner"]["properties"]["value"]["type"] == "integer"
+    assert middle["properties"]["others"]["items"]["required"] == ["value"]
+    # 自引用的模型在递归处退化为任意对象
+    tree = tool["function"]["parameters"]["properties"]["tree"]["anyOf"][0]
+    assert tree["properties"]["children"]["items"] == {"type": "object"}
+
+    await registry.execute_tool_call(
+        tool_call("nested", {"outers": [{"middle": {"inner": {"value": "1"}}}], "tree": {"name": "root"}})
+    )
+    assert calls == [([Outer(middle=Middle(inner=Inner(value=1)))], Node(name="root"))]
+
+
+def test_schema_cache_invalidation():
+    from nonebot_plugin_deepseek.function_call.registry import FunctionRegistry
+
+    registry = FunctionRegistry()
+
+    @registry.register()
+    def first(flag: bool): ...
+
+    tools = registry.to_json()
+    encoded = registry.to_json_bytes()
+    assert registry.to_json() is tools
+    assert registry.to_json_bytes() is encoded
+    assert json.loads(encoded) == tools
+
+    @registry.register()
+    def second(value: float): ...
+
+    assert [tool["function"]["name"] for tool in registry.to_json()] == ["first", "second"]
+    registry.unregister("first")
+    assert json.loads(registry.to_json_bytes()) == registry.to_json()
+    assert len(registry.to_json()) == 1
+
+
+async def test_manifest_lazy_loading(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    import sys
+    import asyncio
+    import threading
+
+    from nonebot_plugin_deepseek.function_call.registry import FunctionRegistry
+
+    package = tmp_path / "lazy_tools"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "heavy.py").write_text(
+        "from typing import Literal, Optional\n"
+        "from nonebot_plugin_deepseek.function_call import registry\n"
+        "IMPORTED = True\n\n\n"
+        "@registry.register(description='重量级工具')\n"
+        "def heavy(mode: Literal['a', 'b'], count: Optional[int] = 3):\n"
+        "    return f'{mode}-{count}'\n"
+    )
+    manifest = tmp_path / "manifest.json"
+
+    eager = FunctionRegistry()
+    monkeypatch.setattr("nonebot_plugin_deepseek.function_call.registry", eager)
+    eager.load("lazy_tools", base_dir=tmp_path)
+    assert "lazy_tools.heavy" in sys.modules
+    expected = eager.to_json()
+    del sys.modules["lazy_tools.heavy"]
+
+    for _ in range(2):  # 首次静态分析并写入清单，第二次直接读取清单
+        lazy = FunctionRegistry()
+        monkeypatch.setattr("nonebot_plugin_deepseek.function_call.registry", lazy)
+        lazy.load("lazy_tools", base_dir=tmp_path, manifest=manifest)
+        assert manifest.exists()
+        assert "lazy_tools.heavy" not in sys.modules
+        assert lazy.to_json() == expected
+
+    # 并发的首次调用只导入一次，注册在事件循环线程中进行
+    registrations = []
+    monkeypatch.setattr(lazy, "_invalidate", lambda: registrations.append(threading.get_ident()))
+    results = await asyncio.gather(*(lazy.execute_tool_call(tool_call("heavy", {"mode": "b"})) for _ in range(3)))
+    assert results == ["b-3"] * 3
+    assert registrations == [threading.get_ident()]
+    assert "lazy_tools.heavy" in sys.modules
+    del sys.modules["lazy_tools.heavy"]
+
+
+def cpu_bound(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+async def test_executor_policies():
+    import time
+    import asyncio
+    import threading
+
+    from nonebot_plugin_deepseek.function_call.registry import FunctionRegistry
+
+    registry = FunctionRegistry()
+    registry.executor.configure(thread_workers=2, process_workers=1, timeout=5)
+    threads = []
+
+    @registry.register()
+    def blocking(seconds: float):
+        threads.append(threading.current_thread().name)
+        time.sleep(seconds)
+        return "done"
+
+    @registry.register(timeout=0.1)
+    async def slow():
+        await asyncio.sleep(1)
+
+    registry.register(executor="process")(cpu_bound)
+
+    with pytest.raises(ValueError, match="module level"):
+
+        @registry.register(executor="process")
+        def nested(): ...
+
+    try:
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        assert await registry.execute_tool_call(tool_call("blocking", {"seconds": 0.2})) == "done"
+        task.cancel()
+        assert threads[0].startswith("deepseek-tool")
+        assert ticks >= 5  # 同步工具在线程池中运行，事件循环未被阻塞
+
+        assert await registry.execute_tool_call(tool_call("slow", {})) == "工具 slow 执行超时"
+        assert await registry.execute_tool_call(tool_call("cpu_bound", {"n": 10})) == "285"
+    finally:
+        registry.executor.shutdown()
+
+
+def test_tool_budget():
+    from nonebot_plugin_deepseek.schemas.usage import Usage
+    from nonebot_plugin_deepseek.function_call import ToolBudget
+    from nonebot_plugin_deepseek.function_call.budget import REPEATED_CALL_NOTICE
+
+    budget = ToolBudget(max_rounds=3, timeout=60, max_tokens=1000)
+    assert budget.exhausted() is None
+
+    call = tool_call("search", {"q": "deepseek", "page": 1})
+    assert budget.repeated(call) is None
+    budget.remember(call, "result")
+    # 参数顺序不同但内容相同的调用视为重复
+    assert budget.repeated(tool_call("search", {"page": 1, "q": "deepseek"})) == f"result\n{REPEATED_CALL_NOTICE}"
+    assert budget.repeated(tool_call("search", {"q": "other"})) is None
+    assert budget.exhausted() is None
+    budget.repeated(call)
+    assert budget.exhausted() == "重复工具调用 2 次"
+
+    budget = ToolBudget(max_rounds=2, timeout=60, max_tokens=1000)
+    budget.start_round()
+    budget.start_round()
+    assert budget.exhausted() == "工具调用已达 2 轮"
+
+    budget = ToolBudget(max_rounds=2, timeout=60, max_tokens=1000)
+    budget.consume(Usage(completion_tokens=100, prompt_tokens=950, total_tokens=1050))
+    assert budget.exhausted() == "累计消耗 1050 token"
+
+    budget = ToolBudget(max_rounds=2, timeout=0, max_tokens=1000)
+    assert budget.exhausted() == "本轮对话已超过 0 秒"
+
+
+async def test_tool_budget_deadline(mock_api):
+    import time
+    import asyncio
+
+    from nonebot_plugin_deepseek.apis import API
+    from nonebot_plugin_deepseek.function_call import ToolBudget
+    from nonebot_plugin_deepseek.function_call.registry import FunctionRegistry
+
+    registry = FunctionRegistry()
+
+    @registry.register(timeout=60)
+    async def slow():
+        await asyncio.sleep(5)
+        return "done"
+
+    # 工具的超时为 60 秒，但本轮只剩 0.2 秒
+    budget = ToolBudget(max_rounds=5, timeout=0.2, max_tokens=1000)
+    start = time.perf_counter()
+    assert await registry.execute_tool_call(tool_call("slow", {}), timeout=budget.remaining()) == "工具 slow 执行超时"
+    assert time.perf_counter() - start < 1
+    assert budget.remaining() == 0
+    assert budget.exhausted() == "本轮对话已超过 0.2 秒"
+
+    mock_api.latency = 5
+    start = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        await API.chat([{"role": "user", "content": "你好"}], timeout=0.1)
+    assert time.perf_counter() - start < 1
@@ -0,0 +1,29 @@
+def test_import_within_budget():
+    from benchmarks.bench_import_time import IMPORT_BUDGET_MS, measure
+
+    report = measure(runs=3)
+
+    assert report.modules, "未解析到插件模块的导入耗时"
+    assert report.total < IMPORT_BUDGET_MS, sorted(report.modules.items(), key=lambda item: -item[1])[:5]
+
+
+def test_import_is_lazy():
+    from benchmarks.bench_import_time import measure
+
+    report = measure(runs=1)
+
+    assert report.heavy == []
+    assert report.touched == []
+
+
+def test_parse_importtime():
+    from benchmarks.bench_import_time import parse_importtime
+
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   httpx\n"
+        "import time:      1500 |       1620 | nonebot_plugin_deepseek.config\n"
+        "import time:       300 |       1920 | nonebot_plugin_deepseek\n"
+    )
+
+    assert parse_importtime(stderr) == {"nonebot_plugin_deepseek.config": 1.5, "nonebot_plugin_deepseek": 0.3}
@@ -0,0 +1,78 @@
+import json
+from dataclasses import asdict
+
+
+def usage(prompt: int, completion: int, reasoning: int = 0):
+    from nonebot_plugin_deepseek.schemas.usage import Usage
+
+    return Usage(
+        completion_tokens=completion,
+        prompt_tokens=prompt,
+        total_tokens=prompt + completion,
+        prompt_cache_hit_tokens=prompt // 2,
+        prompt_cache_miss_tokens=prompt - prompt // 2,
+        completion_tokens_details={"reasoning_tokens": reasoning},  # type: ignore
+    )
+
+
+async def test_ledger_persists_rollups(tmp_path):
+    from nonebot_plugin_deepseek.ledger import UsageLedger, UsageRecord, today
+
+    ledger = UsageLedger()
+    ledger.directory = tmp_path
+    await ledger.start(interval=0)
+    ledger.record("deepseek-chat", usage(100, 20), "1", "100", 0.5)
+    ledger.record("deepseek-reasoner", usage(40, 60, 30), "1", None, 2)
+    ledger.record("deepseek-chat", None, "2", "100", 0.1)
+    ledger.record("deepseek-chat", usage(10, 5), "2", "100", 0.1)
+    assert not (tmp_path / f"{today()}.jsonl").exists()
+    await ledger.stop()
+
+    lines = (tmp_path / f"{today()}.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["model"] for line in lines] == ["deepseek-chat", "deepseek-reasoner", "deepseek-chat"]
+    assert json.loads(lines[1])["reasoning_tokens"] == 30
+
+    # 模拟写入汇总前退出：账本中多出一条汇总未覆盖的记录
+    extra = UsageRecord(0, today(), "3", "200", "deepseek-chat", 7, 3, 0, 0, 7, 0.2)
+    with (tmp_path / f"{today()}.jsonl").open("a", encoding="utf-8") as f:
+        f.write(json.dumps(asdict(extra)) + "\n")
+
+    reloaded = UsageLedger()
+    reloaded.directory = tmp_path
+    rollup = await reloaded.rollup()
+    assert rollup.total.requests == 4
+    assert rollup.total.total_tokens == 245
+    assert rollup.total.reasoning_tokens == 30
+    assert rollup.users["1"].total_tokens == 220
+    assert rollup.groups["100"].requests == 2
+    assert rollup.groups["200"].total_tokens == 10
+    assert set(rollup.models) == {"deepseek-chat", "deepseek-reasoner"}
+    assert (await reloaded.rollup("2000-01-01")).total.requests == 0
+
+
+async def test_quota(patch_config, tmp_path):
+    from nonebot_plugin_deepseek.ledger import UsageLedger, render_quota
+
+    patch_config(
+        usage_ledger=False,
+        quota_user_daily_tokens=100,
+        quota_group_daily_tokens=150,
+        quota_overrides={"user:vip": 0, "group:small": 10},
+    )
+    ledger = UsageLedger()
+    ledger.directory = tmp_path
+
+    assert ledger.check("1", "100") is None
+    ledger.record("deepseek-chat", usage(80, 20), "1", "100", 1)
+    assert "你今日的用量已达上限（100/100 tokens）" in ledger.check("1", "100")
+    assert ledger.check("2", "100") is None
+    ledger.record("deepseek-chat", usage(40, 20), "2", "100", 1)
+    assert "本群今日的用量已达上限（160/150 tokens）" in ledger.check("2", "100")
+    assert ledger.check("2", None) is None
+
+    ledger.record("deepseek-chat", usage(500, 500), "vip", "small", 1)
+    assert ledger.check("vip", None) is None
+    assert "本群" in ledger.check("vip", "small")
+    assert render_quota(ledger, "vip", "small") == "你今日已用 1000 tokens，不限额\n本群今日已用 1000 tokens，配额 10"
+    await ledger.flush()
+    assert list(tmp_path.iterdir()) == []
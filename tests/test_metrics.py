@@ -0,0 +1,110 @@
+import time
+
+import httpx
+from nonebug import App
+
+
+def test_histogram():
+    from nonebot_plugin_deepseek.metrics import MetricsRegistry
+
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "测试", (0.1, 1, 10), label="model")
+    counter = registry.counter("test_total", "计数", label="type")
+    for value in (0.05, 0.5, 0.5, 5, 50):
+        histogram.observe(value, "deepseek-chat")
+    histogram.observe(0.2)
+    counter.inc(3, "prompt")
+    counter.inc(key="prompt")
+
+    assert histogram.count() == 6
+    assert histogram.count("deepseek-chat") == 5
+    p50 = histogram.quantile(0.5, "deepseek-chat")
+    assert p50 is not None
+    assert 0.1 < p50 < 1
+    assert histogram.quantile(1.0) == 10
+    assert histogram.quantile(0.5, "missing") is None
+
+    text = registry.render_prometheus()
+    assert "# TYPE test_seconds histogram" in text
+    assert 'test_seconds_bucket{model="deepseek-chat",le="1.0"} 3' in text
+    assert 'test_seconds_bucket{model="deepseek-chat",le="+Inf"} 5' in text
+    assert 'test_seconds_count{model="deepseek-chat"} 5' in text
+    assert 'test_seconds_bucket{model="",le="0.1"} 0' in text
+    assert 'test_total{type="prompt"} 4' in text
+    assert "测试：6 次" in registry.render_summary()
+
+    registry.reset()
+    assert registry.render_summary() == "暂无数据"
+
+
+def test_recording_is_cheap():
+    from nonebot_plugin_deepseek.metrics import Counter, Histogram
+
+    histogram = Histogram("bench_seconds", "bench", label="model")
+    counter = Counter("bench_total", "bench", label="type")
+    start = time.perf_counter()
+    for index in range(100_000):
+        histogram.observe(index * 1e-5, "deepseek-chat")
+        counter.inc(1, "prompt")
+    # 两次记录的实测耗时约 600 ns，此处留出余量以免在慢速环境中误报
+    assert (time.perf_counter() - start) / 100_000 < 5e-6
+
+
+async def test_chat_metrics(mock_transport):
+    import pytest
+
+    from nonebot_plugin_deepseek.apis import API
+    from nonebot_plugin_deepseek.exception import RequestException
+    from nonebot_plugin_deepseek.metrics import errors, tokens, prompt_assembly, completion_latency
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if b"fail" in request.content:
+            return httpx.Response(200, json={"error": {"message": "bad request"}})
+        return httpx.Response(
+            200,
+            json={
+                "id": "chat-1",
+                "created": 1,
+                "model": "deepseek-chat",
+                "object": "chat.completion",
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "好"}}],
+                "usage": {
+                    "completion_tokens": 1,
+                    "prompt_tokens": 10,
+                    "total_tokens": 11,
+                    "prompt_cache_hit_tokens": 8,
+                    "prompt_cache_miss_tokens": 2,
+                },
+            },
+        )
+
+    mock_transport(handler)
+    completions = completion_latency.count("deepseek-chat")
+    assemblies = prompt_assembly.count()
+    hit_tokens = tokens.values.get("prompt_cache_hit", 0)
+    request_errors = errors.values.get("RequestException", 0)
+
+    await API.chat([{"role": "user", "content": "你好"}])
+    assert completion_latency.count("deepseek-chat") == completions + 1
+    assert prompt_assembly.count() == assemblies + 1
+    assert tokens.values["prompt_cache_hit"] == hit_tokens + 8
+
+    with pytest.raises(RequestException, match="bad request"):
+        await API.chat([{"role": "user", "content": "fail"}])
+    assert errors.values["RequestException"] == request_errors + 1
+    assert completion_latency.count("deepseek-chat") == completions + 1
+
+
+async def test_metrics_endpoint(app: App, patch_config):
+
+    async with app.test_server() as ctx:
+        client = ctx.get_client()
+        response = await client.get("/deepseek/metrics")
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert "# TYPE deepseek_completion_seconds histogram" in response.text
+
+        patch_config(metrics_token="secret")
+        assert (await client.get("/deepseek/metrics")).status_code == 401
+        response = await client.get("/deepseek/metrics", headers={"Authorization": "Bearer secret"})
+        assert response.status_code == 200
@@ -0,0 +1,30 @@
+import httpx
+import pytest
+
+
+async def test_chat_against_mock(mock_transport):
+    from nonebot_plugin_deepseek.apis import API
+    from benchmarks.mock_deepseek import MockOptions, MockDeepSeek
+    from nonebot_plugin_deepseek.exception import RequestException
+
+    mock = MockDeepSeek(MockOptions(latency=0, jitter=0, stream_delay=0, completion_tokens=3, reasoning_tokens=2))
+    mock_transport(httpx.ASGITransport(mock))
+    messages = [{"role": "user", "content": "你好"}]
+
+    completion = await API.chat(messages)
+    assert completion.choices[0].message.content == "词0词1词2"
+    assert completion.usage.completion_tokens == 5
+
+    reasoning = []
+    completion = await API.chat(messages, on_reasoning=reasoning.append)
+    assert "".join(reasoning) == "想想"
+    assert completion.choices[0].message.content == "词0词1词2"
+    assert completion.usage.prompt_cache_hit_tokens == 1
+
+    balance = await API.query_balance()
+    assert balance.balance_infos[0].total_balance == "100.00"
+
+    mock.options.rate_limit_rate = 1
+    with pytest.raises(RequestException, match="Rate limit"):
+        await API.chat(messages, on_reasoning=reasoning.append)
+    assert (mock.stats.completions, mock.stats.streamed, mock.stats.rate_limited) == (2, 1, 1)
@@ -0,0 +1,172 @@
+import time
+import asyncio
+from typing import Optional
+
+
+class FakeAdapter:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def get_name(self) -> str:
+        return self.name
+
+
+class FakeBot:
+    def __init__(self, adapter: str = "OneBot V11", fail: bool = False) -> None:
+        self.self_id = "10000"
+        self.adapter = FakeAdapter(adapter)
+        self.fail = fail
+        self.sent: list[tuple[str, bool, float]] = []
+        self.forwards: list[list[dict]] = []
+
+    async def send(self, event, message: str, at_sender: bool = False) -> None:
+        if self.fail:
+            raise RuntimeError("rate limited")
+        await asyncio.sleep(0.001)
+        self.sent.append((message, at_sender, time.monotonic()))
+
+    async def call_api(self, api: str, **data) -> None:
+        assert api == "send_group_forward_msg"
+        self.forwards.append(data["messages"])
+
+
+class FakeEvent:
+    def __init__(self, user_id: str = "1", group_id: Optional[int] = 1) -> None:
+        self.user_id = user_id
+        if group_id is not None:
+            self.group_id = group_id
+
+    def get_user_id(self) -> str:
+        return self.user_id
+
+
+async def test_token_bucket():
+    from nonebot_plugin_deepseek.outbound import TokenBucket
+
+    bucket = TokenBucket(rate=100, capacity=2)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert 0 < bucket.try_acquire() <= 0.01
+
+    start = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+    assert time.monotonic() - start >= 0.04
+
+
+async def test_outbound_pacing_and_coalescing(patch_config):
+    from nonebot_plugin_deepseek.outbound import Outbound
+
+    patch_config(send_rate=20, send_burst=1)
+    outbound = Outbound()
+    bot = FakeBot()
+    alice, bob = FakeEvent("alice"), FakeEvent("bob")
+
+    await outbound.send(bot, alice, "first", at_sender=True)
+    # 等待令牌期间入队的同一用户的短消息会被合并
+    await asyncio.gather(
+        outbound.send(bot, alice, "a1", at_sender=True),
+        outbound.send(bot, alice, "a2", at_sender=True),
+        outbound.send(bot, bob, "b1", at_sender=True),
+    )
+    messages = [message for message, _, _ in bot.sent]
+    assert messages == ["first", "a1\na2", "b1"]
+    intervals = [later - earlier for (*_, earlier), (*_, later) in zip(bot.sent, bot.sent[1:])]
+    assert all(interval >= 0.04 for interval in intervals)
+
+    stats = outbound.stats()["10000:group:1"]
+    assert (stats.sent, stats.messages, stats.coalesced, stats.depth) == (3, 4, 1, 0)
+    assert outbound.pressure(bot, alice) == 0
+    await outbound.close()
+
+
+async def test_outbound_backpressure(patch_config):
+    from nonebot_plugin_deepseek.outbound import Outbound
+
+    patch_config(send_rate=50, send_burst=1, send_queue_size=4, send_coalesce_chars=0)
+    outbound = Outbound()
+    bot, event = FakeBot(), FakeEvent(group_id=None)
+
+    tasks = [asyncio.create_task(outbound.send(bot, event, f"m{index}")) for index in range(8)]
+    await asyncio.sleep(0)
+    assert outbound.pressure(bot, event) == 1
+    assert outbound.congested(bot, event)
+    await asyncio.gather(*tasks)
+    assert [message for message, _, _ in bot.sent] == [f"m{index}" for index in range(8)]
+    assert not outbound.congested(bot, event)
+    await outbound.close()
+
+
+async def test_outbound_long_reply(patch_config):
+    from nonebot_plugin_deepseek.outbound import Outbound
+
+    patch_config(send_rate=1000, send_max_chars=100)
+    outbound = Outbound()
+    reply = "\n\n".join(f"段落{index}" + "字" * 60 for index in range(4))
+
+    bot = FakeBot()
+    await outbound.send(bot, FakeEvent(), reply, at_sender=True)
+    assert not bot.sent
+    assert len(bot.forwards) == 1
+    assert "\n\n".join(node["data"]["content"] for node in bot.forwards[0]) == reply
+
+    bot = FakeBot(adapter="Telegram")
+    await outbound.send(bot, FakeEvent(), reply, at_sender=True)
+    assert [at_sender for _, at_sender, _ in bot.sent] == [True, False, False, False]
+    assert "\n\n".join(message for message, _, _ in bot.sent) == reply
+    await outbound.close()
+
+
+async def test_outbound_failure():
+    import pytest
+
+    from nonebot_plugin_deepseek.outbound import Outbound
+
+    outbound = Outbound()
+    bot, event = FakeBot(fail=True), FakeEvent()
+    with pytest.raises(RuntimeError):
+        await outbound.send(bot, event, "hello")
+    await outbound.send(bot, event, "ignored", wait=False)
+    await asyncio.sleep(0.01)
+    assert outbound.stats()["10000:group:1"].failed == 2
+    await outbound.close()
+
+
+async def test_outbound_idle_queue_removed(monkeypatch):
+    import sys
+
+    from nonebot_plugin_deepseek.outbound import Outgoing, Outbound
+
+    # 包中的 `outbound` 属性是同名的单例，需从 sys.modules 取得模块
+    monkeypatch.setattr(sys.modules["nonebot_plugin_deepseek.outbound"], "_IDLE_TIMEOUT", 0.05)
+    outbound = Outbound()
+    bot = FakeBot()
+    alice = FakeEvent("alice", group_id=1)
+    await outbound.send(bot, alice, "hi")
+    await outbound.send(bot, FakeEvent("bob", group_id=None), "hi")
+    assert set(outbound.queues) == {"10000:group:1", "10000:user:bob"}
+
+    # 发送协程空闲退出后队列被移除
+    await asyncio.sleep(0.1)
+    assert not outbound.queues
+
+    # 取得队列后、入队前队列恰好被移除时，入队会重新登记
+    queue = outbound.queue(bot, alice)
+    outbound.queues.clear()
+    future = asyncio.get_running_loop().create_future()
+    await queue.put(Outgoing(bot, alice, "again", False, None, future))
+    await future
+    assert outbound.queues == {"10000:group:1": queue}
+
+    # 移除后已有新的队列登记时，旧队列将消息交给新队列，不会再启动一个发送协程
+    await asyncio.sleep(0.1)
+    assert not outbound.queues
+    fresh = outbound.queue(bot, alice)
+    future = asyncio.get_running_loop().create_future()
+    await queue.put(Outgoing(bot, alice, "stale", False, None, future))
+    await future
+    assert outbound.queues == {"10000:group:1": fresh}
+    assert queue._worker is None
+    assert fresh.stats.messages == 1
+    assert [message for message, _, _ in bot.sent] == ["hi", "hi", "again", "stale"]
+    await outbound.close()
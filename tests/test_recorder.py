@@ -0,0 +1,37 @@
+import httpx
+
+
+async def test_record_and_replay(monkeypatch, patch_config, mock_api, mock_transport, tmp_path):
+    from nonebot_plugin_deepseek.apis import API
+    from nonebot_plugin_deepseek.config import config
+    from nonebot_plugin_deepseek.recorder import ReplayTransport, recorder, load_archive
+
+    mock_api.reasoning_tokens = 2
+    patch_config(record_path=str(tmp_path / "calls.jsonl.gz"))
+    # 录制时插件自行创建底层 transport 并包装，替身在其下方应答
+    monkeypatch.setattr(httpx, "AsyncHTTPTransport", lambda: httpx.MockTransport(mock_api))
+    messages = [{"role": "user", "content": f"我的 key 是 {config.api_key}"}]
+
+    await API.chat(messages)
+    reasoning = []
+    await API.chat(messages, on_reasoning=reasoning.append)
+    recorder.tool_call("search", '{"q": "天气"}', "晴", 0, 0.25)
+    await recorder.flush()
+
+    entries = load_archive(tmp_path / "calls.jsonl.gz")
+    assert [entry["kind"] for entry in entries] == ["chat", "chat", "tool"]
+    assert config.api_key not in (tmp_path / "calls.jsonl.gz").read_bytes().decode("latin-1")
+    assert entries[0]["request"]["messages"][0]["content"] == "我的 key 是 ***"
+    assert entries[1]["request"]["stream"] is True
+    assert "".join(text for _, text in entries[1]["chunks"]).endswith("data: [DONE]\n\n")
+
+    patch_config(record_path="")
+    transport = mock_transport(ReplayTransport(entries, speed=10))
+    replayed = []
+    completion = await API.chat(entries[1]["request"]["messages"], on_reasoning=replayed.append)
+    assert completion.choices[0].message.content == "词0词1词2"
+    assert replayed == reasoning
+    completion = await API.chat(entries[0]["request"]["messages"])
+    assert completion.usage.completion_tokens == 5
+    assert mock_api.completions == 2
+    assert transport.misses == 0
@@ -0,0 +1,102 @@
+import asyncio
+from pathlib import Path
+
+
+class FakePage:
+    def __init__(self) -> None:
+        self.templates = 0
+        self.renders = 0
+        self.body = ""
+        self.closed = False
+
+    async def set_content(self, html: str) -> None:
+        self.templates += 1
+
+    async def evaluate(self, expression: str, arg=None) -> None:
+        self.body = arg
+        await asyncio.sleep(0.01)
+
+    async def screenshot(self, *, full_page: bool, type: str) -> bytes:
+        self.renders += 1
+        return self.body.encode()
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def test_split_markdown():
+    from nonebot_plugin_deepseek.render import split_markdown
+
+    paragraphs = [f"段落 {index} " + "内容" * 20 for index in range(10)]
+    chunks = split_markdown("\n\n".join(paragraphs), 100)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert "\n\n".join(chunks) == "\n\n".join(paragraphs)
+
+    code = "```python\n" + "\n".join(f"x = {index}" for index in range(10)) + "\n\n\ny = 1\n```"
+    chunks = split_markdown("前言" * 20 + "\n\n" + code, 50)
+    assert chunks[1] == code
+
+    huge = "a" * 50 + "\n"
+    assert len(split_markdown(huge * 10, 40)) == 10
+
+
+async def test_render_pool_and_cache(tmp_path: Path):
+    from nonebot_plugin_deepseek.render import MarkdownRenderer
+
+    pages: list[FakePage] = []
+
+    async def factory(width: int) -> FakePage:
+        pages.append(page := FakePage())
+        return page
+
+    renderer = MarkdownRenderer(factory, tmp_path, pool_size=2, to_html=lambda text: text)
+    await renderer.warm_up()
+    assert len(pages) == 2
+    assert all(page.templates == 1 for page in pages)
+
+    async def render(text: str) -> list[bytes]:
+        return [image async for image in renderer.render(text)]
+
+    results = await asyncio.gather(*(render(f"reply {index}") for index in range(6)))
+    assert results == [[f"reply {index}".encode()] for index in range(6)]
+    # 并发渲染复用预热的页面，不会重新加载模板
+    assert len(pages) == 2
+    assert sum(page.renders for page in pages) == 6
+    assert all(page.templates == 1 for page in pages)
+
+    assert await render("reply 0") == [b"reply 0"]
+    assert sum(page.renders for page in pages) == 6
+
+    renderer.theme = "dark"
+    await render("reply 0")
+    assert sum(page.renders for page in pages) == 7
+
+    await renderer.close()
+    assert all(page.closed for page in pages)
+
+
+async def test_render_broken_page(tmp_path: Path):
+    import pytest
+
+    from nonebot_plugin_deepseek.render import MarkdownRenderer
+
+    pages: list[FakePage] = []
+
+    async def factory(width: int) -> FakePage:
+        pages.append(page := FakePage())
+        return page
+
+    renderer = MarkdownRenderer(factory, None, pool_size=1, to_html=lambda text: text)
+    await renderer.warm_up()
+
+    async def broken(*args, **kwargs):
+        raise RuntimeError("page crashed")
+
+    pages[0].screenshot = broken  # type: ignore
+    with pytest.raises(RuntimeError):
+        await renderer.render("boom").__anext__()
+    assert pages[0].closed
+
+    assert [image async for image in renderer.render("ok")] == [b"ok"]
+    assert len(pages) == 2
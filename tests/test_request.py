@@ -0,0 +1,73 @@
+import json
+
+
+def test_request_template():
+    import pytest
+
+    from nonebot_plugin_deepseek.config import ScopedConfig
+    from nonebot_plugin_deepseek.apis.template import RequestTemplates, encode_json
+
+    scoped_config = ScopedConfig(
+        api_key="sk-test",
+        prompt="你是助手",
+        enable_models=[
+            {"name": "deepseek-chat", "temperature": 0.5},  # type: ignore
+            {"name": "deepseek-reasoner", "base_url": "http://localhost:8000"},  # type: ignore
+        ],
+    )
+    templates = RequestTemplates()
+    templates.build(scoped_config)
+    messages = [{"role": "user", "content": "你好"}]
+
+    chat = templates.get("deepseek-chat")
+    assert chat.url == "https://api.deepseek.com/chat/completions"
+    assert chat.headers["Authorization"] == "Bearer sk-test"
+    body = json.loads(chat.body(encode_json(messages)[1:-1]))
+    assert body == {
+        "model": "deepseek-chat",
+        "max_tokens": 8000,
+        "temperature": 0.5,
+        "messages": [{"content": "你是助手", "role": "system"}, *messages],
+    }
+
+    reasoner = templates.get("deepseek-reasoner")
+    assert reasoner.url == "http://localhost:8000/chat/completions"
+    tools = [{"type": "function", "function": {"name": "f"}}]
+    body = json.loads(
+        reasoner.body(encode_json(messages)[1:-1], tools=encode_json(tools), tool_choice="none", stream=True)
+    )
+    assert body["messages"] == messages
+    assert body["tools"] == tools
+    assert body["tool_choice"] == "none"
+    assert body["stream"] is True
+    assert json.loads(chat.body(b""))["messages"] == [{"content": "你是助手", "role": "system"}]
+
+    with pytest.raises(ValueError, match="not enabled"):
+        templates.get("unknown")
+
+
+def test_message_history():
+    from nonebot_plugin_deepseek.history import MessageHistory
+    from nonebot_plugin_deepseek.apis.template import templates, encode_json
+
+    messages = [
+        {"role": "system", "content": "系统"},
+        {"role": "user", "content": '你好\n"引号"'},
+        {"role": "assistant", "content": "", "tool_calls": [{"id": "1", "type": "function"}]},
+        {"role": "tool", "tool_call_id": "1", "content": "结果"},
+    ]
+    history = MessageHistory(messages[:2])
+    for message in messages[2:]:
+        history.append(message)
+
+    assert len(history) == 4
+    assert list(history) == messages
+    assert history[1:] == messages[1:]
+    assert history.encoded() == encode_json(messages)[1:-1]
+    assert json.loads(templates.get("deepseek-chat").body(history.encoded()))["messages"] == messages
+
+    summary = {"role": "system", "content": "摘要"}
+    history.replace(1, 3, [summary])
+    assert list(history) == [messages[0], summary, messages[3]]
+    assert json.loads(b"[" + history.encoded() + b"]") == list(history)
+    assert MessageHistory().encoded() == b""
@@ -0,0 +1,89 @@
+import time
+
+
+def test_extract_features():
+    from nonebot_plugin_deepseek.router import complexity, extract_features
+
+    greeting = extract_features("你好呀")
+    assert (greeting.has_code, greeting.has_math, greeting.asks_reasoning) == (False, False, False)
+    assert complexity(greeting) < 0.1
+
+    code = extract_features("这段代码为什么报错？\n```python\ndef f(x):\n    return x[0]\n```")
+    assert code.has_code
+    assert code.asks_reasoning
+    assert extract_features("求解方程 x^2 + 3x - 4 = 0").has_math
+    assert complexity(code) > complexity(greeting)
+
+    document = extract_features("这是一段很长的聊天记录。\n" * 1000, depth=3, ocr_chars=200)
+    assert 5000 < document.prompt_tokens < 10000
+    assert (document.depth, document.ocr_chars) == (3, 200)
+
+
+def test_route(patch_config):
+    from nonebot_plugin_deepseek.config import CustomModel
+    from nonebot_plugin_deepseek.router import ModelRouter, extract_features
+
+    patch_config(
+        enable_models=tuple(CustomModel(name=name) for name in ("deepseek-chat", "mirror-chat", "deepseek-reasoner")),
+        router_reasoning_models=("deepseek-reasoner",),
+    )
+    router = ModelRouter()
+    greeting = extract_features("你好")
+    maths = extract_features("证明：对任意正整数 n，n^3 - n 能被 6 整除")
+
+    assert router.route(maths).model == "deepseek-reasoner"
+    assert router.route(maths).reason == "reasoning"
+
+    # 同档内选择近期耗时更短的端点，尚无样本的端点优先尝试
+    router.observe("deepseek-chat", 2.0, ok=True)
+    assert router.route(greeting).model == "mirror-chat"
+    router.observe("mirror-chat", 0.5, ok=True)
+    assert router.route(greeting).model == "mirror-chat"
+
+    # 失败率过高的端点被避开，同档无可用端点时回退到其他档
+    for _ in range(10):
+        router.observe("mirror-chat", 0.5, ok=False)
+    assert router.route(greeting).model == "deepseek-chat"
+    for _ in range(10):
+        router.observe("deepseek-reasoner", 0.5, ok=False)
+    decision = router.route(maths)
+    assert (decision.model, decision.reason) == ("deepseek-chat", "fallback")
+
+    # 失败率随时间衰减，冷却后被避开的端点重新得到请求，成功即恢复
+    router.stats["mirror-chat"].updated -= 10
+    assert router.route(greeting).model == "deepseek-chat"
+    router.stats["mirror-chat"].updated -= 90
+    assert router.route(greeting).model == "mirror-chat"
+    router.observe("mirror-chat", 0.5, ok=True)
+    assert router.route(greeting).model == "mirror-chat"
+    assert router.stats["mirror-chat"].current_error_rate(time.monotonic()) < 0.3
+
+
+async def test_track_counts_outcome():
+    import pytest
+
+    from nonebot_plugin_deepseek.router import ModelRouter
+    from nonebot_plugin_deepseek.exception import RequestException
+
+    router = ModelRouter()
+    with router.track("deepseek-chat"):
+        assert router.stats["deepseek-chat"].inflight == 1
+    with pytest.raises(RequestException, match="429"), router.track("deepseek-chat"):
+        raise RequestException("429")
+
+    stats = router.stats["deepseek-chat"]
+    assert (stats.inflight, stats.requests, stats.errors) == (0, 2, 1)
+    assert stats.latency is not None
+    assert 0 < stats.error_rate < 1
+
+
+def test_route_is_cheap():
+    from nonebot_plugin_deepseek.router import ModelRouter, extract_features
+
+    router = ModelRouter()
+    text = "请帮我分析一下这段聊天记录。\n" * 5000
+    start = time.perf_counter()
+    for _ in range(1000):
+        router.route(extract_features(text, depth=5))
+    # 单次决策的实测耗时约 50 µs，此处留出余量以免在慢速环境中误报
+    assert (time.perf_counter() - start) / 1000 < 1e-3
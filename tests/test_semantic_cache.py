@@ -0,0 +1,95 @@
+def test_near_duplicate_lookup(monkeypatch, patch_config):
+    from nonebot_plugin_deepseek.semantic_cache import SemanticCache, normalize
+    from nonebot_plugin_deepseek.metrics import semantic_cache_ratios, semantic_cache_lookups
+
+    monkeypatch.setattr(semantic_cache_lookups, "values", {})
+    assert normalize("Anon 今天几号？") == "anon今天几号"
+    cache = SemanticCache()
+    group = cache.scope("123", "你是爱音", "deepseek-chat")
+    cache.store(group, "今天几号了", "今天是 10 月 19 日")
+
+    assert cache.lookup(group, "今天几号了？") is not None
+    assert cache.lookup(group, "  今天 几号了!! ").answer == "今天是 10 月 19 日"
+    # 其他群、其他模型、其他人设与无关问题均不命中
+    assert cache.lookup(cache.scope("456", "你是爱音", "deepseek-chat"), "今天几号了") is None
+    assert cache.lookup(cache.scope("123", "你是爱音", "deepseek-reasoner"), "今天几号了") is None
+    assert cache.lookup(cache.scope("123", "", "deepseek-chat"), "今天几号了") is None
+    assert cache.lookup(group, "明天会下雨吗") is None
+    assert cache.lookup(group, "？！") is None
+    assert semantic_cache_ratios() == (1 / 3, None)
+
+    patch_config(semantic_cache_threshold=1.0)
+    assert cache.lookup(group, "今天几号了啊") is None
+    assert cache.lookup(group, "今天几号了。") is not None
+
+    patch_config(semantic_cache_ttl=1e-9)
+    assert cache.lookup(group, "今天几号了") is None
+    assert not cache.entries
+    assert not cache.buckets
+
+
+def test_signature_reuse_and_expiry(monkeypatch, patch_config):
+    import sys
+
+    from nonebot_plugin_deepseek.semantic_cache import SemanticCache
+
+    cache = SemanticCache()
+    scope = cache.scope("1", "", "deepseek-chat")
+    # 过长的问题不计算签名，也不写入
+    assert cache.signature("长" * 150 + "问题" * 30) is None
+    cache.store(scope, "长" * 150 + "问题" * 30, "不会写入")
+    assert not cache.entries
+
+    signature = cache.signature("今天几号了")
+    cache.store(scope, "今天几号了", "今天是 10 月 19 日", signature)
+    assert cache.lookup(scope, "今天几号了", signature).answer == "今天是 10 月 19 日"
+    # 字面相似度不足 0.5 的改写召回不到候选，调低阈值也不命中
+    patch_config(semantic_cache_threshold=0.3)
+    assert cache.lookup(scope, "anon今天几号？") is None
+
+    # 跨过本地零点后条目过期
+    monkeypatch.setattr(sys.modules["nonebot_plugin_deepseek.semantic_cache"], "today", lambda: "2099-01-01")
+    assert cache.lookup(scope, "今天几号了", signature) is None
+    assert not cache.entries
+
+
+def test_bounded_index(patch_config):
+    from nonebot_plugin_deepseek.semantic_cache import SemanticCache
+
+    patch_config(semantic_cache_max_entries=2)
+    cache = SemanticCache()
+    scope = cache.scope("1", "", "deepseek-chat")
+    cache.store(scope, "第一个问题是什么", "一")
+    cache.store(scope, "另一个完全不同的提问", "二")
+    # 命中后成为最近使用，淘汰的是第二条
+    assert cache.lookup(scope, "第一个问题是什么") is not None
+    cache.store(scope, "还有第三件事情", "三")
+    assert len(cache.entries) == 2
+    assert cache.lookup(scope, "另一个完全不同的提问") is None
+    assert {entry.answer for entry in cache.entries.values()} == {"一", "三"}
+    assert sum(len(bucket) for bucket in cache.buckets.values()) == 2 * cache.bands
+
+
+async def test_false_hit_sampling(monkeypatch, patch_config, mock_api):
+    from nonebot_plugin_deepseek.ledger import ledger
+    from nonebot_plugin_deepseek.semantic_cache import SemanticCache
+    from nonebot_plugin_deepseek.metrics import semantic_cache_samples
+
+    mock_api.completion_tokens = 4
+    monkeypatch.setattr(semantic_cache_samples, "values", {})
+    patch_config(usage_ledger=False)
+    cache = SemanticCache()
+    scope = cache.scope("1", "", "deepseek-chat")
+    messages = [{"role": "user", "content": "你好呀"}]
+
+    # 替身服务总是回复“词0词1词2词3”
+    cache.store(scope, "你好", "词0词1词2词3")
+    cache.store(scope, "你好啊", "完全不相关的答案")
+    consistent, wrong = (cache.lookup(scope, text) for text in ("你好", "你好啊"))
+    assert await cache.verify(consistent, messages, "deepseek-chat", "sampled-user", "sampled-group") is True
+    assert await cache.verify(wrong, messages, "deepseek-chat", "sampled-user", "sampled-group") is False
+    # 抽检的请求同样计入触发命中的用户与群的用量
+    assert ledger.used("user", "sampled-user") == ledger.used("group", "sampled-group") > 0
+    assert semantic_cache_samples.values == {"consistent": 1, "inconsistent": 1}
+    assert [entry.answer for entry in cache.entries.values()] == ["词0词1词2词3"]
+    assert mock_api.completions == 2
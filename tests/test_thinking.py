@@ -0,0 +1,128 @@
+import json
+import asyncio
+
+import httpx
+
+
+def sse(*chunks: dict) -> bytes:
+    lines = [": keep-alive", ""]
+    for chunk in chunks:
+        lines += [f"data: {json.dumps(chunk)}", ""]
+    lines += ["data: [DONE]", ""]
+    return "\n".join(lines).encode()
+
+
+def delta(**fields) -> dict:
+    return {"id": "chat-1", "created": 1, "model": "deepseek-reasoner", "choices": [{"index": 0, "delta": fields}]}
+
+
+async def test_chat_stream(mock_transport):
+    from nonebot_plugin_deepseek.apis import API
+
+    body = sse(
+        delta(role="assistant", reasoning_content="先想"),
+        delta(reasoning_content="一想"),
+        delta(content="你好"),
+        delta(tool_calls=[{"index": 0, "id": "call_1", "type": "function", "function": {"name": "add"}}]),
+        delta(tool_calls=[{"index": 0, "function": {"arguments": '{"a": 1'}}]),
+        delta(tool_calls=[{"index": 0, "function": {"arguments": ', "b": 2}'}}]),
+        {
+            **delta(),
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls"}],
+            "usage": {"completion_tokens": 5, "prompt_tokens": 3, "total_tokens": 8},
+        },
+    )
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, content=body, headers={"Content-Type": "text/event-stream"})
+
+    mock_transport(handler)
+    reasoning: list[str] = []
+    completion = await API.chat([{"role": "user", "content": "hi"}], on_reasoning=reasoning.append)
+
+    assert requests[0]["stream"] is True
+    assert reasoning == ["先想", "一想"]
+    choice = completion.choices[0]
+    assert choice.finish_reason == "tool_calls"
+    assert choice.message.content == "你好"
+    assert choice.message.reasoning_content == "先想一想"
+    assert choice.message.tool_calls
+    assert choice.message.tool_calls[0].function.arguments == '{"a": 1, "b": 2}'
+    assert completion.usage.total_tokens == 8
+
+
+async def test_chat_stream_error(mock_transport):
+    import pytest
+
+    from nonebot_plugin_deepseek.apis import API
+    from nonebot_plugin_deepseek.exception import RequestException
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(402, json={"error": {"message": "Insufficient Balance"}})
+
+    mock_transport(handler)
+    with pytest.raises(RequestException, match="Insufficient Balance"):
+        await API.chat([{"role": "user", "content": "hi"}], on_reasoning=lambda _: None)
+
+
+class FakeAdapter:
+    def get_name(self) -> str:
+        return "OneBot V11"
+
+
+class FakeBot:
+    self_id = "10000"
+    adapter = FakeAdapter()
+
+    def __init__(self) -> None:
+        self.forwards: list[str] = []
+
+    async def call_api(self, api: str, **data) -> None:
+        self.forwards.append("".join(node["data"]["content"] for node in data["messages"]))
+
+
+class FakeEvent:
+    group_id = 2
+
+    def get_user_id(self) -> str:
+        return "1"
+
+
+async def test_reasoning_streamer(patch_config):
+    from nonebot_plugin_deepseek.outbound import outbound
+    from nonebot_plugin_deepseek.thinking import THINKING_HEADER, ReasoningStreamer
+
+    patch_config(send_rate=1000)
+    bot = FakeBot()
+    streamer = ReasoningStreamer(bot, FakeEvent(), interval=0.05, max_chars=1000)  # type: ignore
+
+    for index in range(20):
+        streamer.feed(f"第{index}步。")
+        await asyncio.sleep(0.01)
+    await streamer.finish(streamer.text)
+    await asyncio.sleep(0.01)
+
+    # 约 0.2 秒的推理按 0.05 秒的间隔节流为少量更新
+    assert 2 <= len(bot.forwards) <= 6
+    assert bot.forwards[0].startswith(THINKING_HEADER)
+    assert "".join(bot.forwards).removeprefix(THINKING_HEADER) == streamer.text
+    await outbound.close()
+
+
+async def test_reasoning_streamer_cap(patch_config):
+    from nonebot_plugin_deepseek.outbound import outbound
+    from nonebot_plugin_deepseek.utils import TRUNCATED_MARK
+    from nonebot_plugin_deepseek.thinking import THINKING_HEADER, ReasoningStreamer
+
+    patch_config(send_rate=1000)
+    bot = FakeBot()
+    streamer = ReasoningStreamer(bot, FakeEvent(), interval=10, max_chars=10)  # type: ignore
+    streamer.feed("a" * 30)
+    await streamer.finish()
+    await streamer.finish("a" * 40)
+    await asyncio.sleep(0.01)
+
+    assert bot.forwards == [THINKING_HEADER + "a" * 10 + TRUNCATED_MARK]
+    await outbound.close()
@@ -0,0 +1,85 @@
+import json
+
+import nonebot
+from nonebug import App
+from nonebot.adapters.onebot.v11.event import Sender
+from nonebot.adapters.onebot.v11 import Bot, Message, PrivateMessageEvent
+
+
+def private_message(text: str, message_id: int, user_id: int = 10) -> PrivateMessageEvent:
+    return PrivateMessageEvent(
+        time=0,
+        self_id=1,
+        post_type="message",
+        sub_type="friend",
+        user_id=user_id,
+        message_type="private",
+        message_id=message_id,
+        message=Message(text),
+        original_message=Message(text),
+        raw_message=text,
+        font=0,
+        sender=Sender(user_id=user_id),
+        to_me=True,
+    )
+
+
+async def test_tracer(patch_config, tmp_path):
+    from nonebot_plugin_deepseek.tracing import Tracer, span, export_trace, render_timeline
+
+    patch_config(trace_slowest=2, trace_recent=1)
+    tracer = Tracer()
+    with span("ignored") as attrs:
+        attrs["tokens"] = 1
+
+    for index, duration in enumerate((3, 1, 2, 5)):
+        trace = tracer.begin(f"user_{index}", "user")
+        with tracer.activate(trace), span("chat", model="deepseek-chat") as attrs, span("tool", tool="search"):
+            attrs["tokens"] = 42
+        trace.start -= duration
+        tracer.finish(trace, error="RequestException" if index == 3 else None)
+        tracer.finish(trace)
+
+    assert [trace.session_id for trace in tracer.ranked()] == ["user_3", "user_0"]
+    assert [trace.session_id for trace in tracer.recent] == ["user_3"]
+    assert tracer.find("2").session_id == "user_0"
+    assert tracer.find("user_3").error == "RequestException"
+    assert tracer.find("user_1") is None
+
+    trace = tracer.find("1")
+    assert [(span.name, span.depth) for span in trace.spans] == [("chat", 0), ("tool", 1)]
+    assert trace.spans[0].attrs == {"model": "deepseek-chat", "tokens": 42}
+    timeline = render_timeline(trace)
+    assert "失败：RequestException" in timeline
+    assert "  tool tool=search" in timeline
+
+    events = json.loads(export_trace(trace, tmp_path).read_text(encoding="utf-8"))["traceEvents"]
+    assert [event["name"] for event in events] == ["thread_name", "turn", "chat", "tool"]
+    assert events[2]["args"] == {"model": "deepseek-chat", "tokens": "42"}
+    assert events[3]["ts"] >= events[2]["ts"]
+
+
+async def test_trace_command(app: App, monkeypatch):
+    from nonebot_plugin_deepseek import deepseek
+    from nonebot_plugin_deepseek.tracing import span, tracer, render_list, render_timeline
+
+    monkeypatch.setattr(nonebot.get_driver().config, "superusers", {"10", "11"})
+    trace = tracer.begin("10_abcdef12", "10")
+    with tracer.activate(trace), span("send", parts=1):
+        pass
+    tracer.finish(trace)
+
+    async with app.test_matcher(deepseek) as ctx:
+        bot = ctx.create_bot(base=Bot)
+        event = private_message("/todeepseek trace", 4301)
+        ctx.receive_event(bot, event)
+        ctx.should_call_send(event, f"耗时最长的对话：\n{render_list(tracer.ranked())}", result=None)
+        ctx.should_finished(deepseek)
+
+    async with app.test_matcher(deepseek) as ctx:
+        bot = ctx.create_bot(base=Bot)
+        event = private_message("/todeepseek trace 10_abc", 4302, user_id=11)
+        ctx.receive_event(bot, event)
+        ctx.should_call_send(event, render_timeline(trace), result=None)
+        ctx.should_finished(deepseek)
+    tracer.clear()
@@ -0,0 +1,140 @@
+import json
+import asyncio
+
+import httpx
+import pytest
+import nonebot
+from nonebug import App
+from nonebot.adapters.onebot.v11 import Bot
+from fastapi import FastAPI, Request, Response
+
+from tests.test_tracing import private_message
+
+
+def stand_in_tts() -> tuple[FastAPI, dict]:
+    """本地 TTS 服务替身：`broken` 模型获取说话人失败，`url` 模型返回下载地址"""
+    app = FastAPI()
+    state = {"inflight": 0, "peak": 0, "infer": []}
+
+    @app.post("/models")
+    async def models():
+        return {"models": ["char-a", "char-b", "url", "broken"]}
+
+    @app.post("/spks")
+    async def spks(request: Request):
+        model = (await request.json())["model"]
+        state["inflight"] += 1
+        state["peak"] = max(state["peak"], state["inflight"])
+        await asyncio.sleep(0.05)
+        state["inflight"] -= 1
+        if model == "broken":
+            return Response(status_code=500)
+        return {"speakers": [f"{model}说话人", "旁白"]}
+
+    @app.post("/infer_single")
+    async def infer(request: Request):
+        data = await request.json()
+        state["infer"].append(data["text"])
+        # 越靠前的片段合成越慢，产出顺序仍应与原文一致
+        await asyncio.sleep(0.02 if data["text"] == "你好。" else 0)
+        if data["model_name"] == "url":
+            return {"audio_url": f"http://tts/audio/{data['text']}"}
+        return Response(f"{data['speaker_name']}:{data['text']}".encode(), media_type="audio/wav")
+
+    @app.get("/audio/{text}")
+    async def audio(text: str):
+        return Response(f"url:{text}".encode(), media_type="audio/wav")
+
+    return app, state
+
+
+@pytest.fixture
+def tts_server(mock_transport, patch_config):
+
+    app, state = stand_in_tts()
+    patch_config(tts_api_url="http://tts/", tts_concurrency=2)
+    mock_transport(httpx.ASGITransport(app))
+    return state
+
+
+def test_split_sentences():
+    from nonebot_plugin_deepseek.tts import split_sentences
+
+    assert split_sentences("你好。今天天气不错！要出门吗？", 8) == ["你好。", "今天天气不错！", "要出门吗？"]
+    assert split_sentences("你好。今天天气不错！要出门吗？", 100) == ["你好。今天天气不错！要出门吗？"]
+    assert split_sentences("Hi there. Bye.", 9) == ["Hi there.", "Bye."]
+    assert split_sentences("一二三四五六七", 3) == ["一二三", "四五六", "七"]
+    assert split_sentences(" \n ", 10) == []
+
+
+async def test_available_tts(tts_server, patch_config):
+    from nonebot_plugin_deepseek.config import tts_config
+
+    available = await tts_config.get_available_tts()
+    assert available == {
+        "char-a": ["char-a说话人", "旁白"],
+        "char-b": ["char-b说话人", "旁白"],
+        "url": ["url说话人", "旁白"],
+    }
+    assert tts_server["peak"] == 2
+
+    patch_config(tts_models=("char-b",))
+    assert list(await tts_config.get_available_tts()) == ["char-b"]
+
+
+async def test_synthesizer_stream_and_cache(tts_server, monkeypatch, patch_config, tmp_path):
+    from nonebot_plugin_deepseek.config import model_config
+    from nonebot_plugin_deepseek.tts import AudioCache, Synthesizer, resolve_voice
+
+    patch_config(tts_chunk_chars=4)
+    monkeypatch.setattr(model_config, "snapshot", model_config.snapshot)
+    model_config.tts_model_dict = {"char-a": ["char-a说话人", "旁白"], "url": ["url说话人"]}
+    assert resolve_voice("char-a-旁白") == ("char-a", "旁白")
+
+    synthesizer = Synthesizer(AudioCache(tmp_path, max_bytes=1024))
+    audio = [chunk async for chunk in synthesizer.stream("你好。再见！", "char-a-旁白")]
+    assert audio == ["旁白:你好。".encode(), "旁白:再见！".encode()]
+    assert sorted(tts_server["infer"]) == sorted(["你好。", "再见！"])
+
+    # 第二次完全由缓存提供
+    assert [chunk async for chunk in synthesizer.stream("你好。再见！", "char-a-旁白")] == audio
+    assert len(tts_server["infer"]) == 2
+    assert [chunk async for chunk in synthesizer.stream("早。", "url-url说话人")] == ["url:早。".encode()]
+
+    small = AudioCache(tmp_path / "small", max_bytes=40)
+    for text in ("一", "二", "三"):
+        await small.store("m", "s", text, b"x" * 16)
+        await asyncio.sleep(0.01)
+    assert await small.load("m", "s", "一") is None
+    assert await small.load("m", "s", "三") == b"x" * 16
+
+
+async def test_tts_commands(app: App, tts_server, monkeypatch, tmp_path):
+    from nonebot_plugin_deepseek import deepseek
+    from nonebot_plugin_deepseek.config import model_config
+
+    monkeypatch.setattr(nonebot.get_driver().config, "superusers", {"12", "13"})
+    monkeypatch.setattr(model_config, "snapshot", model_config.snapshot)
+    monkeypatch.setattr(model_config, "file", tmp_path / "config.json")
+    model_config.available_tts_models = ["char-a-旁白", "char-b-旁白"]
+
+    async with app.test_matcher(deepseek) as ctx:
+        bot = ctx.create_bot(base=Bot)
+        event = private_message("/todeepseek tts --set-default char-b-旁白", 4601, user_id=12)
+        ctx.receive_event(bot, event)
+        ctx.should_call_send(event, "已设置默认语音为：char-b-旁白", result=None)
+        ctx.should_finished(deepseek)
+
+    async with app.test_matcher(deepseek) as ctx:
+        bot = ctx.create_bot(base=Bot)
+        event = private_message("/todeepseek tts --list", 4602, user_id=13)
+        ctx.receive_event(bot, event)
+        ctx.should_call_send(
+            event,
+            "可用的语音列表: \n- char-a-旁白\n- char-b-旁白（默认）\n"
+            "输入 `/deepseek [内容] --use-tts` 以语音回复\n"
+            "输入 `/deepseek tts --set-default [语音]` 设置默认语音",
+            result=None,
+        )
+        ctx.should_finished(deepseek)
+    assert json.loads((tmp_path / "config.json").read_text())["tts_model"] == "char-b-旁白"
@@ -0,0 +1,121 @@
+import httpx
+import pytest
+
+HTML = """
+<html>
+  <head><title>Example News</title><script>var tracking = 1;</script></head>
+  <body>
+    <nav class="navbar"><a href="/">Home</a><a href="/about">About</a></nav>
+    <div id="sidebar">Hot links</div>
+    <article>
+      <h1>Example News</h1>
+      <p>First paragraph of the story.</p>
+      <p>Second   paragraph\tof the story.</p>
+      <div class="share-buttons">Share to Twitter</div>
+    </article>
+    <footer>Copyright</footer>
+  </body>
+</html>
+"""
+
+
+def test_extract_main_content():
+    from nonebot_plugin_deepseek.web import extract_main_content
+
+    text = extract_main_content(HTML)
+    assert text.startswith("Example News")
+    assert "First paragraph of the story." in text
+    assert "Second paragraph of the story." in text
+    for noise in ("tracking", "Home", "Hot links", "Share to Twitter", "Copyright"):
+        assert noise not in text
+
+
+def test_detect_charset():
+    from nonebot_plugin_deepseek.web.fetch import detect_charset
+
+    assert detect_charset("text/html; charset=ISO-8859-1", b"") == "iso8859-1"
+    assert detect_charset("text/html", b'<meta charset="gb2312">') == "gb18030"
+    assert detect_charset("text/html", "你好".encode("gbk") * 10) == "gb18030"
+    assert detect_charset("text/html", "你好".encode()) == "utf-8"
+
+
+def test_truncate_to_tokens():
+    from nonebot_plugin_deepseek.utils import TRUNCATED_MARK, estimate_tokens, truncate_to_tokens
+
+    assert truncate_to_tokens("short text", 100) == "short text"
+
+    text = "\n".join(f"第 {i} 行内容" for i in range(1000))
+    truncated = truncate_to_tokens(text, 200)
+    assert truncated.endswith(TRUNCATED_MARK)
+    assert estimate_tokens(truncated) <= 200
+
+
+async def test_fetch_limits():
+    from nonebot_plugin_deepseek.web import fetch
+
+    body = "<html><body>" + "内容" * 100_000 + "</body></html>"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"Content-Type": "text/html; charset=gbk"}, content=body.encode("gbk"))
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        result = await fetch(client, "https://example.com", max_bytes=1024, timeout=5)
+
+    assert result.truncated
+    assert len(result.content) == 1024
+    assert result.encoding == "gbk"
+    assert result.text.startswith("<html><body>内容")
+
+
+async def test_http_cache(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    from nonebot_plugin_deepseek.web import HTTPCache
+    from nonebot_plugin_deepseek.function_call.builtins import website_summary
+
+    monkeypatch.setattr(website_summary, "cache", HTTPCache(tmp_path, max_bytes=1024 * 1024))
+    requests: list[httpx.Request] = []
+    max_age = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        cache_headers = {"ETag": '"v1"', "Cache-Control": f"max-age={max_age}"}
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304, headers=cache_headers)
+        return httpx.Response(200, headers={"Content-Type": "text/html", **cache_headers}, content=HTML.encode())
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        text = await website_summary.fetch_page_text(client, "https://example.com/news")
+        assert "First paragraph of the story." in text
+        assert "If-None-Match" not in requests[-1].headers
+
+        # 已过期，发送条件请求并通过 304 复用缓存正文
+        max_age = 3600
+        assert await website_summary.fetch_page_text(client, "https://example.com/news") == text
+        assert requests[-1].headers["If-None-Match"] == '"v1"'
+        assert len(requests) == 2
+
+        # 重新验证后刷新了有效期，直接命中缓存
+        assert await website_summary.fetch_page_text(client, "https://example.com/news") == text
+        assert len(requests) == 2
+
+
+async def test_truncated_page_not_cached(tmp_path, monkeypatch: pytest.MonkeyPatch, patch_config):
+    from nonebot_plugin_deepseek.web import HTTPCache
+    from nonebot_plugin_deepseek.function_call.builtins import website_summary
+
+    monkeypatch.setattr(website_summary, "cache", HTTPCache(tmp_path, max_bytes=1024 * 1024))
+    patch_config(web_max_bytes=200)
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        headers = {"Content-Type": "text/html", "ETag": '"v1"', "Cache-Control": "max-age=3600"}
+        return httpx.Response(200, headers=headers, content=HTML.encode())
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        await website_summary.fetch_page_text(client, "https://example.com/news")
+        await website_summary.fetch_page_text(client, "https://example.com/news")
+
+    # 截断的正文未写入缓存，第二次仍完整请求而非条件请求
+    assert len(requests) == 2
+    assert "If-None-Match" not in requests[-1].headers
+    assert not list(tmp_path.iterdir())